@@ -0,0 +1,473 @@
+import fcntl
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import Date, DateTime, Float, Integer, String, cast, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.jobs import enqueue, job_handler
+from models.class_registration import ClassRegistration
+from models.group_class import GroupClass
+from models.health_metric import HealthMetric
+from models.job import Job, JobStatus
+from models.personal_training_session import PersonalTrainingSession
+from models.user import Member, Trainer, User
+
+logger = logging.getLogger(__name__)
+
+# Parquet snapshots the admin reports read; DuckDB queries them in-process
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+# Rows fetched per round trip and written per Parquet row group
+ANALYTICS_CHUNK_ROWS = int(os.getenv("ANALYTICS_CHUNK_ROWS", 50_000))
+# Monthly datasets re-export this many months back (plus the current and future months) on each
+# snapshot, so status changes such as attendance and completed sessions are picked up
+ANALYTICS_REFRESH_MONTHS = int(os.getenv("ANALYTICS_REFRESH_MONTHS", 2))
+# Appended part files are merged into one once a dataset has this many
+ANALYTICS_MAX_PARTS = int(os.getenv("ANALYTICS_MAX_PARTS", 24))
+# Appended rows recorded within this many seconds of a snapshot are re-read by the next one, as
+# transactions still open then commit them late; keep it above the longest write transaction plus
+# any replica lag
+ANALYTICS_APPEND_LAG = int(os.getenv("ANALYTICS_APPEND_LAG", 300))
+# DuckDB threads per report, so a big aggregate doesn't take every core from the API
+ANALYTICS_THREADS = int(os.getenv("ANALYTICS_THREADS", 2))
+# Seconds between background snapshots; 0 (the default) leaves snapshots to manage.py or the admin endpoint
+ANALYTICS_SNAPSHOT_INTERVAL = int(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", 0))
+
+SNAPSHOT_JOB = "analytics.snapshot"
+STATE_FILE = "_snapshot.json"
+LOCK_FILE = "_snapshot.lock"
+TAIL_FILE = "tail.parquet"
+SCHEMA_FILE = "_schema.parquet"
+
+# dataset -> (Core select of plain columns, how it is refreshed, key column).
+#   full:    small tables whose rows change, rewritten every time
+#   append:  rows never change; rows recorded since the last snapshot (by the key timestamp) are
+#            added, and the last ANALYTICS_APPEND_LAG seconds are rewritten each time
+#   monthly: one file per month of the key column; recent months are rewritten
+# Enums are cast to text and numerics to float in SQL, as in exports.py.
+DATASETS = {
+    "members": (
+        select(
+            Member.user_id.label("member_id"),
+            cast(Member.membership_status, String).label("membership_status"),
+            Member.date_of_birth,
+            User.location_id,
+            User.created_at,
+        ).select_from(Member).join(User, Member.user_id == User.user_id).order_by(Member.user_id),
+        "full",
+        None,
+    ),
+    "trainers": (
+        select(
+            Trainer.user_id.label("trainer_id"),
+            User.first_name,
+            User.last_name,
+            Trainer.specialty,
+        ).select_from(Trainer).join(User, Trainer.user_id == User.user_id).order_by(Trainer.user_id),
+        "full",
+        None,
+    ),
+    "classes": (
+        select(
+            GroupClass.class_id,
+            GroupClass.class_name,
+            cast(GroupClass.day, String).label("day"),
+            GroupClass.start_time.label("start_time"),
+            GroupClass.capacity,
+            GroupClass.trainer_id,
+            GroupClass.room_id,
+            GroupClass.location_id,
+        ).order_by(GroupClass.class_id),
+        "full",
+        None,
+    ),
+    "health_metrics": (
+        select(
+            HealthMetric.metric_id,
+            HealthMetric.member_id,
+            cast(HealthMetric.weight, Float).label("weight"),
+            cast(HealthMetric.body_fat_percentage, Float).label("body_fat_percentage"),
+            HealthMetric.heart_rate,
+            HealthMetric.recorded_at,
+        ),
+        "append",
+        HealthMetric.recorded_at,
+    ),
+    "registrations": (
+        select(
+            ClassRegistration.registration_id,
+            ClassRegistration.member_id,
+            ClassRegistration.class_id,
+            ClassRegistration.occurrence_id,
+            ClassRegistration.registration_date,
+            cast(ClassRegistration.attended_status, String).label("attended_status"),
+        ),
+        "monthly",
+        ClassRegistration.registration_date,
+    ),
+    "sessions": (
+        select(
+            PersonalTrainingSession.session_id,
+            PersonalTrainingSession.member_id,
+            PersonalTrainingSession.trainer_id,
+            PersonalTrainingSession.room_id,
+            PersonalTrainingSession.session_date,
+            PersonalTrainingSession.start_time,
+            PersonalTrainingSession.end_time,
+            cast(PersonalTrainingSession.status, String).label("status"),
+        ),
+        "monthly",
+        PersonalTrainingSession.session_date,
+    ),
+}
+
+# Reports over the snapshot views; $start (inclusive) and $end (exclusive) are optional dates
+REPORTS = {
+    "attendance_by_class": """
+        WITH counts AS (
+            SELECT c.class_id, c.class_name, c.day, c.trainer_id,
+                   count(r.registration_id) FILTER (WHERE r.attended_status <> 'CANCELLED') AS registrations,
+                   count(r.registration_id) FILTER (WHERE r.attended_status = 'ATTENDED') AS attended,
+                   count(r.registration_id) FILTER (WHERE r.attended_status = 'MISSED') AS missed,
+                   count(r.registration_id) FILTER (WHERE r.attended_status = 'CANCELLED') AS cancelled
+            FROM classes c
+            LEFT JOIN registrations r ON r.class_id = c.class_id
+                AND ($start IS NULL OR r.registration_date >= $start)
+                AND ($end IS NULL OR r.registration_date < $end)
+            GROUP BY c.class_id, c.class_name, c.day, c.trainer_id
+        )
+        SELECT *, round(attended / nullif(attended + missed, 0), 3) AS attendance_rate
+        FROM counts
+        ORDER BY class_id
+    """,
+    "trainer_load": """
+        WITH pt AS (
+            SELECT trainer_id,
+                   count(*) FILTER (WHERE status = 'COMPLETED') AS completed_sessions,
+                   count(*) FILTER (WHERE status = 'SCHEDULED') AS scheduled_sessions,
+                   count(*) FILTER (WHERE status IN ('CANCELED', 'NO_SHOW')) AS cancelled_or_no_show,
+                   round(sum(epoch(end_time - start_time)) FILTER (WHERE status <> 'CANCELED') / 3600, 1) AS pt_hours
+            FROM sessions
+            WHERE ($start IS NULL OR session_date >= $start) AND ($end IS NULL OR session_date < $end)
+            GROUP BY trainer_id
+        ), taught AS (
+            SELECT c.trainer_id,
+                   count(DISTINCT c.class_id) AS classes,
+                   count(r.registration_id) FILTER (WHERE r.attended_status = 'ATTENDED') AS class_attendees
+            FROM classes c
+            LEFT JOIN registrations r ON r.class_id = c.class_id
+                AND ($start IS NULL OR r.registration_date >= $start)
+                AND ($end IS NULL OR r.registration_date < $end)
+            GROUP BY c.trainer_id
+        )
+        SELECT t.trainer_id, t.first_name, t.last_name,
+               coalesce(pt.completed_sessions, 0) AS completed_sessions,
+               coalesce(pt.scheduled_sessions, 0) AS scheduled_sessions,
+               coalesce(pt.cancelled_or_no_show, 0) AS cancelled_or_no_show,
+               coalesce(pt.pt_hours, 0) AS pt_hours,
+               coalesce(taught.classes, 0) AS classes,
+               coalesce(taught.class_attendees, 0) AS class_attendees
+        FROM trainers t
+        LEFT JOIN pt USING (trainer_id)
+        LEFT JOIN taught USING (trainer_id)
+        ORDER BY pt_hours DESC, class_attendees DESC, t.trainer_id
+    """,
+    "membership_churn": """
+        WITH cohorts AS (
+            SELECT date_trunc('month', created_at)::DATE AS joined_month, membership_status, count(*) AS members
+            FROM members
+            WHERE ($start IS NULL OR created_at >= $start) AND ($end IS NULL OR created_at < $end)
+            GROUP BY 1, 2
+        )
+        SELECT *, round(members / sum(members) OVER (PARTITION BY joined_month), 3) AS share_of_month
+        FROM cohorts
+        ORDER BY joined_month, membership_status
+    """,
+    "weight_trends": """
+        WITH monthly AS (
+            SELECT member_id,
+                   date_trunc('month', recorded_at)::DATE AS month,
+                   arg_max(weight, recorded_at) AS weight,
+                   arg_max(body_fat_percentage, recorded_at) AS body_fat_percentage
+            FROM health_metrics
+            WHERE ($start IS NULL OR recorded_at >= $start) AND ($end IS NULL OR recorded_at < $end)
+            GROUP BY ALL
+        ), changes AS (
+            SELECT *, weight - lag(weight) OVER (PARTITION BY member_id ORDER BY month) AS weight_change
+            FROM monthly
+        )
+        SELECT month,
+               count(*) AS members_measured,
+               round(avg(weight), 2) AS avg_weight,
+               round(median(weight), 2) AS median_weight,
+               round(avg(body_fat_percentage), 2) AS avg_body_fat_percentage,
+               round(avg(weight_change), 2) AS avg_weight_change
+        FROM changes
+        GROUP BY month
+        ORDER BY month
+    """,
+}
+
+def _arrow_schema(statement):
+    import pyarrow as pa
+
+    fields = []
+    for column in statement.selected_columns:
+        sql_type = column.type
+        if isinstance(sql_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC") if sql_type.timezone else pa.timestamp("us")
+        elif isinstance(sql_type, Date):
+            arrow_type = pa.date32()
+        elif isinstance(sql_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(sql_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(sql_type, String):
+            arrow_type = pa.string()
+        else:
+            arrow_type = pa.time64("us")  # the only other column type selected: Time
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batch(rows, schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+    )
+
+
+class _ParquetFile:
+    """A Parquet file written under a temporary name and moved into place once complete"""
+
+    def __init__(self, path: str, schema):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self._tmp = path + ".tmp"
+        self._writer = pq.ParquetWriter(self._tmp, schema, compression="zstd")
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        os.replace(self._tmp, self.path)
+
+
+def _stream(engine: Engine, statement):
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=ANALYTICS_CHUNK_ROWS).execute(statement)
+        yield from result.partitions()
+
+
+def _column_index(statement, column) -> int:
+    return [selected.name for selected in statement.selected_columns].index(column.name)
+
+
+def _month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def _refresh_full(engine: Engine, directory: str, statement, schema, state: dict) -> int:
+    exported = 0
+    output = _ParquetFile(os.path.join(directory, "data.parquet"), schema)
+    for rows in _stream(engine, statement):
+        output.write(_record_batch(rows, schema))
+        exported += len(rows)
+    output.close()
+    return exported
+
+
+def _refresh_append(engine: Engine, directory: str, statement, schema, state: dict, key) -> int:
+    # Rows recorded before the cutoff are final and go to a new part file. A row's key is set when its
+    # transaction starts, so newer ones may still be uncommitted: they go to the tail file, which is
+    # rewritten every snapshot until they pass the cutoff.
+    with engine.connect() as conn:
+        cutoff = conn.scalar(select(func.now())) - timedelta(seconds=ANALYTICS_APPEND_LAG)
+    exported_before = state.get("exported_before")
+    if exported_before is None:
+        # First export, or files written by an older version: start over
+        for name in os.listdir(directory):
+            if name.startswith("part-") or name == TAIL_FILE:
+                os.remove(os.path.join(directory, name))
+    else:
+        exported_before = datetime.fromisoformat(exported_before)
+
+    exported = 0
+    final = statement.where(key < cutoff)
+    if exported_before is not None:
+        final = final.where(key >= exported_before)
+    output = None
+    for rows in _stream(engine, final.order_by(key)):
+        if output is None:
+            output = _ParquetFile(os.path.join(directory, f"part-{cutoff:%Y%m%d%H%M%S%f}.parquet"), schema)
+        output.write(_record_batch(rows, schema))
+        exported += len(rows)
+    if output is not None:
+        output.close()
+
+    output = _ParquetFile(os.path.join(directory, TAIL_FILE), schema)
+    for rows in _stream(engine, statement.where(key >= cutoff).order_by(key)):
+        output.write(_record_batch(rows, schema))
+        exported += len(rows)
+    output.close()
+    state["exported_before"] = cutoff.isoformat()
+
+    parts = sorted(name for name in os.listdir(directory) if name.startswith("part-"))
+    if len(parts) > ANALYTICS_MAX_PARTS:
+        _compact(directory, parts, key.name)
+    return exported
+
+
+def _compact(directory: str, parts: list[str], order_by: str):
+    """Merge part files into one named after the first, streaming through DuckDB"""
+    import duckdb
+
+    paths = [os.path.join(directory, name) for name in parts]
+    merged = paths[0] + ".tmp"
+    with duckdb.connect() as conn:
+        conn.execute(
+            f"COPY (SELECT * FROM read_parquet($paths) ORDER BY {order_by}) "
+            f"TO '{_quote(merged)}' (FORMAT parquet, COMPRESSION zstd)",
+            {"paths": paths}
+        )
+    os.replace(merged, paths[0])
+    for path in paths[1:]:
+        os.remove(path)
+
+
+def _refresh_monthly(engine: Engine, directory: str, statement, schema, state: dict, key) -> int:
+    # Months before `since` are final once exported; the first snapshot exports every month
+    since = None
+    if state.get("exported"):
+        current = _month_start(date.today())
+        index = current.year * 12 + current.month - 1 - ANALYTICS_REFRESH_MONTHS
+        since = date(index // 12, index % 12 + 1, 1)
+        statement = statement.where(key >= since)
+    key_index = _column_index(statement, key)
+
+    exported, written, output, month = 0, set(), None, None
+    for rows in _stream(engine, statement.order_by(key)):
+        start = 0
+        for i, row in enumerate(rows):
+            row_month = f"{row[key_index]:%Y-%m}"
+            if row_month != month:
+                if i > start:
+                    output.write(_record_batch(rows[start:i], schema))
+                if output is not None:
+                    output.close()
+                month, start = row_month, i
+                output = _ParquetFile(os.path.join(directory, f"{month}.parquet"), schema)
+                written.add(f"{month}.parquet")
+        if start < len(rows):
+            output.write(_record_batch(rows[start:], schema))
+        exported += len(rows)
+    if output is not None:
+        output.close()
+
+    # A refreshed month with no rows left (e.g. all moved) must not keep its old file
+    if since is not None:
+        for name in os.listdir(directory):
+            if name.endswith(".parquet") and name[:1].isdigit() and name >= f"{since:%Y-%m}" and name not in written:
+                os.remove(os.path.join(directory, name))
+    state["exported"] = True
+    return exported
+
+
+def _read_state(analytics_dir: str) -> dict:
+    try:
+        with open(os.path.join(analytics_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def snapshot(engine: Engine, analytics_dir: str = ANALYTICS_DIR, datasets: list[str] | None = None, rebuild: bool = False) -> dict[str, int]:
+    """Export the reporting tables from engine (normally a replica) to Parquet; returns rows exported per dataset.
+
+    Incremental unless rebuild: appended datasets fetch rows recorded since the last snapshot and
+    monthly ones only their recent months. Each file is written under a temporary name and
+    swapped in, so reports running meanwhile read either the old or the new file. Snapshots of
+    the same analytics_dir, from any process, take turns on a lock file.
+    """
+    os.makedirs(analytics_dir, exist_ok=True)
+    with open(os.path.join(analytics_dir, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = {} if rebuild else _read_state(analytics_dir)
+        exported = {}
+        for name in datasets or DATASETS:
+            statement, mode, key = DATASETS[name]
+            directory = os.path.join(analytics_dir, name)
+            if rebuild and os.path.isdir(directory):
+                for file_name in os.listdir(directory):
+                    os.remove(os.path.join(directory, file_name))
+            os.makedirs(directory, exist_ok=True)
+
+            schema = _arrow_schema(statement)
+            if not os.path.exists(os.path.join(directory, SCHEMA_FILE)):
+                # An empty file fixing the column types, so the view works before any rows exist
+                output = _ParquetFile(os.path.join(directory, SCHEMA_FILE), schema)
+                output.close()
+
+            dataset_state = state.setdefault("datasets", {}).setdefault(name, {})
+            if mode == "full":
+                exported[name] = _refresh_full(engine, directory, statement, schema, dataset_state)
+            elif mode == "append":
+                exported[name] = _refresh_append(engine, directory, statement, schema, dataset_state, key)
+            else:
+                exported[name] = _refresh_monthly(engine, directory, statement, schema, dataset_state, key)
+
+        state["snapshot_at"] = datetime.now(timezone.utc).isoformat()
+        path = os.path.join(analytics_dir, STATE_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+    return exported
+
+
+def _quote(path: str) -> str:
+    return path.replace("'", "''")
+
+
+def snapshot_time(analytics_dir: str = ANALYTICS_DIR) -> str | None:
+    """When the last snapshot finished (ISO 8601), or None if there hasn't been one"""
+    return _read_state(analytics_dir).get("snapshot_at")
+
+
+def run_report(report: str, start: date | None = None, end: date | None = None,
+               analytics_dir: str = ANALYTICS_DIR) -> list[dict[str, Any]]:
+    """Run one of REPORTS over the latest snapshot with an in-process DuckDB; the database is not queried"""
+    import duckdb
+
+    with duckdb.connect(config={"threads": ANALYTICS_THREADS}) as conn:
+        for name in DATASETS:
+            pattern = os.path.join(analytics_dir, name, "*.parquet")
+            conn.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{_quote(pattern)}')")
+        cursor = conn.execute(REPORTS[report], {"start": start, "end": end})
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def schedule_snapshot(db: Session, delay_seconds: float = 0):
+    """Queue a snapshot unless one is already pending; does not commit"""
+    pending = db.scalar(select(Job.job_id).where(Job.kind == SNAPSHOT_JOB, Job.status == JobStatus.PENDING).limit(1))
+    if pending is None:
+        enqueue(db, SNAPSHOT_JOB, {}, delay_seconds=delay_seconds)
+        db.flush()
+
+
+@job_handler(SNAPSHOT_JOB)
+def snapshot_job(db: Session, payloads: list[dict]):
+    from app.database import get_read_engine
+
+    exported = snapshot(get_read_engine())
+    logger.info("Analytics snapshot exported %s", exported)
+    if ANALYTICS_SNAPSHOT_INTERVAL:
+        schedule_snapshot(db, delay_seconds=ANALYTICS_SNAPSHOT_INTERVAL)
@@ -0,0 +1,116 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import time
+from time import monotonic
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from app import queries
+from models.group_class import DaysOfWeek
+
+# Other processes' availability writes show up through cache_version (kept by a trigger, see
+# create_trigger.sql). Databases without the trigger fall back to this upper bound on staleness;
+# this process always rebuilds right after its own writes.
+AVAILABILITY_INDEX_TTL = float(os.getenv("AVAILABILITY_INDEX_TTL", 300))
+
+_DAY_INDEX = {day: index for index, day in enumerate(DaysOfWeek)}
+
+
+def week_second(day: DaysOfWeek, at: time) -> int:
+    """Seconds since Monday 00:00"""
+    return _DAY_INDEX[day] * 86400 + at.hour * 3600 + at.minute * 60 + at.second
+
+
+def _merge(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sorted, non-overlapping intervals; touching windows (8-12, 12-17) become one"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class AvailabilityIndex:
+    """Weekly availability of every trainer as merged [start, end) intervals in seconds of the week.
+
+    covers() is a binary search in one trainer's intervals. trainers_free_at() is a binary search
+    over the elementary segments between all interval boundaries, each holding the trainers
+    available throughout it.
+    """
+
+    def __init__(self, windows: Iterable[tuple[int, DaysOfWeek, time, time]]):
+        per_trainer = defaultdict(list)
+        for trainer_id, day, start, end in windows:
+            per_trainer[trainer_id].append((week_second(day, start), week_second(day, end)))
+
+        self._starts: dict[int, list[int]] = {}
+        self._ends: dict[int, list[int]] = {}
+        boundaries = set()
+        for trainer_id, intervals in per_trainer.items():
+            merged = _merge(intervals)
+            self._starts[trainer_id] = [start for start, _ in merged]
+            self._ends[trainer_id] = [end for _, end in merged]
+            for start, end in merged:
+                boundaries.update((start, end))
+
+        self._boundaries = sorted(boundaries)
+        segments = [set() for _ in self._boundaries]
+        for trainer_id in per_trainer:
+            for start, end in zip(self._starts[trainer_id], self._ends[trainer_id]):
+                for segment in range(bisect_left(self._boundaries, start), bisect_left(self._boundaries, end)):
+                    segments[segment].add(trainer_id)
+        self._segments = [frozenset(trainers) for trainers in segments]
+
+    def covers(self, trainer_id: int, day: DaysOfWeek, start: time, end: time) -> bool:
+        """Whether one availability window (after merging) spans all of [start, end) on that day"""
+        starts = self._starts.get(trainer_id)
+        if not starts:
+            return False
+        i = bisect_right(starts, week_second(day, start)) - 1
+        return i >= 0 and self._ends[trainer_id][i] >= week_second(day, end)
+
+    def trainers_free_at(self, day: DaysOfWeek, at: time) -> frozenset[int]:
+        """Trainers whose availability includes the given moment"""
+        i = bisect_right(self._boundaries, week_second(day, at)) - 1
+        return self._segments[i] if i >= 0 else frozenset()
+
+
+_index: AvailabilityIndex | None = None
+_built_at = 0.0
+_version = 0
+_generation = 0
+_lock = threading.Lock()
+
+
+def get_availability_index(db: Session) -> AvailabilityIndex:
+    """The cached index, rebuilt from the database when availability changed (one primary key lookup
+    of cache_version tells), when invalidated, or when older than AVAILABILITY_INDEX_TTL
+    """
+    global _index, _built_at, _version
+    version = db.scalar(queries.availability_version) or 0
+    index = _index
+    if index is not None and _version == version and monotonic() - _built_at < AVAILABILITY_INDEX_TTL:
+        return index
+
+    with _lock:
+        if _index is not None and _version == version and monotonic() - _built_at < AVAILABILITY_INDEX_TTL:
+            return _index
+        generation = _generation
+        # Rows read after the version, so the index is at least as new as the version it's stored with
+        index = AvailabilityIndex(db.execute(queries.active_availability).all())
+        # An invalidation while we were reading means our rows may predate that write
+        if generation == _generation:
+            _index, _built_at, _version = index, monotonic(), version
+    return index
+
+
+def invalidate_availability_index():
+    """Drop the cached index; call after committing availability changes"""
+    global _index, _generation
+    _generation += 1
+    _index = None
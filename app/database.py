@@ -1,19 +1,179 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
 from dotenv import load_dotenv
+import hashlib
+import hmac
+import itertools
+import math
 import os
+import secrets
+import threading
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL: DATABASE_URL = DATABASE_URL.replace('postgress', 'postgresql', 1)
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Compiled-statement cache per engine (SQLAlchemy's default is 500)
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", 1200))
+# With the psycopg 3 driver (postgresql+psycopg://...) a statement run this many times on a
+# connection becomes a server-side prepared statement, so PostgreSQL stops re-planning it.
+# Set to "off" behind PgBouncer in transaction mode. psycopg2 has no equivalent.
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "1")
+
+
+def _create_engine(url):
+    connect_args = {}
+    if url and url.startswith("postgresql+psycopg://"):
+        connect_args["prepare_threshold"] = None if DB_PREPARE_THRESHOLD == "off" else int(DB_PREPARE_THRESHOLD)
+    return create_engine(url, query_cache_size=DB_QUERY_CACHE_SIZE, connect_args=connect_args)
+
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# Optional read replicas, comma separated; read-only endpoints are spread across them round-robin
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# After a write, the client's reads check for this long that their replica has replayed it
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+# Signs the write position handed to clients; set the same value on every API worker
+READ_YOUR_WRITES_SECRET = os.getenv("READ_YOUR_WRITES_SECRET") or secrets.token_hex(32)
+READ_YOUR_WRITES_COOKIE = "written_lsn"
+READ_YOUR_WRITES_HEADER = "X-Written-LSN"
+
+# Engines are created on first use rather than at import: creating one imports the DB driver,
+# and scripts or workers that never touch the database shouldn't pay for it.
+# `from app.database import engine, SessionLocal, replica_engines` still works (see __getattr__).
+_engine = None
+_session_factory = None
+_replica_engines = None
+_replica_sessions = None
+_replica_engine_cycle = None
+_init_lock = threading.Lock()
+_replica_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                _engine = _create_engine(DATABASE_URL)
+    return _engine
+
+
+def get_sessionmaker():
+    global _session_factory
+    if _session_factory is None:
+        engine = get_engine()
+        with _init_lock:
+            if _session_factory is None:
+                factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                event.listen(factory, "after_commit", _remember_commit)
+                _session_factory = factory
+    return _session_factory
+
+
+def get_replica_engines():
+    global _replica_engines, _replica_sessions, _replica_engine_cycle
+    if _replica_engines is None:
+        with _init_lock:
+            if _replica_engines is None:
+                replicas = [_create_engine(url.replace('postgress', 'postgresql', 1)) for url in DATABASE_REPLICA_URLS]
+                _replica_sessions = itertools.cycle(
+                    [sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in replicas]
+                )
+                _replica_engine_cycle = itertools.cycle(replicas)
+                _replica_engines = replicas
+    return _replica_engines
+
+
+def get_read_engine():
+    """Engine for long read-only work such as exports: the next replica, or the primary without replicas"""
+    if not get_replica_engines():
+        return get_engine()
+    with _replica_lock:
+        return next(_replica_engine_cycle)
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    if name == "replica_engines":
+        return get_replica_engines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _remember_commit(session):
+    session.info["committed"] = True
+
+
+# Read-your-writes: after a committed write the client is handed the primary's WAL position (LSN),
+# signed, as a cookie and a header. Its reads use a replica only once that replica has replayed up
+# to it, whichever worker serves them.
+_current_lsn = text("SELECT pg_current_wal_lsn()::text")
+# NULL when the "replica" is really a primary, which has everything
+_replayed_lsn = text("SELECT coalesce(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), true)")
+
+
+def _signature(lsn: str) -> str:
+    return hmac.new(READ_YOUR_WRITES_SECRET.encode(), lsn.encode(), hashlib.sha256).hexdigest()
+
+
+def _written_lsn(request: Request) -> str | None:
+    """The LSN of the caller's last write, if it sent one we signed"""
+    token = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not token:
+        return None
+    lsn, _, signature = token.rpartition(".")
+    if not lsn or not hmac.compare_digest(signature, _signature(lsn)):
+        return None
+    return lsn
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """Hands the client the signed write position recorded by get_db; only needed with replicas"""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        lsn = getattr(request.state, "written_lsn", None)
+        if lsn:
+            token = f"{lsn}.{_signature(lsn)}"
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE, token,
+                max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax"
+            )
+            response.headers[READ_YOUR_WRITES_HEADER] = token
+        return response
+
+
+def get_db(request: Request):
+    db = get_sessionmaker()()
+    try:
+        yield db
+    finally:
+        if db.info.get("committed") and get_replica_engines() and db.get_bind().dialect.name == "postgresql":
+            # Any replica that has replayed up to here has this request's writes
+            request.state.written_lsn = db.scalar(_current_lsn)
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: a replica that has the caller's last write, else the primary"""
+    db = None
+    if get_replica_engines():
+        with _replica_lock:
+            db = next(_replica_sessions)()
+        lsn = _written_lsn(request)
+        if lsn is not None and not db.scalar(_replayed_lsn, {"lsn": lsn}):
+            db.close()
+            db = None
+    if db is None:
+        db = get_sessionmaker()()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
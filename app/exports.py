@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import Iterator
+
+from sqlalchemy import String, cast, select
+from sqlalchemy.engine import Engine
+
+from models.class_registration import ClassRegistration
+from models.personal_training_session import PersonalTrainingSession
+from models.user import User, Member
+
+# Rows fetched per round trip from the server-side cursor, and formatted per chunk written
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+
+SUPPORTED_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# dataset -> (Core select of plain columns, date column the start/end filters apply to).
+# Enums are cast to text in SQL so rows need no per-value conversion in Python.
+DATASETS = {
+    "members": (
+        select(
+            User.user_id,
+            User.first_name,
+            User.last_name,
+            User.email,
+            User.phone,
+            Member.date_of_birth,
+            cast(Member.membership_status, String).label("membership_status"),
+            User.created_at,
+        ).select_from(Member).join(User, Member.user_id == User.user_id).order_by(User.user_id),
+        User.created_at,
+    ),
+    "sessions": (
+        select(
+            PersonalTrainingSession.session_id,
+            PersonalTrainingSession.member_id,
+            PersonalTrainingSession.trainer_id,
+            PersonalTrainingSession.room_id,
+            PersonalTrainingSession.session_date,
+            PersonalTrainingSession.start_time,
+            PersonalTrainingSession.end_time,
+            cast(PersonalTrainingSession.status, String).label("status"),
+        ),
+        PersonalTrainingSession.session_date,
+    ),
+    "registrations": (
+        select(
+            ClassRegistration.registration_id,
+            ClassRegistration.member_id,
+            ClassRegistration.class_id,
+            ClassRegistration.occurrence_id,
+            ClassRegistration.registration_date,
+            cast(ClassRegistration.attended_status, String).label("attended_status"),
+        ),
+        ClassRegistration.registration_date,
+    ),
+}
+
+
+def export_rows(engine: Engine, dataset: str, fmt: str, start: date | None = None, end: date | None = None) -> Iterator[bytes]:
+    """Yield a dataset as CSV (with header) or NDJSON, one encoded chunk per EXPORT_CHUNK_ROWS rows.
+
+    Rows come from a server-side cursor on a connection of its own, so memory stays flat
+    however large the table is. start (inclusive) and end (exclusive) also let PostgreSQL
+    skip monthly partitions outside the range.
+    """
+    statement, date_column = DATASETS[dataset]
+    if start:
+        statement = statement.where(date_column >= start)
+    if end:
+        statement = statement.where(date_column < end)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(statement)
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():  # header only, for an empty export
+                yield buffer.getvalue().encode()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+                ).encode()
@@ -0,0 +1,88 @@
+import logging
+from typing import Iterable
+
+from sqlalchemy import and_, case, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.jobs import job_handler
+from models.fitness_goal import FitnessGoal, GoalComparator, GoalMetric, GoalStatusEnum
+from models.health_metric import HealthMetric
+
+logger = logging.getLogger(__name__)
+
+# Active goals with a structured target, i.e. the ones the evaluator can measure
+_measurable = and_(FitnessGoal.status == GoalStatusEnum.ACTIVE, FitnessGoal.metric.is_not(None))
+
+
+def evaluate_goals(db: Session, member_ids: Iterable[int] | None = None) -> tuple[int, int]:
+    """Update progress of measurable goals from each member's newest health metric.
+
+    One UPDATE ... FROM for all goals, covering only metrics newer than a goal's evaluated_at,
+    so re-running without new metrics changes nothing. Goals whose target is met are completed.
+    Limited to member_ids when given. Returns (goals updated, goals completed); does not commit.
+    """
+    scope = [_measurable]
+    if member_ids is not None:
+        scope.append(FitnessGoal.member_id.in_(list(member_ids)))
+    pending = select(FitnessGoal.member_id).where(*scope)
+
+    # Metrics older than every goal's evaluated_at can't change anything, so skip their partitions
+    oldest_evaluated, never_evaluated = db.execute(
+        select(
+            func.min(FitnessGoal.evaluated_at),
+            func.count(FitnessGoal.goal_id) - func.count(FitnessGoal.evaluated_at)
+        ).where(*scope)
+    ).one()
+
+    newest = select(
+        HealthMetric.member_id,
+        HealthMetric.recorded_at,
+        HealthMetric.weight,
+        HealthMetric.body_fat_percentage,
+        HealthMetric.heart_rate,
+        func.row_number().over(
+            partition_by=HealthMetric.member_id,
+            order_by=HealthMetric.recorded_at.desc()
+        ).label("rank")
+    ).where(HealthMetric.member_id.in_(pending))
+    if oldest_evaluated is not None and not never_evaluated:
+        newest = newest.where(HealthMetric.recorded_at > oldest_evaluated)
+    newest = newest.subquery()
+
+    current = case(
+        (FitnessGoal.metric == GoalMetric.WEIGHT, newest.c.weight),
+        (FitnessGoal.metric == GoalMetric.BODY_FAT_PERCENTAGE, newest.c.body_fat_percentage),
+        else_=newest.c.heart_rate
+    )
+    baseline = func.coalesce(FitnessGoal.baseline_value, current)
+    met = or_(
+        and_(FitnessGoal.comparator == GoalComparator.AT_MOST, current <= FitnessGoal.target_number),
+        and_(FitnessGoal.comparator == GoalComparator.AT_LEAST, current >= FitnessGoal.target_number)
+    )
+    # Share of the distance from baseline to target covered; negative when moving the wrong way
+    covered = func.coalesce((current - baseline) * 100 / func.nullif(FitnessGoal.target_number - baseline, 0), 0)
+
+    statement = update(FitnessGoal).where(
+        *scope,
+        FitnessGoal.member_id == newest.c.member_id,
+        newest.c.rank == 1,
+        or_(FitnessGoal.evaluated_at.is_(None), newest.c.recorded_at > FitnessGoal.evaluated_at)
+    ).values(
+        baseline_value=baseline,
+        progress=case((met, 100), (covered < 0, 0), else_=covered),
+        status=case((met, literal(GoalStatusEnum.COMPLETED, FitnessGoal.status.type)), else_=FitnessGoal.status),
+        completed_at=case((met, newest.c.recorded_at), else_=FitnessGoal.completed_at),
+        evaluated_at=newest.c.recorded_at
+    ).returning(FitnessGoal.goal_id, FitnessGoal.status).execution_options(synchronize_session=False)
+
+    updated = db.execute(statement).all()
+    completed = sum(1 for _, goal_status in updated if goal_status == GoalStatusEnum.COMPLETED)
+    return len(updated), completed
+
+
+@job_handler("goals.evaluate")
+def evaluate_goals_job(db: Session, payloads: list[dict]):
+    # Every member who logged a metric since the last batch, in one statement
+    updated, completed = evaluate_goals(db, {payload["member_id"] for payload in payloads})
+    if updated:
+        logger.info("Evaluated %s goals, %s completed", updated, completed)
@@ -0,0 +1,200 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from anyio import CancelScope
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.database import get_engine
+from models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+# How long a claimed key stays "in progress"; if its request never finishes (crashed worker,
+# lost connection), a retry after this takes the key over
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", 60))
+# Expired keys deleted each time a new key is claimed, so the table keeps itself trimmed
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", 100))
+# Responses larger than this (e.g. streamed import reports) are passed through, not stored
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", 64 * 1024))
+
+IDEMPOTENT_METHODS = ("POST", "PUT")
+IDEMPOTENT_PREFIXES = ("/members", "/trainers", "/admin")
+# Transient outcomes the client should genuinely retry
+UNSTORED_STATUS_CODES = (409, 429)
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int | None = None  # None while the first request is still running
+    body: bytes = b""
+    media_type: str | None = None
+
+
+class IdempotencyStore:
+    """Idempotency keys and their responses in the idempotency_key table, shared by every worker.
+
+    Each call is one short transaction on the primary. A claim only holds its key for
+    lease_seconds; complete() then keeps the response for ttl_seconds. An expired key is reclaimed
+    by the next request using it, and every claim deletes up to IDEMPOTENCY_PURGE_BATCH other
+    expired keys.
+    """
+
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+                 lease_seconds: int = IDEMPOTENCY_LEASE_SECONDS, engine=None):
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._engine = engine
+
+    @property
+    def engine(self):
+        return self._engine or get_engine()
+
+    def begin(self, key: str, fingerprint: str) -> StoredResponse | None:
+        """Claim a key for a new request; returns the existing entry if the key was already seen"""
+        now = datetime.now(timezone.utc)
+        claim = pg_insert(IdempotencyKey).values(
+            key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=self.lease_seconds)
+        )
+        claim = claim.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={
+                "fingerprint": claim.excluded.fingerprint,
+                "status_code": None,
+                "body": None,
+                "media_type": None,
+                "expires_at": claim.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= now
+        ).returning(IdempotencyKey.key)
+
+        with self.engine.begin() as conn:
+            if conn.execute(claim).first() is not None:
+                conn.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(
+                    select(IdempotencyKey.key).where(IdempotencyKey.expires_at <= now).limit(IDEMPOTENCY_PURGE_BATCH)
+                )))
+                return None
+            # The conflicting insert left the row locked, so it can't vanish before we read it
+            entry = conn.execute(
+                select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.body, IdempotencyKey.media_type)
+                .where(IdempotencyKey.key == key)
+            ).one()
+        return StoredResponse(entry.fingerprint, entry.status_code, entry.body or b"", entry.media_type)
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: bytes, media_type: str | None):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(IdempotencyKey)
+                .where(_claimed(key, fingerprint))
+                .values(status_code=status_code, body=body, media_type=media_type, expires_at=expires_at)
+            )
+
+    def abandon(self, key: str, fingerprint: str):
+        """Release a claimed key so the client can retry it"""
+        with self.engine.begin() as conn:
+            conn.execute(delete(IdempotencyKey).where(_claimed(key, fingerprint)))
+
+
+def _claimed(key: str, fingerprint: str):
+    # Still our claim: not completed, and not taken over by a different request after the lease ran out
+    return (
+        (IdempotencyKey.key == key)
+        & (IdempotencyKey.fingerprint == fingerprint)
+        & IdempotencyKey.status_code.is_(None)
+    )
+
+
+store = IdempotencyStore()
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """Replays the stored response for POST/PUT requests that repeat an Idempotency-Key.
+
+    Replays never reach the routers, so retried bookings skip validation and the endpoint; the
+    only database work is the key lookup. Uploads (multipart bodies, e.g. member imports) are
+    passed through: hashing them would hold the whole file in memory, and their streamed
+    responses are never stored anyway.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if (
+            key is None
+            or request.method not in IDEMPOTENT_METHODS
+            or not request.url.path.startswith(IDEMPOTENT_PREFIXES)
+            or request.headers.get("content-type", "").startswith("multipart/")
+        ):
+            return await call_next(request)
+
+        scoped_key = f"{request.method} {request.url.path} {key}"
+        fingerprint = hashlib.sha256(await request.body()).hexdigest()
+
+        existing = await run_in_threadpool(store.begin, scoped_key, fingerprint)
+        if existing is not None:
+            if existing.fingerprint != fingerprint:
+                return JSONResponse(
+                    status_code=422,
+                    content={"detail": f"{IDEMPOTENCY_HEADER} was already used with a different request body"}
+                )
+            if existing.status_code is None:
+                return JSONResponse(
+                    status_code=409,
+                    content={"detail": "A request with this idempotency key is still in progress"},
+                    headers={"Retry-After": "1"}
+                )
+            return Response(
+                content=existing.body,
+                status_code=existing.status_code,
+                media_type=existing.media_type,
+                headers={"Idempotent-Replayed": "true"}
+            )
+
+        try:
+            response = await call_next(request)
+            if response.status_code >= 500 or response.status_code in UNSTORED_STATUS_CODES:
+                await run_in_threadpool(store.abandon, scoped_key, fingerprint)
+                return response
+
+            # Buffer the body so it can be stored, unless it turns out to be too large
+            chunks = []
+            size = 0
+            body_iterator = response.body_iterator
+            async for chunk in body_iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > IDEMPOTENCY_MAX_BODY_BYTES:
+                    await run_in_threadpool(store.abandon, scoped_key, fingerprint)
+
+                    async def remaining():
+                        for buffered in chunks:
+                            yield buffered
+                        async for rest in body_iterator:
+                            yield rest
+
+                    response.body_iterator = remaining()
+                    return response
+
+            body = b"".join(chunks)
+            await run_in_threadpool(
+                store.complete, scoped_key, fingerprint, response.status_code, body, response.headers.get("content-type")
+            )
+        except BaseException:
+            # Including cancellation when the client disconnects; shielded so the release still runs
+            with CancelScope(shield=True):
+                await run_in_threadpool(store.abandon, scoped_key, fingerprint)
+            raise
+
+        async def stored():
+            yield body
+
+        # The original response keeps its raw headers, so repeated ones like Set-Cookie survive
+        response.body_iterator = stored()
+        return response
@@ -0,0 +1,234 @@
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", 100))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+# RUNNING jobs whose lease hasn't been renewed for this long belong to a runner that died and are
+# handed out again; a live runner renews the leases of its claimed jobs every third of this
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+# Claimed batches waiting for a worker; when full the poller stops claiming (backpressure)
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", JOB_WORKERS * 2))
+
+# kind -> handler(db, payloads); handlers get every claimed payload of their kind at once
+_handlers: dict[str, Callable[[Session, list[dict]], None]] = {}
+
+
+def job_handler(kind: str):
+    """Register a function as the handler for jobs of the given kind"""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def schedule_recurring_jobs(db: Session):
+    """Queue the self-rescheduling session sweep and analytics snapshots unless already queued"""
+    from app import analytics
+    from app.session_sweeper import schedule_session_sweep, SESSION_SWEEP_INTERVAL
+
+    if SESSION_SWEEP_INTERVAL:
+        schedule_session_sweep(db)
+    if analytics.ANALYTICS_SNAPSHOT_INTERVAL:
+        analytics.schedule_snapshot(db)
+
+
+def enqueue(db: Session, kind: str, payload: dict, delay_seconds: float = 0) -> Job:
+    """Add a job in the caller's transaction, so it exists only if the caller's work commits"""
+    job = Job(kind=kind, payload=payload, status=JobStatus.PENDING)
+    if delay_seconds:
+        job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+    db.add(job)
+    return job
+
+
+class JobRunner:
+    """Polls the job table and runs claimed jobs on a pool of worker threads.
+
+    Jobs are claimed with FOR UPDATE SKIP LOCKED, so several processes can share a table.
+    Failed batches are retried with exponential backoff until JOB_MAX_ATTEMPTS.
+
+    A claim is identified by (job_id, attempts): a heartbeat thread keeps renewing locked_at for the
+    claims this runner holds, however long their handler runs, and a batch is only recorded as done
+    or failed if all its claims are still held, otherwise the handler's work is rolled back.
+    """
+
+    def __init__(self, session_factory, workers: int = JOB_WORKERS, batch_size: int = JOB_BATCH_SIZE,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._batches = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        # job_id -> attempts of every claim this runner holds, from claim until recorded
+        self._held: dict[int, int] = {}
+        self._held_lock = threading.Lock()
+
+    def start(self):
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._poll, name="job-poller", daemon=True),
+            threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True),
+        ]
+        self._threads += [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _schedule_recurring(self):
+        db = self.session_factory()
+        try:
+            schedule_recurring_jobs(db)
+            db.commit()
+        except Exception:
+            # Closing the session rolls back; the jobs are queued again when the runner restarts
+            logger.exception("Scheduling recurring jobs failed")
+        finally:
+            db.close()
+
+    def _poll(self):
+        # On the poller thread, so starting a runner never waits for the database
+        self._schedule_recurring()
+        while not self._stopping.is_set():
+            try:
+                claimed = self._claim()
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._stopping.wait(self.poll_interval)
+
+    def _heartbeat(self):
+        while not self._stopping.wait(JOB_LEASE_SECONDS / 3):
+            with self._held_lock:
+                held = list(self._held.items())
+            if not held:
+                continue
+            db = self.session_factory()
+            try:
+                db.query(Job).filter(
+                    Job.status == JobStatus.RUNNING,
+                    tuple_(Job.job_id, Job.attempts).in_(held)
+                ).update({Job.locked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+                db.commit()
+            except Exception:
+                # Retried on the next beat; the lease only lapses after three missed ones
+                db.rollback()
+                logger.exception("Renewing the leases of %d jobs failed", len(held))
+            finally:
+                db.close()
+
+    def _claim(self) -> int:
+        now = datetime.now(timezone.utc)
+        db = self.session_factory()
+        try:
+            # Recover jobs whose worker died mid-run
+            db.query(Job).filter(
+                Job.status == JobStatus.RUNNING,
+                Job.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS)
+            ).update({Job.status: JobStatus.PENDING}, synchronize_session=False)
+
+            jobs = db.query(Job).filter(
+                Job.status == JobStatus.PENDING,
+                Job.run_after <= now
+            ).order_by(Job.run_after, Job.job_id).limit(self.batch_size).with_for_update(skip_locked=True).all()
+            by_kind = defaultdict(list)
+            for job in jobs:
+                job.status = JobStatus.RUNNING
+                job.attempts += 1
+                job.locked_at = now
+                by_kind[job.kind].append((job.job_id, job.attempts, job.payload))
+            db.commit()
+        finally:
+            db.close()
+        with self._held_lock:
+            self._held.update((job_id, attempts) for batch in by_kind.values() for job_id, attempts, _ in batch)
+
+        for kind, batch in by_kind.items():
+            # Blocks while workers are saturated, so we never claim more than we can run
+            while not self._stopping.is_set():
+                try:
+                    self._batches.put((kind, batch), timeout=self.poll_interval)
+                    break
+                except queue.Full:
+                    continue
+        return len(jobs)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                kind, batch = self._batches.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            try:
+                self._run_batch(kind, batch)
+            except Exception:
+                # e.g. the database went away; the batch's lease expires and it is claimed again
+                logger.exception("Job batch %s could not be run or recorded", kind)
+
+    def _run_batch(self, kind: str, batch: list[tuple[int, int, dict]]):
+        job_ids = [job_id for job_id, _, _ in batch]
+        db = self.session_factory()
+        try:
+            handler = _handlers.get(kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {kind!r}")
+            handler(db, [payload for _, _, payload in batch])
+            done = _held_claims(db, batch).delete(synchronize_session=False)
+            if done < len(batch):
+                # Some lease lapsed and another worker re-ran those jobs; keep only its results
+                db.rollback()
+                logger.warning("Job batch %s %s lost its claim; rolled back", kind, job_ids)
+            else:
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job batch %s %s failed", kind, job_ids)
+            try:
+                for job_id, attempts, _ in batch:
+                    retry = attempts < JOB_MAX_ATTEMPTS
+                    _held_claims(db, [(job_id, attempts, None)]).update({
+                        Job.status: JobStatus.PENDING if retry else JobStatus.FAILED,
+                        Job.run_after: datetime.now(timezone.utc) + timedelta(seconds=2 ** attempts),
+                        Job.last_error: str(e),
+                    }, synchronize_session=False)
+                db.commit()
+            except Exception:
+                # Left RUNNING; once the lease lapses _claim hands the jobs out again
+                db.rollback()
+                logger.exception("Recording the failure of job batch %s %s failed", kind, job_ids)
+        finally:
+            db.close()
+            with self._held_lock:
+                for job_id, _, _ in batch:
+                    self._held.pop(job_id, None)
+
+
+def _held_claims(db: Session, batch: list[tuple[int, int, dict]]):
+    """The batch's jobs, as long as they are still RUNNING under the claim that handed them out"""
+    return db.query(Job).filter(
+        Job.status == JobStatus.RUNNING,
+        tuple_(Job.job_id, Job.attempts).in_([(job_id, attempts) for job_id, attempts, _ in batch])
+    )
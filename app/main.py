@@ -1,28 +1,89 @@
+from contextlib import asynccontextmanager
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import members,trainers,admin
-
-
-app = FastAPI(
-    title="Gym Management System",
-    description="Health and Fitness Club Management API",
-    version="1.0.0"
-)
-app.include_router(members.router)
-# CORS middleware for frontend (we'll need this later)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-app.include_router(trainers.router)
-app.include_router(admin.router)
-@app.get("/")
-def root():
-    return {"message": "Gym Management System API", "status": "running"}
-
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+
+# Off by default: jobs run in `python manage.py run-jobs`, so API workers start without touching the database
+JOB_RUNNER_ENABLED = os.getenv("JOB_RUNNER_ENABLED", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Deferred follow-up work (notifications etc.) runs off the request path
+    runner = None
+    if JOB_RUNNER_ENABLED:
+        from app.database import get_sessionmaker
+        from app.jobs import JobRunner
+        from app import analytics, goals, notifications, room_allocation  # register job handlers
+        # Its poller thread queues the session sweep and analytics snapshots
+        runner = JobRunner(get_sessionmaker())
+        runner.start()
+    yield
+    if runner:
+        runner.stop()
+
+
+def create_app() -> FastAPI:
+    """Build the API. Routers (and through them the models) are imported here, not at module import,
+    and the database engine is only created when first used.
+
+    Run with `uvicorn app.main:create_app --factory`; `uvicorn app.main:app` also works.
+    """
+    from app.database import DATABASE_REPLICA_URLS, ReadYourWritesMiddleware
+    from app.idempotency import IdempotencyMiddleware
+    from app.profiling import ProfilingMiddleware, PROFILING_ENABLED
+    from app.rate_limit import RateLimitMiddleware
+    from app.routers import members, trainers, admin, locations
+
+    app = FastAPI(
+        title="Gym Management System",
+        description="Health and Fitness Club Management API",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.include_router(members.router)
+    if PROFILING_ENABLED:
+        # Innermost, so a profiled request's routing, validation, endpoint and rendering run in its task
+        app.add_middleware(ProfilingMiddleware)
+    if DATABASE_REPLICA_URLS:
+        # Hands writers the signed WAL position their next replica reads must have reached
+        app.add_middleware(ReadYourWritesMiddleware)
+    # Replays responses for retried POST/PUT requests carrying an Idempotency-Key
+    app.add_middleware(IdempotencyMiddleware)
+    # Outside idempotency, so excess requests get 429 before the key store or the routers touch
+    # the database; CORS still wraps those responses
+    app.add_middleware(RateLimitMiddleware)
+    # CORS middleware for frontend (we'll need this later)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify exact origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(trainers.router)
+    app.include_router(admin.router)
+    app.include_router(locations.router)
+
+    @app.get("/")
+    def root():
+        return {"message": "Gym Management System API", "status": "running"}
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    # `app.main:app` builds the application on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import os
+from datetime import date
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator
+
+from pydantic import BaseModel, EmailStr, ValidationError, field_validator
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.member_search import invalidate_member_search_index
+from app.security import hash_passwords
+from models.user import User, Member, MembershipStatus
+
+BATCH_SIZE = int(os.getenv("MEMBER_IMPORT_BATCH_SIZE", 1000))
+# Stored for rows imported without a password; verify_password never accepts it
+UNUSABLE_PASSWORD = "!"
+
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+
+class MemberImportRow(BaseModel):
+    first_name: str
+    last_name: str
+    email: EmailStr
+    password: str | None = None
+    phone: str | None = None
+    date_of_birth: date | None = None
+
+    @field_validator("password", "phone", "date_of_birth", mode="before")
+    @classmethod
+    def blank_as_none(cls, value):
+        # CSV has no null, so empty cells mean "not provided"
+        return None if value == "" else value
+
+
+def read_rows(stream: BinaryIO, fmt: str) -> Iterator[tuple[int, dict | str]]:
+    """Yield (line number, raw row) pairs, or (line number, error message) for unparseable lines"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_no, "Each line must be a JSON object"
+                continue
+            yield line_no, row
+    else:
+        raise ValueError(f"Unsupported format: {fmt}. Must be one of: {list(SUPPORTED_FORMATS)}")
+
+
+def import_members(db: Session, rows: Iterable[tuple[int, dict | str]]) -> Iterator[dict]:
+    """Import members in batches, yielding one report entry per input row.
+
+    Each batch costs one SELECT for existing emails, one multi-row INSERT ... RETURNING
+    for users, one multi-row INSERT for members and a commit, so memory stays at one batch.
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        yield from _import_batch(db, batch)
+
+
+def _import_batch(db: Session, batch: list[tuple[int, dict | str]]) -> list[dict]:
+    report = {}
+    valid = []
+    seen = set()
+
+    for line_no, raw in batch:
+        if isinstance(raw, str):
+            report[line_no] = {"line": line_no, "status": "invalid", "error": raw}
+            continue
+        try:
+            row = MemberImportRow.model_validate(raw)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            report[line_no] = {"line": line_no, "email": raw.get("email"), "status": "invalid", "error": errors}
+            continue
+        if row.email in seen:
+            report[line_no] = {"line": line_no, "email": row.email, "status": "duplicate", "error": "Duplicate email in file"}
+            continue
+        seen.add(row.email)
+        valid.append((line_no, row))
+
+    # One set-based lookup for every email in the batch
+    existing = set(db.scalars(select(User.email).where(User.email.in_(seen)))) if seen else set()
+    to_create = []
+    for line_no, row in valid:
+        if row.email in existing:
+            report[line_no] = {"line": line_no, "email": row.email, "status": "duplicate", "error": "Email already registered"}
+        else:
+            to_create.append((line_no, row))
+
+    if to_create:
+        try:
+            to_hash = [row.password for _, row in to_create if row.password]
+            hashes = iter(hash_passwords(to_hash))
+            user_rows = [
+                {
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "email": row.email,
+                    "password_hash": next(hashes) if row.password else UNUSABLE_PASSWORD,
+                    "phone": row.phone,
+                }
+                for _, row in to_create
+            ]
+            created = db.execute(
+                insert(User).returning(User.user_id, User.email, sort_by_parameter_order=True),
+                user_rows
+            ).all()
+            user_ids = {email: user_id for user_id, email in created}
+            db.execute(insert(Member), [
+                {
+                    "user_id": user_ids[row.email],
+                    "date_of_birth": row.date_of_birth,
+                    "membership_status": MembershipStatus.ACTIVE,
+                }
+                for _, row in to_create
+            ])
+            db.commit()
+            invalidate_member_search_index()
+        except Exception as e:
+            db.rollback()
+            for line_no, row in to_create:
+                report[line_no] = {"line": line_no, "email": row.email, "status": "error", "error": str(e.__cause__ or e)}
+        else:
+            for line_no, row in to_create:
+                report[line_no] = {"line": line_no, "email": row.email, "status": "created", "user_id": user_ids[row.email]}
+
+    return [report[line_no] for line_no in sorted(report)]
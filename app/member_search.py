@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+from collections import defaultdict
+from time import monotonic
+from typing import NamedTuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from models.user import Member, MembershipStatus, User
+
+# Seconds another process's registrations can take to show up in the in-memory fallback index
+MEMBER_SEARCH_INDEX_TTL = float(os.getenv("MEMBER_SEARCH_INDEX_TTL", 60))
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Shorter terms have no trigram to look up, so they match the start of a field instead
+MIN_TRIGRAM_TERM = 3
+
+
+class MemberHit(NamedTuple):
+    member_id: int
+    first_name: str
+    last_name: str
+    email: str
+    phone: str | None
+    membership_status: MembershipStatus
+    score: float
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _term_match(term: str):
+    columns = (User.first_name, User.last_name, User.email, User.phone)
+    if len(term) < MIN_TRIGRAM_TERM:
+        # lower(column) LIKE 'te%' is served by the text_pattern_ops btrees (create_index.sql)
+        return or_(*(func.lower(column).like(f"{_escape_like(term)}%", escape="\\") for column in columns))
+    # ILIKE '%term%' is served by the pg_trgm GIN indexes
+    return or_(*(column.ilike(f"%{_escape_like(term)}%", escape="\\") for column in columns))
+
+
+def _search_postgresql(db: Session, terms: list[str], query: str, limit: int, offset: int) -> list[MemberHit]:
+    # Every term must match some field, each through an index; similarity() ranks whole-query matches first
+    matches = [_term_match(term) for term in terms]
+    score = func.greatest(
+        func.similarity(func.concat_ws(" ", User.first_name, User.last_name), query),
+        func.similarity(User.email, query),
+        func.similarity(func.coalesce(User.phone, ""), query)
+    )
+    rows = db.execute(
+        select(
+            User.user_id, User.first_name, User.last_name, User.email, User.phone,
+            Member.membership_status, score.label("score")
+        ).join(
+            Member, Member.user_id == User.user_id
+        ).where(
+            and_(*matches)
+        ).order_by(
+            score.desc(), User.last_name, User.first_name, User.user_id
+        ).limit(limit).offset(offset)
+    ).all()
+    return [MemberHit(*row) for row in rows]
+
+
+def _trigrams(text: str) -> set[str]:
+    """pg_trgm's trigrams: per lowercased word, padded with two spaces before and one after"""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _contains(field: str, term: str) -> bool:
+    return field.startswith(term) if len(term) < MIN_TRIGRAM_TERM else term in field
+
+
+class MemberSearchIndex:
+    """In-memory stand-in for the pg_trgm indexes, used when the database isn't PostgreSQL.
+
+    Posting lists map every substring trigram of every field to member ids; a term of three or more
+    characters only has to be checked against members holding all of its trigrams.
+    """
+
+    def __init__(self, rows):
+        self._members = {}
+        self._fields: dict[int, tuple[str, ...]] = {}
+        self._postings: dict[str, set[int]] = defaultdict(set)
+        for member_id, first_name, last_name, email, phone, membership_status in rows:
+            self._members[member_id] = (first_name, last_name, email, phone, membership_status)
+            fields = tuple(value.lower() for value in (first_name, last_name, email, phone or ""))
+            self._fields[member_id] = fields
+            for field in fields:
+                for i in range(len(field) - 2):
+                    self._postings[field[i:i + 3]].add(member_id)
+
+    def search(self, terms: list[str], query: str, limit: int, offset: int) -> list[MemberHit]:
+        candidates = None
+        for term in terms:
+            if len(term) >= MIN_TRIGRAM_TERM:
+                ids = set.intersection(*(self._postings.get(term[i:i + 3], set()) for i in range(len(term) - 2)))
+                candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            candidates = self._members.keys()
+
+        query_grams = _trigrams(query)
+        hits = []
+        for member_id in candidates:
+            fields = self._fields[member_id]
+            if all(any(_contains(field, term) for field in fields) for term in terms):
+                first_name, last_name, email, phone, membership_status = self._members[member_id]
+                score = max(
+                    _similarity(query_grams, _trigrams(f"{first_name} {last_name}")),
+                    _similarity(query_grams, _trigrams(email)),
+                    _similarity(query_grams, _trigrams(phone or ""))
+                )
+                hits.append(MemberHit(member_id, first_name, last_name, email, phone, membership_status, score))
+        hits.sort(key=lambda hit: (-hit.score, hit.last_name, hit.first_name, hit.member_id))
+        return hits[offset:offset + limit]
+
+
+_index: MemberSearchIndex | None = None
+_built_at = 0.0
+_generation = 0
+_lock = threading.Lock()
+
+
+def _get_index(db: Session) -> MemberSearchIndex:
+    global _index, _built_at
+    index = _index
+    if index is not None and monotonic() - _built_at < MEMBER_SEARCH_INDEX_TTL:
+        return index
+
+    with _lock:
+        if _index is not None and monotonic() - _built_at < MEMBER_SEARCH_INDEX_TTL:
+            return _index
+        generation = _generation
+        index = MemberSearchIndex(db.execute(
+            select(User.user_id, User.first_name, User.last_name, User.email, User.phone, Member.membership_status)
+            .join(Member, Member.user_id == User.user_id)
+        ).all())
+        if generation == _generation:
+            _index, _built_at = index, monotonic()
+    return index
+
+
+def invalidate_member_search_index():
+    """Drop the fallback index; call after committing member name, email or phone changes"""
+    global _index, _generation
+    _generation += 1
+    _index = None
+
+
+def search_members(db: Session, query: str, limit: int, offset: int = 0) -> list[MemberHit]:
+    """Members whose name, email or phone contain every word of query, best matches first.
+    Words shorter than MIN_TRIGRAM_TERM must start a field.
+    """
+    terms = query.lower().split()
+    if not terms:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgresql(db, terms, query, limit, offset)
+    return _get_index(db).search(terms, query, limit, offset)
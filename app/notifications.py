@@ -0,0 +1,34 @@
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.jobs import job_handler
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def _recipients(db: Session, payloads: list[dict]) -> dict[int, User]:
+    """Load every member mentioned in a batch with one query"""
+    member_ids = {payload["member_id"] for payload in payloads}
+    return {user.user_id: user for user in db.query(User).filter(User.user_id.in_(member_ids)).all()}
+
+
+# Notifications are logged until an email provider is configured
+
+@job_handler("notify.class_registration")
+def notify_class_registrations(db: Session, payloads: list[dict]):
+    users = _recipients(db, payloads)
+    for payload in payloads:
+        user = users.get(payload["member_id"])
+        if user:
+            logger.info("Notify %s: registered for %s on %s", user.email, payload["class_name"], payload["date"])
+
+
+@job_handler("notify.waitlist_promotion")
+def notify_waitlist_promotions(db: Session, payloads: list[dict]):
+    users = _recipients(db, payloads)
+    for payload in payloads:
+        user = users.get(payload["member_id"])
+        if user:
+            logger.info("Notify %s: promoted from the waitlist for occurrence %s", user.email, payload["occurrence_id"])
@@ -0,0 +1,100 @@
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.room_ledger import record_occurrences
+from models.class_occurrence import ClassOccurrence
+from models.group_class import GroupClass, DaysOfWeek
+
+# How far ahead dated occurrences exist; `manage.py generate-occurrences` rolls it forward
+OCCURRENCE_HORIZON_DAYS = int(os.getenv("CLASS_OCCURRENCE_HORIZON_DAYS", 28))
+
+_WEEKDAY_INDEX = {day: index for index, day in enumerate(DaysOfWeek)}
+
+
+def occurrence_dates(day: DaysOfWeek, start: date, end: date) -> list[date]:
+    """Every date in [start, end] falling on the given weekday"""
+    first = start + timedelta(days=(_WEEKDAY_INDEX[day] - start.weekday()) % 7)
+    return [first + timedelta(weeks=week) for week in range((end - first).days // 7 + 1)]
+
+
+def generate_occurrences(
+    db: Session,
+    horizon_days: int = OCCURRENCE_HORIZON_DAYS,
+    class_ids: list[int] | None = None
+) -> tuple[int, list[tuple[int, date]]]:
+    """Create missing occurrences from today through the horizon.
+
+    Returns how many were inserted and the (class_id, date) of those left out because their room
+    is already taken then, by a class, PT session or maintenance in room_occupancy or by another
+    occurrence created in the same call. Existing occurrences are left alone (ON CONFLICT DO NOTHING),
+    so this is safe to re-run. Does not commit.
+    """
+    start = date.today()
+    end = start + timedelta(days=horizon_days)
+
+    query = db.query(GroupClass)
+    if class_ids is not None:
+        query = query.filter(GroupClass.class_id.in_(class_ids))
+
+    rows = [
+        {
+            "class_id": group_class.class_id,
+            "room_id": group_class.room_id,
+            "occurrence_date": day,
+            "start_time": datetime.combine(day, group_class.start_time),
+            "end_time": datetime.combine(day, group_class.end_time),
+            "capacity": group_class.capacity,
+        }
+        for group_class in query.all()
+        for day in occurrence_dates(group_class.day, start, end)
+    ]
+    if not rows:
+        return 0, []
+
+    created = db.execute(
+        pg_insert(ClassOccurrence)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["class_id", "occurrence_date"])
+        .returning(
+            ClassOccurrence.occurrence_id,
+            ClassOccurrence.room_id,
+            ClassOccurrence.start_time,
+            ClassOccurrence.end_time,
+            ClassOccurrence.class_id,
+            ClassOccurrence.occurrence_date
+        )
+    ).all()
+    if not created:
+        return 0, []
+
+    # The same overlap probe PT bookings use, for all new occurrences at once; they aren't in
+    # the ledger yet, so each can only match someone else's booking
+    taken = set(db.scalars(queries.new_occurrence_room_conflicts, {
+        "occurrence_ids": [occurrence.occurrence_id for occurrence in created]
+    }))
+    # New occurrences can also clash with each other; the earliest in each room keeps it
+    room_free_from = {}
+    for occurrence in sorted(created, key=lambda occurrence: (occurrence.room_id or 0, occurrence.start_time)):
+        if occurrence.room_id is None or occurrence.occurrence_id in taken:
+            continue
+        if occurrence.room_id in room_free_from and occurrence.start_time < room_free_from[occurrence.room_id]:
+            taken.add(occurrence.occurrence_id)
+        else:
+            room_free_from[occurrence.room_id] = occurrence.end_time
+
+    if taken:
+        db.execute(
+            delete(ClassOccurrence)
+            .where(ClassOccurrence.occurrence_id.in_(list(taken)))
+            .execution_options(synchronize_session=False)
+        )
+    record_occurrences(db, [occurrence[:4] for occurrence in created if occurrence.occurrence_id not in taken])
+    clashes = sorted(
+        (occurrence.class_id, occurrence.occurrence_date) for occurrence in created if occurrence.occurrence_id in taken
+    )
+    return len(created) - len(taken), clashes
@@ -0,0 +1,255 @@
+import csv
+import glob
+import gzip
+import io
+import os
+import re
+import time
+from datetime import date
+from typing import Callable, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+# Tables that only ever grow, and the column each is range-partitioned on
+PARTITIONED_TABLES = {
+    "personal_training_session": "session_date",
+    "class_registration": "registration_date",
+    "health_metric": "recorded_at",
+}
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+# How long DETACH PARTITION may wait for its lock on the parent, during which it queues everything
+# else on the table, before it gives up and tries again later
+ARCHIVE_LOCK_TIMEOUT_MS = int(os.getenv("ARCHIVE_LOCK_TIMEOUT_MS", 2000))
+ARCHIVE_DETACH_ATTEMPTS = int(os.getenv("ARCHIVE_DETACH_ATTEMPTS", 5))
+
+# SQLSTATE of a lock_timeout expiring
+LOCK_NOT_AVAILABLE = "55P03"
+
+_MONTH_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+# A month archived again (rows that reached the default partition later) gets a numbered file
+_ARCHIVE_FILE = re.compile(r"_p(\d{4})(\d{2})(?:\.\d+)?\.csv\.gz$")
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _create_partition(conn, table: str, month: date) -> str:
+    """Create the monthly partition of a table, moving in any rows the default partition holds for that month"""
+    name = partition_name(table, month)
+    column = PARTITIONED_TABLES[table]
+    bounds = {"start": month, "end": _add_months(month, 1)}
+    # Writers to the default partition wait until the rows are moved and the partition attached
+    conn.execute(text(f"LOCK TABLE {table}_default IN EXCLUSIVE MODE"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE {column} >= :start AND {column} < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    return name
+
+
+def ensure_partitions(engine: Engine, months_ahead: int = PARTITION_MONTHS_AHEAD, since: date | None = None) -> list[str]:
+    """Create the default partition and monthly partitions from `since` (default: this month) through months_ahead.
+
+    Run before a month starts so new rows never land in the default partition; rows that
+    did are moved into the month's partition when it is created.
+    """
+    first = _month_start(since or date.today())
+    last = _add_months(_month_start(date.today()), months_ahead)
+    created = []
+
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+            month = first
+            while month <= last:
+                exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(table, month)}).scalar()
+                if exists is None:
+                    created.append(_create_partition(conn, table, month))
+                month = _add_months(month, 1)
+
+    return created
+
+
+def _partition_default_rows(engine: Engine, table: str, before: date) -> list[str]:
+    """Give the default partition's rows from months ending on or before `before` their monthly partitions"""
+    column = PARTITIONED_TABLES[table]
+    created = []
+    with engine.begin() as conn:
+        months = conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', {column})::date FROM {table}_default WHERE {column} < :before"
+        ), {"before": _month_start(before)}).scalars().all()
+        for month in sorted(months):
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(table, month)}).scalar() is None:
+                created.append(_create_partition(conn, table, month))
+    return created
+
+
+def monthly_partitions(engine: Engine, table: str) -> list[tuple[str, date]]:
+    """Attached monthly partitions of a table, oldest first"""
+    with engine.connect() as conn:
+        names = conn.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+        """), {"table": table}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = _MONTH_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _detached_partitions(engine: Engine, table: str) -> list[tuple[str, date]]:
+    """Monthly tables of a partitioned table that have been detached but not yet archived, oldest first"""
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT relname FROM pg_class WHERE relname LIKE :prefix AND relkind = 'r' AND NOT relispartition"
+        ), {"prefix": f"{table}_p%"}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = _MONTH_SUFFIX.search(name)
+        if match and name == partition_name(table, date(int(match.group(1)), int(match.group(2)), 1)):
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _detach_partition(engine: Engine, table: str, name: str):
+    """Detach a partition, retrying with backoff whenever the parent's lock isn't granted in time.
+
+    DETACH ... CONCURRENTLY isn't allowed on tables with a default partition, so this is a plain
+    DETACH: a catalog change taking ACCESS EXCLUSIVE on the parent, then the partition, in the same
+    order as statements that can't prune partitions. lock_timeout bounds how long it queues them.
+    """
+    for attempt in range(ARCHIVE_DETACH_ATTEMPTS):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = {ARCHIVE_LOCK_TIMEOUT_MS}"))
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            return
+        except OperationalError as e:
+            # psycopg2 calls it pgcode, psycopg 3 sqlstate
+            if LOCK_NOT_AVAILABLE not in (getattr(e.orig, "pgcode", None), getattr(e.orig, "sqlstate", None)):
+                raise
+            if attempt == ARCHIVE_DETACH_ATTEMPTS - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def _archive_path(table_dir: str, name: str) -> str:
+    path = os.path.join(table_dir, f"{name}.csv.gz")
+    number = 1
+    while os.path.exists(path) or os.path.exists(f"{path}.tmp"):
+        path = os.path.join(table_dir, f"{name}.{number}.csv.gz")
+        number += 1
+    return path
+
+
+def _publish_leftovers(engine: Engine, table_dir: str) -> list[str]:
+    """Finish archives interrupted between the DROP and the rename: a temporary file whose table is
+    gone is complete. One whose table still exists is partial and removed, as the table is copied again.
+    """
+    published = []
+    with engine.connect() as conn:
+        for tmp in sorted(glob.glob(os.path.join(table_dir, "*.csv.gz.tmp"))):
+            name = os.path.basename(tmp).split(".", 1)[0]
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+                os.replace(tmp, tmp.removesuffix(".tmp"))
+                published.append(tmp.removesuffix(".tmp"))
+            else:
+                os.remove(tmp)
+    return published
+
+
+def archive_partitions(engine: Engine, before: date, archive_dir: str = ARCHIVE_DIR) -> list[str]:
+    """Move every monthly partition that ends on or before `before` into archive_dir as CSV.gz.
+
+    Rows of those months still in the default partition are first moved into monthly partitions.
+    Each partition is detached (see _detach_partition), so the application no longer reads or
+    writes it; the detached table is then copied out with COPY into a temporary file and dropped in
+    one transaction, and the file is renamed into place once that has committed. Rows for an
+    archived month written after the detach land in the default partition, and are archived into
+    a numbered file by a later run.
+    """
+    archived = []
+    for table in PARTITIONED_TABLES:
+        table_dir = os.path.join(archive_dir, table)
+        os.makedirs(table_dir, exist_ok=True)
+        archived += _publish_leftovers(engine, table_dir)
+        _partition_default_rows(engine, table, before)
+
+        for name, month in monthly_partitions(engine, table):
+            if _add_months(month, 1) <= before:
+                _detach_partition(engine, table, name)
+
+        # Including tables left detached by an earlier run that stopped before dropping them
+        for name, month in _detached_partitions(engine, table):
+            if _add_months(month, 1) > before:
+                continue
+
+            path = _archive_path(table_dir, name)
+            with engine.begin() as conn:
+                copy_sql = f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)"
+                with gzip.open(f"{path}.tmp", "wb") as out, conn.connection.cursor() as cursor:
+                    if hasattr(cursor, "copy_expert"):  # psycopg2
+                        cursor.copy_expert(copy_sql, out)
+                    else:  # psycopg 3
+                        with cursor.copy(copy_sql) as copy:
+                            for data in copy:
+                                out.write(data)
+                conn.execute(text(f"DROP TABLE {name}"))
+                if table == "personal_training_session":
+                    # The archived sessions no longer occupy their rooms
+                    conn.execute(
+                        text("DELETE FROM room_occupancy WHERE kind = 'PT_SESSION' AND starts_at < :end"),
+                        {"end": _add_months(month, 1)}
+                    )
+            os.replace(f"{path}.tmp", path)
+            archived.append(path)
+
+    return archived
+
+
+def iter_archived_rows(
+    table: str,
+    start: date | None = None,
+    end: date | None = None,
+    where: Callable[[dict], bool] | None = None,
+    archive_dir: str = ARCHIVE_DIR,
+) -> Iterator[dict]:
+    """Yield archived rows of a table (as strings, keyed by column) from months overlapping [start, end)"""
+    for path in sorted(glob.glob(os.path.join(archive_dir, table, f"{table}_p*.csv.gz"))):
+        match = _ARCHIVE_FILE.search(os.path.basename(path))
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if (start and _add_months(month, 1) <= start) or (end and month >= end):
+            continue
+
+        with gzip.open(path, "rb") as f:
+            for row in csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline="")):
+                if where is None or where(row):
+                    yield row
@@ -0,0 +1,296 @@
+import functools
+import hmac
+import inspect
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+
+# Fraction of requests to the PROFILE_ENDPOINTS routes that are profiled, e.g. 0.01
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Requests sending this value in the X-Profile-Token header are profiled, whatever the route
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+# Route names eligible for sampling
+PROFILE_ENDPOINTS = frozenset(
+    name.strip() for name in os.getenv(
+        "PROFILE_ENDPOINTS",
+        "get_trainer_schedule,get_member_dashboard,register_for_class,schedule_pt_session,schedule_recurring_pt_sessions"
+    ).split(",") if name.strip()
+)
+# Profiles kept for download; the oldest are dropped first
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", 50))
+# Milliseconds between stack samples. CPU-bound threads hand over the GIL every
+# sys.getswitchinterval() (5 ms), which bounds the real rate while they run.
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 1))
+
+# Without a sample rate or token the middleware isn't installed at all
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_TOKEN)
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# The profile of the request being handled; copied into threadpool threads with the context
+_current: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+
+
+@dataclass(eq=False)
+class RequestProfile:
+    """Wall-clock stack samples of one request, aggregated by stack"""
+    profile_id: int
+    method: str
+    path: str
+    endpoint: str | None
+    trigger: str  # "token" or "sample"
+    started_at: datetime
+    interval_ms: float
+    status_code: int | None = None
+    duration_ms: float | None = None
+    stacks: Counter = field(default_factory=Counter)
+    # While running: the event loop thread, the middleware's frame on it, and threadpool threads
+    # currently running this request's endpoint
+    loop_thread: int | None = None
+    marker: object = None
+    threads: set = field(default_factory=set)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def sample(self, frames: dict):
+        loop_frame = frames.get(self.loop_thread)
+        if loop_frame is not None:
+            # The loop thread only counts while it is running this request's task
+            stack = _stack(loop_frame, lambda frame: frame is self.marker)
+            if stack is not None:
+                self.stacks[("[event loop]",) + stack] += 1
+        for ident in tuple(self.threads):
+            frame = frames.get(ident)
+            if frame is not None:
+                stack = _stack(frame, lambda frame: frame.f_code is _TRACKED_CODE)
+                if stack is not None:
+                    self.stacks[("[threadpool]",) + stack] += 1
+
+    def collapsed(self) -> str:
+        """Folded stacks, one "root;...;leaf count" line each, for flamegraph.pl or speedscope"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 0) -> dict:
+        result = {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+            "interval_ms": self.interval_ms,
+        }
+        if top:
+            own, total = Counter(), Counter()
+            for stack, count in self.stacks.items():
+                own[stack[-1]] += count
+                for function in set(stack[1:]):
+                    total[function] += count
+            result["top_self"] = [{"function": name, "samples": count} for name, count in own.most_common(top)]
+            result["top_total"] = [{"function": name, "samples": count} for name, count in total.most_common(top)]
+        return result
+
+
+def _label(code) -> str:
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def _stack(frame, is_root) -> tuple[str, ...] | None:
+    """Labels from just below the root frame down to frame, or None if no frame on the way is the root"""
+    labels = []
+    while frame is not None:
+        if is_root(frame):
+            return tuple(reversed(labels))
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return None
+
+
+def _track_threads(call):
+    """Wrap a sync endpoint so the threadpool thread running it is sampled for a profiled request"""
+
+    @functools.wraps(call)
+    def tracked(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        ident = threading.get_ident()
+        profile.threads.add(ident)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.threads.discard(ident)
+
+    return tracked
+
+
+_TRACKED_CODE = _track_threads(lambda: None).__code__
+
+
+class Sampler:
+    """One daemon thread sampling every thread's stack while any profile is running"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._active: set[RequestProfile] = set()
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+    def start(self, profile: RequestProfile):
+        with self._wakeup:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._active.add(profile)
+            self._wakeup.notify()
+
+    def stop(self, profile: RequestProfile):
+        with self._wakeup:
+            self._active.discard(profile)
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._active:
+                    self._wakeup.wait()
+                active = tuple(self._active)
+            frames = sys._current_frames()
+            for profile in active:
+                profile.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileBuffer:
+    """The last max_profiles finished profiles"""
+
+    def __init__(self, max_profiles: int = PROFILE_BUFFER_SIZE):
+        self._profiles: deque[RequestProfile] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> list[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> RequestProfile | None:
+        with self._lock:
+            return next((profile for profile in self._profiles if profile.profile_id == profile_id), None)
+
+
+profiles = ProfileBuffer()
+sampler = Sampler()
+
+
+class ProfilingMiddleware:
+    """Samples the stacks of selected requests into the profiles buffer.
+
+    A request is profiled when it carries X-Profile-Token matching PROFILE_TOKEN, or at random with
+    probability sample_rate when it is for one of the PROFILE_ENDPOINTS routes; the response then
+    carries X-Profile-Id. Others pay for a header lookup and a random number.
+
+    Add it innermost, so routing, validation, the endpoint and response rendering all run in this
+    middleware's task. Sync endpoints are wrapped on the first request so their threadpool thread
+    is sampled too.
+    """
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, token: str = PROFILE_TOKEN,
+                 endpoints: frozenset[str] = PROFILE_ENDPOINTS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.endpoints = endpoints
+        self._instrumented = False
+
+    def _requested(self, scope) -> bool:
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_TOKEN_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    def _instrument(self, app):
+        for route in app.router.routes:
+            if isinstance(route, APIRoute) and not inspect.iscoroutinefunction(route.dependant.call):
+                route.dependant.call = _track_threads(route.dependant.call)
+        self._instrumented = True
+
+    def _endpoint(self, scope) -> str | None:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.name
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self._requested(scope):
+            trigger, endpoint = "token", self._endpoint(scope)
+        elif self.sample_rate and random.random() < self.sample_rate:
+            trigger, endpoint = "sample", self._endpoint(scope)
+            if endpoint not in self.endpoints:
+                return await self.app(scope, receive, send)
+        else:
+            return await self.app(scope, receive, send)
+
+        if not self._instrumented:
+            self._instrument(scope["app"])
+
+        profile = RequestProfile(
+            profile_id=profiles.next_id(),
+            method=scope["method"],
+            path=scope["path"],
+            endpoint=endpoint,
+            trigger=trigger,
+            started_at=datetime.now(timezone.utc),
+            interval_ms=sampler.interval * 1000,
+            loop_thread=threading.get_ident(),
+            marker=sys._getframe()
+        )
+        profile_header = (PROFILE_ID_HEADER, str(profile.profile_id).encode())
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), profile_header]}
+            await send(message)
+
+        context_token = _current.set(profile)
+        sampler.start(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop(profile)
+            _current.reset(context_token)
+            profile.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            profile.marker = None
+            profile.threads.clear()
+            profiles.add(profile)
@@ -0,0 +1,431 @@
+# Hot router queries, built once at import time.
+# Each statement uses bound parameters, so SQLAlchemy builds its cache key and compiled
+# SQL once and requests only bind values; on the psycopg (3) driver the identical SQL text
+# also lets PostgreSQL reuse a prepared plan (see app/database.py).
+# Run with db.scalars(statement, {"param": value}) or db.execute(...).
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, and_, bindparam, case, func, literal, select, text, union, union_all, update
+
+from models.cache_version import CacheVersion
+from models.class_occurrence import ClassOccurrence
+from models.class_registration import ClassRegistration, AttendanceStatus
+from models.fitness_goal import FitnessGoal, GoalStatusEnum
+from models.location import Location
+from models.group_class import GroupClass
+from models.health_metric import HealthMetric
+from models.personal_training_session import PersonalTrainingSession, SessionStatus
+from models.room import Room, RoomStatus
+from models.room_occupancy import OccupancyKind, RoomOccupancy
+from models.trainer_availability import TrainerAvailability, AvailabilityStatus
+from models.user import Admin, Member, Trainer, User
+
+# Lookups by id, used to validate path and body ids in nearly every endpoint
+member_by_id = select(Member).where(Member.user_id == bindparam("member_id"))
+trainer_by_id = select(Trainer).where(Trainer.user_id == bindparam("trainer_id"))
+admin_by_id = select(Admin).where(Admin.user_id == bindparam("admin_id"))
+room_by_id = select(Room).where(Room.room_id == bindparam("room_id"))
+user_by_email = select(User).where(User.email == bindparam("email"))
+location_by_id = select(Location).where(Location.location_id == bindparam("location_id"))
+
+latest_member_metric = select(HealthMetric).where(
+    HealthMetric.member_id == bindparam("member_id")
+).order_by(HealthMetric.recorded_at.desc()).limit(1)
+
+# Member dashboard
+latest_health_metrics = text("SELECT * FROM member_latest_health_metrics WHERE user_id = :user_id")
+
+active_goals = select(FitnessGoal).where(
+    FitnessGoal.member_id == bindparam("member_id"),
+    FitnessGoal.status == GoalStatusEnum.ACTIVE
+)
+
+attended_class_count = select(func.count(ClassRegistration.registration_id)).where(
+    ClassRegistration.member_id == bindparam("member_id"),
+    ClassRegistration.attended_status == AttendanceStatus.ATTENDED
+)
+
+upcoming_member_sessions = select(PersonalTrainingSession).where(
+    PersonalTrainingSession.member_id == bindparam("member_id"),
+    PersonalTrainingSession.status == SessionStatus.SCHEDULED,
+    PersonalTrainingSession.session_date >= bindparam("today")
+)
+
+# Trainer schedule
+upcoming_trainer_sessions = select(
+    PersonalTrainingSession,
+    User.first_name,
+    User.last_name,
+    Room.room_name
+).join(
+    Member, PersonalTrainingSession.member_id == Member.user_id
+).join(
+    User, Member.user_id == User.user_id
+).join(
+    Room, PersonalTrainingSession.room_id == Room.room_id
+).where(
+    PersonalTrainingSession.trainer_id == bindparam("trainer_id"),
+    PersonalTrainingSession.status == SessionStatus.SCHEDULED,
+    PersonalTrainingSession.session_date >= bindparam("today")
+)
+
+trainer_group_classes = select(
+    GroupClass,
+    Room.room_name
+).join(
+    Room, GroupClass.room_id == Room.room_id
+).where(
+    GroupClass.trainer_id == bindparam("trainer_id")
+)
+
+# Trainer availability (loaded whole into app/availability_index.py)
+active_availability = select(
+    TrainerAvailability.trainer_id,
+    TrainerAvailability.dayOfWeek,
+    TrainerAvailability.start_time,
+    TrainerAvailability.end_time
+).where(
+    TrainerAvailability.status == AvailabilityStatus.ACTIVE
+)
+
+# Bumped by a trigger on every write to trainer_availability; no row until the first one
+availability_version = select(CacheVersion.version).where(CacheVersion.name == "trainer_availability")
+
+# Class check-in: the trainer's occurrence, by id or by date
+trainer_occurrence_by_id = select(ClassOccurrence).join(
+    GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+).where(
+    GroupClass.class_id == bindparam("class_id"),
+    GroupClass.trainer_id == bindparam("trainer_id"),
+    ClassOccurrence.occurrence_id == bindparam("occurrence_id")
+)
+
+trainer_occurrence_on = select(ClassOccurrence).join(
+    GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+).where(
+    GroupClass.class_id == bindparam("class_id"),
+    GroupClass.trainer_id == bindparam("trainer_id"),
+    ClassOccurrence.occurrence_date == bindparam("occurrence_date")
+)
+
+# Cancels only a still-REGISTERED booking, so of two concurrent cancels exactly one frees the spot
+cancel_registration = update(ClassRegistration).where(
+    ClassRegistration.registration_id == bindparam("b_registration_id"),
+    ClassRegistration.member_id == bindparam("b_member_id"),
+    ClassRegistration.attended_status == AttendanceStatus.REGISTERED
+).values(
+    attended_status=AttendanceStatus.CANCELLED
+).execution_options(synchronize_session=False)
+
+occurrence_booked_count = select(func.count(ClassRegistration.registration_id)).where(
+    ClassRegistration.occurrence_id == bindparam("occurrence_id"),
+    ClassRegistration.attended_status != AttendanceStatus.CANCELLED
+)
+
+# Class roster: the occurrence shown (by id, or the next one from a date) with its class name
+roster_occurrence_by_id = select(ClassOccurrence, GroupClass.class_name).join(
+    GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+).where(
+    GroupClass.class_id == bindparam("class_id"),
+    GroupClass.trainer_id == bindparam("trainer_id"),
+    ClassOccurrence.occurrence_id == bindparam("occurrence_id")
+)
+
+roster_next_occurrence = select(ClassOccurrence, GroupClass.class_name).join(
+    GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+).where(
+    GroupClass.class_id == bindparam("class_id"),
+    GroupClass.trainer_id == bindparam("trainer_id"),
+    ClassOccurrence.occurrence_date >= bindparam("from_date")
+).order_by(ClassOccurrence.occurrence_date).limit(1)
+
+_roster_members = select(ClassRegistration.member_id).where(
+    ClassRegistration.occurrence_id == bindparam("occurrence_id"),
+    ClassRegistration.attended_status != AttendanceStatus.CANCELLED
+)
+
+_roster_latest_metrics = select(
+    HealthMetric.member_id,
+    HealthMetric.weight,
+    HealthMetric.body_fat_percentage,
+    HealthMetric.heart_rate,
+    HealthMetric.recorded_at,
+    func.row_number().over(
+        partition_by=HealthMetric.member_id, order_by=HealthMetric.recorded_at.desc()
+    ).label("recency")
+).where(
+    HealthMetric.member_id.in_(_roster_members)
+).subquery("latest_metrics")
+
+_roster_goal_counts = select(
+    FitnessGoal.member_id,
+    func.count(FitnessGoal.goal_id).label("active_goals")
+).where(
+    FitnessGoal.member_id.in_(_roster_members),
+    FitnessGoal.status == GoalStatusEnum.ACTIVE
+).group_by(FitnessGoal.member_id).subquery("goal_counts")
+
+# Everyone booked on the occurrence with name, latest health metric and active goal count:
+# one statement whatever the class size, instead of lazy loads per attendee
+occurrence_roster = select(
+    ClassRegistration.member_id,
+    ClassRegistration.attended_status,
+    User.first_name,
+    User.last_name,
+    _roster_latest_metrics.c.weight,
+    _roster_latest_metrics.c.body_fat_percentage,
+    _roster_latest_metrics.c.heart_rate,
+    _roster_latest_metrics.c.recorded_at,
+    func.coalesce(_roster_goal_counts.c.active_goals, 0).label("active_goals")
+).join(
+    User, ClassRegistration.member_id == User.user_id
+).outerjoin(
+    _roster_latest_metrics,
+    and_(_roster_latest_metrics.c.member_id == ClassRegistration.member_id, _roster_latest_metrics.c.recency == 1)
+).outerjoin(
+    _roster_goal_counts, _roster_goal_counts.c.member_id == ClassRegistration.member_id
+).where(
+    ClassRegistration.occurrence_id == bindparam("occurrence_id"),
+    ClassRegistration.attended_status != AttendanceStatus.CANCELLED
+).order_by(User.last_name, User.first_name, ClassRegistration.member_id)
+
+# Whole roster in one statement (update parameters can't share a column's name): checked-in members ATTENDED, everyone else still booked MISSED
+mark_attendance = update(ClassRegistration).where(
+    ClassRegistration.occurrence_id == bindparam("b_occurrence_id"),
+    ClassRegistration.attended_status != AttendanceStatus.CANCELLED
+).values(
+    attended_status=case(
+        (ClassRegistration.member_id.in_(bindparam("member_ids", expanding=True)),
+         literal(AttendanceStatus.ATTENDED, ClassRegistration.attended_status.type)),
+        else_=literal(AttendanceStatus.MISSED, ClassRegistration.attended_status.type)
+    )
+).returning(
+    ClassRegistration.member_id, ClassRegistration.attended_status
+).execution_options(synchronize_session=False)
+
+# Check-ins while members are still arriving; the rest of the roster is left as it is
+mark_checked_in = update(ClassRegistration).where(
+    ClassRegistration.occurrence_id == bindparam("b_occurrence_id"),
+    ClassRegistration.attended_status != AttendanceStatus.CANCELLED,
+    ClassRegistration.member_id.in_(bindparam("member_ids", expanding=True))
+).values(
+    attended_status=AttendanceStatus.ATTENDED
+).returning(
+    ClassRegistration.member_id, ClassRegistration.attended_status
+).execution_options(synchronize_session=False)
+
+# Bulk timetable validation loads these once per request
+timetable_classes = select(
+    GroupClass.class_id,
+    GroupClass.class_name,
+    GroupClass.day,
+    GroupClass.start_time,
+    GroupClass.end_time,
+    GroupClass.room_id,
+    GroupClass.trainer_id
+)
+
+room_locations = select(Room.room_id, Room.location_id)
+
+trainer_ids = select(Trainer.user_id)
+
+# Which of the given trainers have a PT session or teach a class overlapping a slot
+busy_trainers = union(
+    select(PersonalTrainingSession.trainer_id).where(
+        PersonalTrainingSession.trainer_id.in_(bindparam("trainer_ids", expanding=True)),
+        PersonalTrainingSession.status == SessionStatus.SCHEDULED,
+        PersonalTrainingSession.session_date == bindparam("session_date"),
+        PersonalTrainingSession.start_time < bindparam("end_time"),
+        PersonalTrainingSession.end_time > bindparam("start_time")
+    ),
+    select(GroupClass.trainer_id).where(
+        GroupClass.trainer_id.in_(bindparam("trainer_ids", expanding=True)),
+        GroupClass.day == bindparam("day"),
+        GroupClass.start_time < bindparam("end_of_slot"),
+        GroupClass.end_time > bindparam("start_of_slot")
+    )
+)
+
+trainer_summaries = select(
+    Trainer.user_id,
+    User.first_name,
+    User.last_name,
+    Trainer.specialty
+).join(
+    User, Trainer.user_id == User.user_id
+).where(
+    Trainer.user_id.in_(bindparam("trainer_ids", expanding=True))
+).order_by(Trainer.user_id)
+
+# PT session booking
+
+trainer_session_conflict = select(PersonalTrainingSession.session_id).where(
+    PersonalTrainingSession.trainer_id == bindparam("trainer_id"),
+    PersonalTrainingSession.session_date == bindparam("session_date"),
+    PersonalTrainingSession.start_time < bindparam("end_time"),
+    PersonalTrainingSession.end_time > bindparam("start_time")
+).limit(1)
+
+# Room conflicts, against classes and PT sessions alike, are one probe of the occupancy ledger
+room_occupancy_conflict = select(RoomOccupancy.kind).where(
+    RoomOccupancy.room_id == bindparam("room_id"),
+    RoomOccupancy.starts_at < bindparam("end_time"),
+    RoomOccupancy.ends_at > bindparam("start_time")
+).limit(1)
+
+# Future occurrences of a class that would clash with something else in another room
+class_room_conflicts = select(ClassOccurrence.occurrence_date).join(
+    RoomOccupancy,
+    and_(
+        RoomOccupancy.room_id == bindparam("room_id"),
+        RoomOccupancy.starts_at < ClassOccurrence.end_time,
+        RoomOccupancy.ends_at > ClassOccurrence.start_time,
+        RoomOccupancy.occurrence_id.is_distinct_from(ClassOccurrence.occurrence_id)
+    )
+).where(
+    ClassOccurrence.class_id == bindparam("class_id"),
+    ClassOccurrence.start_time >= bindparam("since")
+).distinct().order_by(ClassOccurrence.occurrence_date)
+
+
+# New occurrences, not yet in the ledger, whose room is already taken at that time
+new_occurrence_room_conflicts = select(ClassOccurrence.occurrence_id).join(
+    RoomOccupancy,
+    and_(
+        RoomOccupancy.room_id == ClassOccurrence.room_id,
+        RoomOccupancy.starts_at < ClassOccurrence.end_time,
+        RoomOccupancy.ends_at > ClassOccurrence.start_time
+    )
+).where(ClassOccurrence.occurrence_id.in_(bindparam("occurrence_ids", expanding=True))).distinct()
+
+# Rooms a maintenance block in the ledger still covers; correlated to the Room being updated
+room_maintenance_running = select(RoomOccupancy.occupancy_id).where(
+    RoomOccupancy.room_id == Room.room_id,
+    RoomOccupancy.kind == OccupancyKind.MAINTENANCE,
+    RoomOccupancy.starts_at <= func.now(),
+    RoomOccupancy.ends_at > func.now()
+).exists()
+
+# Recurring PT booking. The requested slots are a derived table, so each check covers every date
+# in one query; statements are built per request but cached per number of slots.
+def requested_slots(slots: list[tuple[date, datetime, datetime]]):
+    """(session_date, start_time, end_time) rows as a subquery named slots"""
+    return union_all(*(
+        select(
+            literal(session_date, Date).label("session_date"),
+            literal(start_time, DateTime(timezone=True)).label("start_time"),
+            literal(end_time, DateTime(timezone=True)).label("end_time")
+        )
+        for session_date, start_time, end_time in slots
+    )).subquery("slots")
+
+
+def slot_trainer_conflicts(slots):
+    """Dates in slots overlapping a PT session of the :trainer_id parameter"""
+    return select(slots.c.session_date).join(
+        PersonalTrainingSession,
+        and_(
+            PersonalTrainingSession.session_date == slots.c.session_date,
+            PersonalTrainingSession.start_time < slots.c.end_time,
+            PersonalTrainingSession.end_time > slots.c.start_time
+        )
+    ).where(PersonalTrainingSession.trainer_id == bindparam("trainer_id")).distinct()
+
+
+def slot_room_conflicts(slots):
+    """Dates in slots on which the :room_id parameter is already occupied"""
+    return select(slots.c.session_date).join(
+        RoomOccupancy,
+        and_(
+            RoomOccupancy.starts_at < slots.c.end_time,
+            RoomOccupancy.ends_at > slots.c.start_time
+        )
+    ).where(RoomOccupancy.room_id == bindparam("room_id")).distinct()
+
+
+# Location-scoped listings; each filters on location_id first so cost follows one club's size
+location_rooms = select(Room).where(
+    Room.location_id == bindparam("location_id")
+).order_by(Room.room_number)
+
+location_classes = select(
+    GroupClass,
+    Room.room_name,
+    User.first_name,
+    User.last_name
+).join(
+    Room, GroupClass.room_id == Room.room_id
+).join(
+    User, GroupClass.trainer_id == User.user_id
+).where(
+    GroupClass.location_id == bindparam("location_id")
+).order_by(GroupClass.day, GroupClass.start_time)
+
+location_trainers = select(
+    Trainer.user_id,
+    User.first_name,
+    User.last_name,
+    Trainer.specialty
+).join(
+    User, Trainer.user_id == User.user_id
+).where(
+    User.location_id == bindparam("location_id")
+).order_by(Trainer.user_id)
+
+location_occurrences = select(
+    ClassOccurrence,
+    GroupClass.class_name,
+    Room.room_name
+).join(
+    GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+).join(
+    Room, ClassOccurrence.room_id == Room.room_id
+).where(
+    GroupClass.location_id == bindparam("location_id"),
+    ClassOccurrence.occurrence_date >= bindparam("start"),
+    ClassOccurrence.occurrence_date < bindparam("end")
+).order_by(ClassOccurrence.start_time)
+
+room_calendar = select(
+    RoomOccupancy,
+    GroupClass.class_name
+).outerjoin(
+    ClassOccurrence, RoomOccupancy.occurrence_id == ClassOccurrence.occurrence_id
+).outerjoin(
+    GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+).where(
+    RoomOccupancy.room_id == bindparam("room_id"),
+    RoomOccupancy.starts_at < bindparam("end"),
+    RoomOccupancy.ends_at > bindparam("start")
+).order_by(RoomOccupancy.starts_at)
+
+# Room maintenance: what has to move out of a room, where it could go, and what is already there
+room_bookings_in_window = select(
+    RoomOccupancy,
+    ClassOccurrence.capacity
+).outerjoin(
+    ClassOccurrence, RoomOccupancy.occurrence_id == ClassOccurrence.occurrence_id
+).where(
+    RoomOccupancy.room_id == bindparam("room_id"),
+    RoomOccupancy.kind != OccupancyKind.MAINTENANCE,
+    RoomOccupancy.starts_at < bindparam("end"),
+    RoomOccupancy.ends_at > bindparam("start")
+)
+
+compatible_rooms = select(Room).where(
+    Room.room_id != bindparam("room_id"),
+    # Rooms without a club match each other
+    Room.location_id.is_not_distinct_from(bindparam("location_id")),
+    Room.room_type == bindparam("room_type"),
+    Room.status == RoomStatus.AVAILABLE
+)
+
+rooms_occupancy_in_window = select(
+    RoomOccupancy.room_id,
+    RoomOccupancy.starts_at,
+    RoomOccupancy.ends_at
+).where(
+    RoomOccupancy.room_id.in_(bindparam("room_ids", expanding=True)),
+    RoomOccupancy.starts_at < bindparam("end"),
+    RoomOccupancy.ends_at > bindparam("start")
+)
@@ -0,0 +1,130 @@
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Default bucket per client and route: sustained requests per second and burst size
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", 10))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 20))
+# Booking endpoints that sign-up storms and client retry loops hammer
+BOOKING_RATE_PER_SECOND = float(os.getenv("BOOKING_RATE_PER_SECOND", 1))
+BOOKING_BURST = int(os.getenv("BOOKING_BURST", 5))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+# Writes running at once; the rest are shed before they check out a connection.
+# Keep it below the pool size (5 + 10 overflow by default) so reads always get a connection.
+WRITE_CONCURRENCY_LIMIT = int(os.getenv("WRITE_CONCURRENCY_LIMIT", 10))
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+EXEMPT_PATHS = ("/", "/health")
+# (rate per second, burst) by route template
+ROUTE_LIMITS = {
+    "/members/{member_id}/class-registrations": (BOOKING_RATE_PER_SECOND, BOOKING_BURST),
+    "/members/{member_id}/pt-sessions": (BOOKING_RATE_PER_SECOND, BOOKING_BURST),
+    "/members/{member_id}/pt-sessions/recurring": (BOOKING_RATE_PER_SECOND, BOOKING_BURST),
+}
+# Path parameters that identify the caller, most specific first
+CLIENT_PARAMS = ("member_id", "trainer_id", "admin_id")
+
+
+class RateLimitBackend(ABC):
+    """Token buckets by key. Each worker process has its own MemoryRateLimitBackend; pass a backend
+    backed by a shared store to the middleware to enforce one limit across workers."""
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token; returns 0 if granted, otherwise seconds until a token is available"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets kept in process, least recently used dropped first beyond max_keys"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # A dropped bucket comes back full, so eviction only ever errs on the lenient side
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Token bucket per caller and route, then an admission gate for writes.
+
+    The caller is the member (or trainer/admin) in the path, else the client address. Both checks
+    answer 429 with Retry-After before the router runs, so a shed request never touches the pool.
+    """
+
+    def __init__(self, app, backend: RateLimitBackend | None = None, write_limit: int = WRITE_CONCURRENCY_LIMIT):
+        super().__init__(app)
+        self.backend = backend or MemoryRateLimitBackend()
+        self.write_limit = write_limit
+        # Only touched from the event loop, so a plain counter is enough
+        self._writes_in_flight = 0
+
+    def _match(self, request: Request):
+        for route in request.app.router.routes:
+            match, child_scope = route.matches(request.scope)
+            if match == Match.FULL:
+                return route.path, child_scope.get("path_params", {})
+        return None, {}
+
+    async def dispatch(self, request: Request, call_next):
+        if not RATE_LIMIT_ENABLED or request.url.path in EXEMPT_PATHS:
+            return await call_next(request)
+
+        template, params = self._match(request)
+        if template is None:
+            return await call_next(request)
+
+        client = next(
+            (f"{name}={params[name]}" for name in CLIENT_PARAMS if name in params),
+            f"ip={request.client.host if request.client else 'unknown'}"
+        )
+        rate, burst = ROUTE_LIMITS.get(template, (RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST))
+        wait = self.backend.take(f"{request.method} {template} {client}", rate, burst)
+        if wait > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, slow down"},
+                headers=_retry_after(wait)
+            )
+
+        if request.method not in WRITE_METHODS:
+            return await call_next(request)
+
+        if self._writes_in_flight >= self.write_limit:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Server is busy, please retry shortly"},
+                headers=_retry_after(1)
+            )
+        self._writes_in_flight += 1
+        try:
+            return await call_next(request)
+        finally:
+            self._writes_in_flight -= 1
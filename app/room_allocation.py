@@ -0,0 +1,120 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.jobs import job_handler
+from models.room import Room, RoomStatus
+from models.room_occupancy import OccupancyKind
+
+
+@dataclass
+class Booking:
+    """A class occurrence or PT session that has to leave a room"""
+    kind: OccupancyKind
+    source_id: int  # occurrence_id or session_id
+    starts_at: datetime
+    ends_at: datetime
+    capacity: int  # places the new room must have
+
+
+@dataclass
+class CandidateRoom:
+    room_id: int
+    room_name: str
+    capacity: int
+
+
+class RoomCalendar:
+    """One room's busy intervals, merged so they are sorted by start and never overlap"""
+
+    def __init__(self, intervals: Iterable[tuple[datetime, datetime]] = ()):
+        self._intervals = []
+        for start, end in sorted(intervals):
+            if self._intervals and start < self._intervals[-1][1]:
+                self._intervals[-1] = (self._intervals[-1][0], max(self._intervals[-1][1], end))
+            else:
+                self._intervals.append((start, end))
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        # Only the interval starting last before `end` can overlap, as intervals don't overlap
+        i = bisect_left(self._intervals, (end,))
+        return i == 0 or self._intervals[i - 1][1] <= start
+
+    def book(self, start: datetime, end: datetime):
+        # Only called after is_free, so the intervals stay disjoint
+        insort(self._intervals, (start, end))
+
+
+def assign_rooms(
+    bookings: list[Booking],
+    rooms: list[CandidateRoom],
+    busy: dict[int, list[tuple[datetime, datetime]]]
+) -> tuple[list[tuple[Booking, CandidateRoom]], list[Booking]]:
+    """Greedy best fit: the largest bookings pick first, each taking the smallest free room that fits.
+
+    busy holds the existing intervals of every candidate room. Returns (moves, unplaced).
+    """
+    calendars = {room.room_id: RoomCalendar(busy.get(room.room_id, ())) for room in rooms}
+    by_size = sorted(rooms, key=lambda room: (room.capacity, room.room_id))
+
+    moves, unplaced = [], []
+    for booking in sorted(bookings, key=lambda booking: (-booking.capacity, booking.starts_at)):
+        for room in by_size:
+            calendar = calendars[room.room_id]
+            if room.capacity >= booking.capacity and calendar.is_free(booking.starts_at, booking.ends_at):
+                calendar.book(booking.starts_at, booking.ends_at)
+                moves.append((booking, room))
+                break
+        else:
+            unplaced.append(booking)
+    moves.sort(key=lambda move: move[0].starts_at)
+    return moves, unplaced
+
+
+def plan_room_closure(db: Session, room: Room, start: datetime, end: datetime):
+    """Moves for every booking in room during [start, end) to an available room of the same type
+    and club with enough capacity. Three queries, then assign_rooms in memory.
+    """
+    window = {"start": start, "end": end}
+    bookings = [
+        Booking(
+            kind=entry.kind,
+            source_id=entry.occurrence_id if entry.kind == OccupancyKind.CLASS else entry.session_id,
+            starts_at=entry.starts_at,
+            ends_at=entry.ends_at,
+            capacity=capacity or 1  # a PT session fits any room
+        )
+        for entry, capacity in db.execute(queries.room_bookings_in_window, {"room_id": room.room_id, **window})
+    ]
+    rooms = [
+        CandidateRoom(candidate.room_id, candidate.room_name, candidate.capacity)
+        for candidate in db.scalars(queries.compatible_rooms, {
+            "room_id": room.room_id,
+            "location_id": room.location_id,
+            "room_type": room.room_type
+        })
+    ]
+    busy = defaultdict(list)
+    if bookings and rooms:
+        for room_id, starts_at, ends_at in db.execute(
+            queries.rooms_occupancy_in_window, {"room_ids": [candidate.room_id for candidate in rooms], **window}
+        ):
+            busy[room_id].append((starts_at, ends_at))
+    return assign_rooms(bookings, rooms, busy)
+
+
+@job_handler("rooms.set_status")
+def set_room_status_job(db: Session, payloads: list[dict]):
+    # Scheduled by room maintenance for the start and end of the window
+    for payload in payloads:
+        statement = update(Room).where(Room.room_id == payload["room_id"]).values(status=RoomStatus[payload["status"]])
+        if payload["status"] == RoomStatus.AVAILABLE.name:
+            # An overlapping or back-to-back window keeps the room out of use until it ends too
+            statement = statement.where(~queries.room_maintenance_running)
+        db.execute(statement)
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.class_occurrence import ClassOccurrence
+from models.personal_training_session import PersonalTrainingSession
+from models.room_occupancy import OccupancyKind, RoomOccupancy
+
+# Every path that creates or moves a class occurrence or PT session goes through these, in the
+# same transaction, so app/queries.py can check any room with one probe of room_occupancy.
+# None of them commit.
+
+# SQLSTATE raised by the room_occupancy exclusion constraint (create_index.sql)
+EXCLUSION_VIOLATION = "23P01"
+
+
+class RoomTaken(Exception):
+    """A write overlapped a booking of the same room that another transaction committed after our probe.
+    The transaction is aborted and must be rolled back.
+    """
+
+
+def _write(db: Session, statement, params=None):
+    try:
+        db.execute(statement, params)
+    except IntegrityError as e:
+        # psycopg2 calls it pgcode, psycopg 3 sqlstate
+        if EXCLUSION_VIOLATION in (getattr(e.orig, "pgcode", None), getattr(e.orig, "sqlstate", None)):
+            raise RoomTaken("Room is already booked at this time") from e
+        raise
+
+
+def record_occurrences(db: Session, rows: Iterable[tuple[int, int | None, datetime, datetime]]):
+    """Add (occurrence_id, room_id, start_time, end_time) rows; occurrences without a room are skipped"""
+    entries = [
+        {"room_id": room_id, "kind": OccupancyKind.CLASS, "starts_at": start, "ends_at": end, "occurrence_id": occurrence_id}
+        for occurrence_id, room_id, start, end in rows
+        if room_id is not None
+    ]
+    if entries:
+        _write(db, insert(RoomOccupancy), entries)
+
+
+def record_sessions(db: Session, rows: Iterable[tuple[int, int, datetime, datetime]]):
+    """Add (session_id, room_id, start_time, end_time) rows for PT sessions"""
+    entries = [
+        {"room_id": room_id, "kind": OccupancyKind.PT_SESSION, "starts_at": start, "ends_at": end, "session_id": session_id}
+        for session_id, room_id, start, end in rows
+    ]
+    if entries:
+        _write(db, insert(RoomOccupancy), entries)
+
+
+def move_session(db: Session, session_id: int, room_id: int):
+    _write(
+        db,
+        update(RoomOccupancy)
+        .where(RoomOccupancy.session_id == session_id)
+        .values(room_id=room_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move_class(db: Session, class_id: int, room_id: int, since: datetime):
+    """Move the ledger rows of a class's occurrences starting at or after since"""
+    _write(
+        db,
+        update(RoomOccupancy)
+        .where(RoomOccupancy.occurrence_id.in_(
+            select(ClassOccurrence.occurrence_id).where(
+                ClassOccurrence.class_id == class_id,
+                ClassOccurrence.start_time >= since
+            )
+        ))
+        .values(room_id=room_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move_bookings(db: Session, moves: Iterable[tuple[OccupancyKind, int, int]]):
+    """Move (kind, occurrence_id or session_id, room_id) bookings; one executemany per table"""
+    sessions = [{"b_id": source_id, "b_room": room_id} for kind, source_id, room_id in moves if kind == OccupancyKind.PT_SESSION]
+    occurrences = [{"b_id": source_id, "b_room": room_id} for kind, source_id, room_id in moves if kind == OccupancyKind.CLASS]
+    for source, source_id, ledger_id, params in (
+        (PersonalTrainingSession, PersonalTrainingSession.session_id, RoomOccupancy.session_id, sessions),
+        (ClassOccurrence, ClassOccurrence.occurrence_id, RoomOccupancy.occurrence_id, occurrences),
+    ):
+        if not params:
+            continue
+        for table, key in ((source.__table__, source_id), (RoomOccupancy.__table__, ledger_id)):
+            _write(db, update(table).where(key == bindparam("b_id")).values(room_id=bindparam("b_room")), params)
+
+
+def block_room(db: Session, room_id: int, start: datetime, end: datetime):
+    """Occupy a room for maintenance, so booking probes treat it as taken.
+
+    A room holds one ledger row at a time, so maintenance windows overlapping this one are merged
+    into it. The bounds are compared in SQL, which also copes with naive request times.
+    """
+    overlapping = (
+        (RoomOccupancy.room_id == room_id)
+        & (RoomOccupancy.kind == OccupancyKind.MAINTENANCE)
+        & (RoomOccupancy.starts_at < end)
+        & (RoomOccupancy.ends_at > start)
+    )
+    earliest = select(func.min(RoomOccupancy.starts_at)).where(overlapping).scalar_subquery()
+    latest = select(func.max(RoomOccupancy.ends_at)).where(overlapping).scalar_subquery()
+    merged_start, merged_end = db.execute(select(
+        case((earliest < start, earliest), else_=start),
+        case((latest > end, latest), else_=end)
+    )).one()
+    db.execute(delete(RoomOccupancy).where(overlapping).execution_options(synchronize_session=False))
+    _write(db, insert(RoomOccupancy).values(
+        room_id=room_id, kind=OccupancyKind.MAINTENANCE, starts_at=merged_start, ends_at=merged_end
+    ))
@@ -1,13 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app import queries
+from app.analytics import REPORTS, run_report, schedule_snapshot, snapshot_time
+from app.database import get_db, get_read_db, get_read_engine, get_sessionmaker
+from app.exports import export_rows, DATASETS as EXPORT_DATASETS, SUPPORTED_FORMATS as EXPORT_FORMATS
+from app.member_import import import_members, read_rows, SUPPORTED_FORMATS
+from app.availability_index import get_availability_index
+from app.jobs import enqueue
+from app.profiling import profiles, PROFILING_ENABLED
+from app.occurrences import generate_occurrences, OCCURRENCE_HORIZON_DAYS
+from app.room_allocation import plan_room_closure
+from app.room_ledger import block_room, move_bookings, move_class, move_session, RoomTaken
+from app.timetable import TimetableEntry, validate_timetable
 from models.user import Admin
 from models.group_class import GroupClass, DaysOfWeek
 from models.user import Trainer
 from models.personal_training_session import PersonalTrainingSession
-from models.room import Room
+from models.room import Room, RoomStatus
+from models.class_occurrence import ClassOccurrence
+from models.location import Location
+from models.room_occupancy import OccupancyKind
 from pydantic import BaseModel
-from datetime import time
+from datetime import date, time, datetime
+import json
+import os
+import shutil
+import tempfile
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -29,7 +49,7 @@ def create_group_class(
     """Admin creates a new group class"""
     
     # Validate admin exists
-    admin = db.query(Admin).filter(Admin.user_id == admin_id).first()
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
     if not admin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -37,7 +57,7 @@ def create_group_class(
         )
     
     # Validate trainer exists
-    trainer = db.query(Trainer).filter(Trainer.user_id == class_data.trainer_id).first()
+    trainer = db.scalars(queries.trainer_by_id, {"trainer_id": class_data.trainer_id}).first()
     if not trainer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -45,7 +65,7 @@ def create_group_class(
         )
     
     # Validate room exists
-    room = db.query(Room).filter(Room.room_id == class_data.room_id).first()
+    room = db.scalars(queries.room_by_id, {"room_id": class_data.room_id}).first()
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,10 +96,27 @@ def create_group_class(
         end_time=class_data.end_time,
         capacity=class_data.capacity,
         room_id=class_data.room_id,
+        location_id=room.location_id,  # a class runs at its room's club
         trainer_id=class_data.trainer_id
     )
     
     db.add(new_class)
+    db.flush()
+    
+    # Schedule dated occurrences over the booking horizon
+    try:
+        _, clashes = generate_occurrences(db, class_ids=[new_class.class_id])
+    except RoomTaken as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Room conflict: {e}"
+        )
+    if clashes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Room conflict: Room is already booked on {', '.join(day.isoformat() for _, day in clashes)}"
+        )
     db.commit()
     db.refresh(new_class)
     
@@ -90,6 +127,159 @@ def create_group_class(
         "day": new_class.day.value
     }
 
+@router.post("/{admin_id}/classes/bulk", status_code=status.HTTP_201_CREATED)
+def create_group_classes_bulk(
+    admin_id: int,
+    classes: list[GroupClassCreate],
+    db: Session = Depends(get_db)
+):
+    """Admin creates a whole timetable at once; nothing is created if any class has a problem"""
+
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+
+    # Everything the checks need, loaded once
+    room_locations = dict(db.execute(queries.room_locations).all())
+    trainer_ids = set(db.scalars(queries.trainer_ids))
+    existing = [TimetableEntry(**row._mapping) for row in db.execute(queries.timetable_classes)]
+    availability = get_availability_index(db)
+
+    problems = {}
+    entries = []
+    for index, class_data in enumerate(classes):
+        errors = []
+        day_enum = DaysOfWeek.__members__.get(class_data.day.upper())
+        if day_enum is None:
+            errors.append(f"Invalid day. Must be one of: {[d.name for d in DaysOfWeek]}")
+        if class_data.start_time >= class_data.end_time:
+            errors.append("Start time must be before end time")
+        if class_data.room_id not in room_locations:
+            errors.append(f"Room with id {class_data.room_id} not found")
+        if class_data.trainer_id not in trainer_ids:
+            errors.append(f"Trainer with id {class_data.trainer_id} not found")
+        if errors:
+            problems[index] = errors
+        else:
+            entries.append(TimetableEntry(
+                class_name=class_data.class_name,
+                day=day_enum,
+                start_time=class_data.start_time,
+                end_time=class_data.end_time,
+                room_id=class_data.room_id,
+                trainer_id=class_data.trainer_id,
+                index=index
+            ))
+
+    for index, errors in validate_timetable(entries, existing, availability).items():
+        problems.setdefault(index, []).extend(errors)
+
+    if problems:
+        raise _timetable_problems(problems, classes)
+
+    # One batched INSERT, ids returned in submission order
+    class_ids = db.scalars(
+        insert(GroupClass).returning(GroupClass.class_id, sort_by_parameter_order=True),
+        [
+            {
+                "class_name": entry.class_name,
+                "day": entry.day,
+                "start_time": entry.start_time,
+                "end_time": entry.end_time,
+                "capacity": classes[entry.index].capacity,
+                "room_id": entry.room_id,
+                "location_id": room_locations[entry.room_id],
+                "trainer_id": entry.trainer_id
+            }
+            for entry in entries
+        ]
+    ).all()
+    try:
+        occurrences, clashes = generate_occurrences(db, class_ids=class_ids) if class_ids else (0, [])
+    except RoomTaken as e:
+        # A concurrent booking landed after the probe; nothing says which class it hit
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Room conflict: {e}"
+        )
+
+    # The weekly checks can't see PT sessions or maintenance; the dated occurrences were probed
+    # against room_occupancy, and any clash rolls the whole timetable back
+    entry_by_class = dict(zip(class_ids, entries))
+    booked_days = {}
+    for class_id, day in clashes:
+        booked_days.setdefault(entry_by_class[class_id].index, []).append(day.isoformat())
+    if booked_days:
+        db.rollback()
+        raise _timetable_problems(
+            {index: [f"Room conflict: Room is already booked on {', '.join(days)}"] for index, days in booked_days.items()},
+            classes
+        )
+    db.commit()
+
+    return {
+        "message": f"{len(class_ids)} classes created",
+        "class_ids": class_ids,
+        "occurrences": occurrences
+    }
+
+
+def _timetable_problems(problems: dict[int, list[str]], classes: list[GroupClassCreate]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={
+            "message": f"{len(problems)} of {len(classes)} classes have problems; nothing was created",
+            "problems": [
+                {"index": index, "class_name": classes[index].class_name, "errors": problems[index]}
+                for index in sorted(problems)
+            ]
+        }
+    )
+
+class LocationCreate(BaseModel):
+    name: str
+    address: str | None = None
+
+@router.post("/{admin_id}/locations", status_code=status.HTTP_201_CREATED)
+def create_location(
+    admin_id: int,
+    location_data: LocationCreate,
+    db: Session = Depends(get_db)
+):
+    """Admin adds a club"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    existing = db.query(Location).filter(Location.name == location_data.name).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Location {location_data.name} already exists"
+        )
+    
+    new_location = Location(
+        name=location_data.name,
+        address=location_data.address
+    )
+    db.add(new_location)
+    db.commit()
+    
+    return {
+        "message": "Location created successfully",
+        "location_id": new_location.location_id,
+        "name": new_location.name
+    }
+
 class RoomBookingUpdate(BaseModel):
     booking_type: str  # "pt_session" or "group_class"
     booking_id: int    # session_id or class_id
@@ -104,7 +294,7 @@ def update_room_booking(
     """Admin reassigns room for a PT session or group class"""
     
     # Validate admin exists
-    admin = db.query(Admin).filter(Admin.user_id == admin_id).first()
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
     if not admin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,7 +302,7 @@ def update_room_booking(
         )
     
     # Validate new room exists
-    new_room = db.query(Room).filter(Room.room_id == booking.new_room_id).first()
+    new_room = db.scalars(queries.room_by_id, {"room_id": booking.new_room_id}).first()
     if not new_room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -131,23 +321,32 @@ def update_room_booking(
                 detail=f"PT Session with id {booking.booking_id} not found"
             )
         
-        # Check for conflicts with other PT sessions in this room
-        conflicting_session = db.query(PersonalTrainingSession).filter(
-            PersonalTrainingSession.room_id == booking.new_room_id,
-            PersonalTrainingSession.session_id != booking.booking_id,
-            PersonalTrainingSession.session_date == session.session_date,
-            PersonalTrainingSession.start_time < session.end_time,
-            PersonalTrainingSession.end_time > session.start_time
-        ).first()
+        # Check for conflicts with classes and other PT sessions in this room
+        conflict = None
+        if session.room_id != booking.new_room_id:
+            conflict = db.scalar(queries.room_occupancy_conflict, {
+                "room_id": booking.new_room_id,
+                "start_time": session.start_time,
+                "end_time": session.end_time
+            })
         
-        if conflicting_session:
+        if conflict:
+            kind = "class" if conflict == OccupancyKind.CLASS else "PT session"
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Room conflict: Another PT session exists at this time"
+                detail=f"Room conflict: Another {kind} exists at this time"
             )
         
         # Update room
         session.room_id = booking.new_room_id
+        try:
+            move_session(db, session.session_id, booking.new_room_id)
+        except RoomTaken as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Room conflict: {e}"
+            )
         db.commit()
         
         return {
@@ -183,8 +382,35 @@ def update_room_booking(
                 detail=f"Room conflict: Another class exists on {group_class.day.value} at this time"
             )
         
-        # Update room
+        # Dated occurrences could also clash with PT sessions booked in the new room
+        now = datetime.now()
+        clashes = db.scalars(queries.class_room_conflicts, {
+            "room_id": booking.new_room_id,
+            "class_id": group_class.class_id,
+            "since": now
+        }).all()
+        
+        if clashes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Room conflict: Room is already booked on {', '.join(day.isoformat() for day in clashes)}"
+            )
+        
+        # Update room, including occurrences that haven't happened yet
         group_class.room_id = booking.new_room_id
+        group_class.location_id = new_room.location_id
+        db.query(ClassOccurrence).filter(
+            ClassOccurrence.class_id == group_class.class_id,
+            ClassOccurrence.start_time >= now
+        ).update({ClassOccurrence.room_id: booking.new_room_id}, synchronize_session=False)
+        try:
+            move_class(db, group_class.class_id, booking.new_room_id, now)
+        except RoomTaken as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Room conflict: {e}"
+            )
         db.commit()
         
         return {
@@ -199,3 +425,314 @@ def update_room_booking(
             detail="booking_type must be 'pt_session' or 'group_class'"
         )
 
+class RoomMaintenance(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+    status: str = "MAINTENANCE"  # or "CLOSED"
+    dry_run: bool = False  # only report the moves
+
+@router.post("/{admin_id}/rooms/{room_id}/maintenance", status_code=status.HTTP_200_OK)
+def schedule_room_maintenance(
+    admin_id: int,
+    room_id: int,
+    maintenance: RoomMaintenance,
+    db: Session = Depends(get_db)
+):
+    """Admin takes a room out of use for a window, moving its classes and PT sessions elsewhere"""
+
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+
+    room = db.scalars(queries.room_by_id, {"room_id": room_id}).first()
+    if not room:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Room with id {room_id} not found"
+        )
+
+    if maintenance.status.upper() not in (RoomStatus.MAINTENANCE.name, RoomStatus.CLOSED.name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="status must be 'MAINTENANCE' or 'CLOSED'"
+        )
+    room_status = RoomStatus[maintenance.status.upper()]
+
+    if maintenance.starts_at >= maintenance.ends_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start time must be before end time"
+        )
+
+    # Occurrences past the usual horizon must exist to be moved, and to count as busy elsewhere
+    horizon_days = (maintenance.ends_at.date() - date.today()).days
+    if horizon_days > OCCURRENCE_HORIZON_DAYS:
+        generate_occurrences(db, horizon_days=horizon_days)
+
+    moves, unplaced = plan_room_closure(db, room, maintenance.starts_at, maintenance.ends_at)
+    report = {
+        "room_id": room_id,
+        "room": room.room_name,
+        "status": room_status.value,
+        "starts_at": maintenance.starts_at.isoformat(),
+        "ends_at": maintenance.ends_at.isoformat(),
+        "dry_run": maintenance.dry_run,
+        "moves": [
+            {
+                "kind": booking.kind.value,
+                "id": booking.source_id,
+                "starts_at": booking.starts_at.isoformat(),
+                "ends_at": booking.ends_at.isoformat(),
+                "new_room_id": new_room.room_id,
+                "new_room": new_room.room_name
+            }
+            for booking, new_room in moves
+        ],
+        "unplaced": [
+            {
+                "kind": booking.kind.value,
+                "id": booking.source_id,
+                "starts_at": booking.starts_at.isoformat(),
+                "ends_at": booking.ends_at.isoformat(),
+                "capacity": booking.capacity
+            }
+            for booking in unplaced
+        ]
+    }
+
+    if maintenance.dry_run:
+        db.rollback()
+        return {
+            **report,
+            "note": "Bookings made after this plan can change it; the real request plans again and "
+                    "changes nothing if a room was taken in the meantime"
+        }
+
+    if unplaced:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Some bookings have no compatible room; nothing was changed", **report}
+        )
+
+    # Every move, the block and the status changes commit together
+    try:
+        move_bookings(db, [(booking.kind, booking.source_id, new_room.room_id) for booking, new_room in moves])
+        block_room(db, room_id, maintenance.starts_at, maintenance.ends_at)
+    except RoomTaken:
+        # A booking landed in a target room (or this one) after the plan was made
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Rooms were booked while planning; nothing was changed, retry", **report}
+        )
+    now = datetime.now(maintenance.starts_at.tzinfo)
+    if maintenance.starts_at <= now:
+        room.status = room_status
+    else:
+        enqueue(db, "rooms.set_status", {"room_id": room_id, "status": room_status.name},
+                delay_seconds=(maintenance.starts_at - now).total_seconds())
+    enqueue(db, "rooms.set_status", {"room_id": room_id, "status": RoomStatus.AVAILABLE.name},
+            delay_seconds=max(0.0, (maintenance.ends_at - now).total_seconds()))
+    db.commit()
+
+    return {"message": f"Room closed, {len(moves)} bookings moved", **report}
+
+
+
+@router.post("/{admin_id}/members/import", status_code=status.HTTP_200_OK)
+def import_members_file(
+    admin_id: int,
+    file: UploadFile,
+    file_format: str | None = Query(None, alias="format"),
+    db: Session = Depends(get_db)
+):
+    """Admin bulk-imports members from a CSV or JSONL file, streaming back an NDJSON report"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    fmt = (file_format or os.path.splitext(file.filename or "")[1].lstrip(".")).lower()
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Must be one of: {list(SUPPORTED_FORMATS)}"
+        )
+    
+    # The upload is closed once this handler returns, so keep our own copy for the stream
+    upload = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, upload)
+    upload.seek(0)
+    
+    def report():
+        import_db = get_sessionmaker()()
+        try:
+            for entry in import_members(import_db, read_rows(upload, fmt)):
+                yield json.dumps(entry) + "\n"
+        finally:
+            import_db.close()
+            upload.close()
+    
+    return StreamingResponse(report(), media_type="application/x-ndjson")
+
+
+@router.get("/{admin_id}/exports/{dataset}")
+def export_dataset(
+    admin_id: int,
+    dataset: str,
+    format: str = "csv",
+    start: date | None = None,
+    end: date | None = None,
+    db: Session = Depends(get_db)
+):
+    """Admin downloads members, sessions or registrations as CSV or NDJSON, streamed in chunks"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export. Must be one of: {list(EXPORT_DATASETS)}"
+        )
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Must be one of: {list(EXPORT_FORMATS)}"
+        )
+    
+    # The generator opens its own connection: this request's session is closed before the body is sent
+    return StreamingResponse(
+        export_rows(get_read_engine(), dataset, format, start, end),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
+
+
+@router.post("/{admin_id}/analytics/snapshot", status_code=status.HTTP_202_ACCEPTED)
+def request_analytics_snapshot(admin_id: int, db: Session = Depends(get_db)):
+    """Admin queues a refresh of the Parquet snapshot the reports read; the job worker exports it from a replica"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    schedule_snapshot(db)
+    db.commit()
+    
+    return {"message": "Analytics snapshot queued", "last_snapshot_at": snapshot_time()}
+
+
+@router.get("/{admin_id}/reports/{report}")
+def get_report(
+    admin_id: int,
+    report: str,
+    start: date | None = None,
+    end: date | None = None,
+    db: Session = Depends(get_read_db)
+):
+    """Admin runs an aggregate report over the latest analytics snapshot, not the live database"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    if report not in REPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown report. Must be one of: {list(REPORTS)}"
+        )
+    
+    snapshot_at = snapshot_time()
+    if snapshot_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No analytics snapshot yet. Run `python manage.py snapshot-analytics` or POST /admin/{admin_id}/analytics/snapshot"
+        )
+    
+    return {
+        "report": report,
+        "snapshot_at": snapshot_at,
+        "start": start,
+        "end": end,
+        "rows": run_report(report, start, end)
+    }
+
+
+@router.get("/{admin_id}/profiles")
+def list_request_profiles(admin_id: int, db: Session = Depends(get_read_db)):
+    """Admin lists the request profiles kept in this worker's buffer, newest first"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    return {
+        "enabled": PROFILING_ENABLED,
+        "profiles": [profile.summary() for profile in profiles.list()]
+    }
+
+
+@router.get("/{admin_id}/profiles/{profile_id}")
+def download_request_profile(
+    admin_id: int,
+    profile_id: int,
+    format: str = "collapsed",
+    top: int = 25,
+    db: Session = Depends(get_read_db)
+):
+    """Admin downloads a request profile as folded stacks (flame graphs) or a JSON summary of hot functions"""
+    
+    # Validate admin exists
+    admin = db.scalars(queries.admin_by_id, {"admin_id": admin_id}).first()
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Admin with id {admin_id} not found"
+        )
+    
+    if format not in ("collapsed", "json"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported format. Must be one of: ['collapsed', 'json']"
+        )
+    
+    profile = profiles.get(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found; only the last profiles are kept, per worker"
+        )
+    
+    if format == "json":
+        return profile.summary(top=top)
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'}
+    )
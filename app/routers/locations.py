@@ -0,0 +1,178 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import queries
+from app.database import get_read_db
+from models.location import Location
+from datetime import date, datetime, time, timedelta
+
+router = APIRouter(prefix="/locations", tags=["Locations"])
+
+def _get_location(db: Session, location_id: int) -> Location:
+    location = db.scalars(queries.location_by_id, {"location_id": location_id}).first()
+    if not location:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Location with id {location_id} not found"
+        )
+    return location
+
+@router.get("", status_code=status.HTTP_200_OK)
+def list_locations(db: Session = Depends(get_read_db)):
+    """List every club"""
+
+    locations = db.scalars(select(Location).order_by(Location.location_id)).all()
+
+    return {
+        "locations": [
+            {
+                "location_id": location.location_id,
+                "name": location.name,
+                "address": location.address
+            }
+            for location in locations
+        ]
+    }
+
+@router.get("/{location_id}/rooms", status_code=status.HTTP_200_OK)
+def get_location_rooms(location_id: int, db: Session = Depends(get_read_db)):
+    """Rooms at one club"""
+
+    location = _get_location(db, location_id)
+    rooms = db.scalars(queries.location_rooms, {"location_id": location_id}).all()
+
+    return {
+        "location_id": location_id,
+        "location": location.name,
+        "rooms": [
+            {
+                "room_id": room.room_id,
+                "room_name": room.room_name,
+                "room_number": room.room_number,
+                "room_type": room.room_type.value,
+                "capacity": room.capacity,
+                "status": room.status.value,
+                "floor": room.floor
+            }
+            for room in rooms
+        ]
+    }
+
+@router.get("/{location_id}/classes", status_code=status.HTTP_200_OK)
+def get_location_classes(location_id: int, db: Session = Depends(get_read_db)):
+    """Weekly group class timetable of one club"""
+
+    location = _get_location(db, location_id)
+    classes = db.execute(queries.location_classes, {"location_id": location_id}).all()
+
+    return {
+        "location_id": location_id,
+        "location": location.name,
+        "classes": [
+            {
+                "class_id": group_class.class_id,
+                "class_name": group_class.class_name,
+                "day": group_class.day.value,
+                "start_time": group_class.start_time.isoformat(),
+                "end_time": group_class.end_time.isoformat(),
+                "room": room_name,
+                "trainer": f"{first_name} {last_name}",
+                "capacity": group_class.capacity
+            }
+            for group_class, room_name, first_name, last_name in classes
+        ]
+    }
+
+@router.get("/{location_id}/trainers", status_code=status.HTTP_200_OK)
+def get_location_trainers(location_id: int, db: Session = Depends(get_read_db)):
+    """Trainers whose home club is this location"""
+
+    location = _get_location(db, location_id)
+    trainers = db.execute(queries.location_trainers, {"location_id": location_id}).all()
+
+    return {
+        "location_id": location_id,
+        "location": location.name,
+        "trainers": [
+            {
+                "trainer_id": trainer_id,
+                "name": f"{first_name} {last_name}",
+                "specialty": specialty
+            }
+            for trainer_id, first_name, last_name, specialty in trainers
+        ]
+    }
+
+@router.get("/{location_id}/schedule", status_code=status.HTTP_200_OK)
+def get_location_schedule(
+    location_id: int,
+    start: date | None = None,
+    days: int = Query(7, ge=1, le=31),
+    db: Session = Depends(get_read_db)
+):
+    """Dated class occurrences at one club, from start (default today) for the given number of days"""
+
+    location = _get_location(db, location_id)
+    start = start or date.today()
+    occurrences = db.execute(queries.location_occurrences, {
+        "location_id": location_id,
+        "start": start,
+        "end": start + timedelta(days=days)
+    }).all()
+
+    return {
+        "location_id": location_id,
+        "location": location.name,
+        "occurrences": [
+            {
+                "occurrence_id": occurrence.occurrence_id,
+                "class_id": occurrence.class_id,
+                "class_name": class_name,
+                "room": room_name,
+                "start_time": occurrence.start_time.isoformat(),
+                "end_time": occurrence.end_time.isoformat(),
+                "capacity": occurrence.capacity
+            }
+            for occurrence, class_name, room_name in occurrences
+        ]
+    }
+
+@router.get("/{location_id}/rooms/{room_id}/calendar", status_code=status.HTTP_200_OK)
+def get_room_calendar(
+    location_id: int,
+    room_id: int,
+    start: date | None = None,
+    days: int = Query(7, ge=1, le=31),
+    db: Session = Depends(get_read_db)
+):
+    """Everything booked in one room, classes and PT sessions alike, from start (default today)"""
+
+    room = db.scalars(queries.room_by_id, {"room_id": room_id}).first()
+    if not room or room.location_id != location_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Room with id {room_id} not found at location {location_id}"
+        )
+    start = start or date.today()
+    entries = db.execute(queries.room_calendar, {
+        "room_id": room_id,
+        "start": datetime.combine(start, time.min),
+        "end": datetime.combine(start + timedelta(days=days), time.min)
+    }).all()
+
+    return {
+        "location_id": location_id,
+        "room_id": room_id,
+        "room": room.room_name,
+        "bookings": [
+            {
+                "kind": entry.kind.value,
+                "starts_at": entry.starts_at.isoformat(),
+                "ends_at": entry.ends_at.isoformat(),
+                "occurrence_id": entry.occurrence_id,
+                "session_id": entry.session_id,
+                "class_name": class_name
+            }
+            for entry, class_name in entries
+        ]
+    }
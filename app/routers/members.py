@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
-from app.database import get_db
+from sqlalchemy import func, insert, text
+from app import queries
+from app.database import get_db, get_read_db
+from app.security import hash_password, verify_password, needs_rehash, PasswordHashingBusy, DUMMY_HASH
+from app.partitions import iter_archived_rows
+from app.jobs import enqueue
+from app.availability_index import get_availability_index
+from app.room_ledger import record_sessions, RoomTaken
+from app.member_search import search_members, invalidate_member_search_index
 import models  # Import models package to ensure all models are loaded
 from models import User, Member, MembershipStatus
 from models.health_metric import HealthMetric
-from models.fitness_goal import FitnessGoal, GoalStatusEnum
+from models.fitness_goal import FitnessGoal, GoalStatusEnum, GoalTypeEnum, GoalMetric, GoalComparator
 from models.personal_training_session import PersonalTrainingSession, SessionStatus
 from models.class_registration import ClassRegistration, AttendanceStatus
-from pydantic import BaseModel, EmailStr
-from datetime import date,time, datetime
+from models.class_occurrence import ClassOccurrence
+from models.class_waitlist import ClassWaitlist
+from pydantic import BaseModel, EmailStr, Field
+from typing import Literal
+from datetime import date,time, datetime, timedelta
 from decimal import Decimal
 from models.group_class import GroupClass, DaysOfWeek
 from models.room import Room
 from models.trainer_availability import TrainerAvailability, AvailabilityStatus
 from models.user import Trainer
-from models.fitness_goal import GoalStatusEnum
 
 router = APIRouter(prefix="/members", tags=["Members"])
 
@@ -27,26 +36,47 @@ class MemberRegistration(BaseModel):
     password: str
     phone: str | None = None
     date_of_birth: date
+    location_id: int | None = None  # home club
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 def register_member(registration: MemberRegistration, db: Session = Depends(get_db)):
     """Register a new member"""
     
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == registration.email).first()
+    existing_user = db.scalars(queries.user_by_email, {"email": registration.email}).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    # Validate home club exists
+    if registration.location_id is not None:
+        location = db.scalars(queries.location_by_id, {"location_id": registration.location_id}).first()
+        if not location:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Location with id {registration.location_id} not found"
+            )
+    
+    # Hash password on the bounded hashing pool
+    try:
+        password_hash = hash_password(registration.password)
+    except PasswordHashingBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    
     # Create user
     new_user = User(
         first_name=registration.first_name,
         last_name=registration.last_name,
         email=registration.email,
-        password_hash=f"hashed_{registration.password}",  # In production, use proper hashing
-        phone=registration.phone
+        password_hash=password_hash,
+        phone=registration.phone,
+        location_id=registration.location_id
     )
     db.add(new_user)
     db.flush()  # Get user_id without committing
@@ -59,6 +89,7 @@ def register_member(registration: MemberRegistration, db: Session = Depends(get_
     )
     db.add(new_member)
     db.commit()
+    invalidate_member_search_index()
     
     return {
         "message": "Member registered successfully",
@@ -66,6 +97,43 @@ def register_member(registration: MemberRegistration, db: Session = Depends(get_
         "email": new_user.email
     }
 
+class MemberLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+@router.post("/login", status_code=status.HTTP_200_OK)
+def login_member(credentials: MemberLogin, db: Session = Depends(get_db)):
+    """Verify a member's email and password"""
+    
+    user = db.scalars(queries.user_by_email, {"email": credentials.email}).first()
+    if user is not None and user.member is None:
+        user = None
+    try:
+        # Without a member account the dummy hash is checked, so every 401 takes as long as a wrong password
+        valid = verify_password(credentials.password, user.password_hash if user else DUMMY_HASH) and user is not None
+        if valid and needs_rehash(user.password_hash):
+            # Upgrade legacy or outdated hashes while we have the plaintext
+            user.password_hash = hash_password(credentials.password)
+            db.commit()
+    except PasswordHashingBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password"
+        )
+    
+    return {
+        "message": "Login successful",
+        "user_id": user.user_id,
+        "email": user.email
+    }
+
 class HealthMetricCreate(BaseModel):
     weight: Decimal
     heart_rate: int
@@ -82,7 +150,7 @@ def log_health_metric(
     """Log a new health metric entry for a member"""
     
     # Validate member exists
-    member = db.query(Member).filter(Member.user_id == member_id).first()
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -99,13 +167,111 @@ def log_health_metric(
         body_fat_percentage=metric.body_fat_percentage
     )
     db.add(new_metric)
+    db.flush()  # id and recorded_at come back via RETURNING, no refresh query needed
+    metric_id, recorded_at = new_metric.metric_id, new_metric.recorded_at
+    
+    # Goal progress is recomputed off the request path, batched with other members' new metrics
+    enqueue(db, "goals.evaluate", {"member_id": member_id})
     db.commit()
-    db.refresh(new_metric)
     
     return {
         "message": "Health metric logged successfully",
-        "metric_id": new_metric.metric_id,
-        "recorded_at": new_metric.recorded_at
+        "metric_id": metric_id,
+        "recorded_at": recorded_at
+    }
+
+@router.get("/search", status_code=status.HTTP_200_OK)
+def search_members_endpoint(
+    q: str = Query(min_length=2, max_length=100),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Front-desk search by partial name, email or phone, best matches first"""
+    
+    # One extra row tells whether there is a next page without counting every match
+    hits = search_members(db, q, limit=page_size + 1, offset=(page - 1) * page_size)
+    
+    return {
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "has_more": len(hits) > page_size,
+        "members": [
+            {
+                "member_id": hit.member_id,
+                "name": f"{hit.first_name} {hit.last_name}",
+                "email": hit.email,
+                "phone": hit.phone,
+                "membership_status": hit.membership_status.value,
+                "score": round(hit.score, 3)
+            }
+            for hit in hits[:page_size]
+        ]
+    }
+
+@router.get("/{member_id}/health-metrics", status_code=status.HTTP_200_OK)
+def get_health_metric_history(
+    member_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """Get a member's health metric history, optionally including archived months"""
+    
+    # Validate member exists
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Member with id {member_id} not found"
+        )
+    
+    # Date bounds let PostgreSQL prune to the partitions that matter
+    query = db.query(HealthMetric).filter(HealthMetric.member_id == member_id)
+    if start is not None:
+        query = query.filter(HealthMetric.recorded_at >= start)
+    if end is not None:
+        query = query.filter(HealthMetric.recorded_at < end)
+    
+    metrics = [
+        {
+            "metric_id": metric.metric_id,
+            "weight": float(metric.weight),
+            "heart_rate": metric.heart_rate,
+            "height": float(metric.height),
+            "blood_pressure": metric.blood_pressure,
+            "body_fat_percentage": float(metric.body_fat_percentage),
+            "recorded_at": metric.recorded_at.isoformat(),
+            "archived": False
+        }
+        for metric in query.all()
+    ]
+    
+    if include_archived:
+        for row in iter_archived_rows(
+            "health_metric", start, end, where=lambda row: row["member_id"] == str(member_id)
+        ):
+            recorded_at = datetime.fromisoformat(row["recorded_at"])
+            if (start and recorded_at.date() < start) or (end and recorded_at.date() >= end):
+                continue
+            metrics.append({
+                "metric_id": int(row["metric_id"]),
+                "weight": float(row["weight"]),
+                "heart_rate": int(row["heart_rate"]),
+                "height": float(row["height"]),
+                "blood_pressure": row["blood_pressure"],
+                "body_fat_percentage": float(row["body_fat_percentage"]),
+                "recorded_at": recorded_at.isoformat(),
+                "archived": True
+            })
+    
+    metrics.sort(key=lambda metric: metric["recorded_at"], reverse=True)
+    
+    return {
+        "member_id": member_id,
+        "health_metrics": metrics
     }
 
 class MemberProfileUpdate(BaseModel):
@@ -115,6 +281,76 @@ class MemberProfileUpdate(BaseModel):
     phone: str | None = None
     date_of_birth: date | None = None
 
+class FitnessGoalCreate(BaseModel):
+    goal_type: str
+    metric: str  # weight, body_fat_percentage or heart_rate
+    comparator: str  # "<=" or ">="
+    target: Decimal
+    deadline: date | None = None
+    description: str | None = None
+
+@router.post("/{member_id}/goals", status_code=status.HTTP_201_CREATED)
+def set_fitness_goal(
+    member_id: int,
+    goal: FitnessGoalCreate,
+    db: Session = Depends(get_db)
+):
+    """Set a measurable goal, tracked against the member's health metrics"""
+    
+    # Validate member exists
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Member with id {member_id} not found"
+        )
+    
+    # Validate enums
+    try:
+        goal_type = GoalTypeEnum[goal.goal_type.upper()]
+        metric = GoalMetric(goal.metric)
+        comparator = GoalComparator(goal.comparator)
+    except (KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"goal_type must be one of {[g.name for g in GoalTypeEnum]}, "
+                   f"metric one of {[m.value for m in GoalMetric]}, "
+                   f"comparator one of {[c.value for c in GoalComparator]}"
+        )
+    
+    # Progress is measured from the latest metric; only newer metrics count towards the goal
+    latest = db.scalars(queries.latest_member_metric, {"member_id": member_id}).first()
+    baseline = getattr(latest, metric.value) if latest else None
+    if baseline is not None and (baseline <= goal.target if comparator == GoalComparator.AT_MOST else baseline >= goal.target):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Target already reached: latest {metric.value} is {baseline}"
+        )
+    
+    new_goal = FitnessGoal(
+        member_id=member_id,
+        goal_type=goal_type,
+        deadline=goal.deadline,
+        target_value=goal.description or f"{metric.value} {comparator.value} {goal.target}",
+        status=GoalStatusEnum.ACTIVE,
+        metric=metric,
+        comparator=comparator,
+        target_number=goal.target,
+        baseline_value=baseline,
+        progress=0,
+        evaluated_at=latest.recorded_at if latest else None
+    )
+    db.add(new_goal)
+    db.commit()
+    db.refresh(new_goal)
+    
+    return {
+        "message": "Goal set successfully",
+        "goal_id": new_goal.goal_id,
+        "target_value": new_goal.target_value,
+        "baseline": float(baseline) if baseline is not None else None
+    }
+
 @router.put("/{member_id}", status_code=status.HTTP_200_OK)
 def update_member_profile(
     member_id: int,
@@ -124,7 +360,7 @@ def update_member_profile(
     """Update member's personal details"""
     
     # Validate member exists
-    member = db.query(Member).filter(Member.user_id == member_id).first()
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -159,28 +395,28 @@ def update_member_profile(
         member.date_of_birth = profile_update.date_of_birth
     
     db.commit()
+    invalidate_member_search_index()
     
     return {
         "message": "Profile updated successfully",
         "user_id": member_id
     }
 
-from models.class_registration import ClassRegistration, AttendanceStatus
-from models.group_class import GroupClass
-
 class ClassRegistrationCreate(BaseModel):
     class_id: int
+    occurrence_date: date | None = None  # defaults to the next upcoming occurrence
 
 @router.post("/{member_id}/class-registrations", status_code=status.HTTP_201_CREATED)
 def register_for_class(
     member_id: int,
     registration: ClassRegistrationCreate,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """Register a member for a group class"""
+    """Register a member for a dated occurrence of a group class"""
     
     # Check member exists
-    member = db.query(Member).filter(Member.user_id == member_id).first()
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -195,10 +431,33 @@ def register_for_class(
             detail=f"Class with id {registration.class_id} not found"
         )
     
-    # Check if already registered
+    # Find the occurrence being booked
+    occurrence_query = db.query(ClassOccurrence).filter(ClassOccurrence.class_id == registration.class_id)
+    if registration.occurrence_date is not None:
+        occurrence = occurrence_query.filter(
+            ClassOccurrence.occurrence_date == registration.occurrence_date
+        ).first()
+    else:
+        occurrence = occurrence_query.filter(
+            ClassOccurrence.start_time >= datetime.now()
+        ).order_by(ClassOccurrence.start_time).first()
+    if occurrence:
+        # Lock the occurrence so capacity and waitlist decisions for it are serialized
+        occurrence = db.query(ClassOccurrence).filter(
+            ClassOccurrence.occurrence_id == occurrence.occurrence_id
+        ).with_for_update().first()
+    if not occurrence:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No scheduled occurrence of class {registration.class_id}"
+                   + (f" on {registration.occurrence_date}" if registration.occurrence_date else "")
+        )
+    
+    # Check if already registered for this occurrence
     existing = db.query(ClassRegistration).filter(
         ClassRegistration.member_id == member_id,
-        ClassRegistration.class_id == registration.class_id
+        ClassRegistration.occurrence_id == occurrence.occurrence_id,
+        ClassRegistration.attended_status != AttendanceStatus.CANCELLED
     ).first()
     if existing:
         raise HTTPException(
@@ -206,21 +465,72 @@ def register_for_class(
             detail="Already registered for this class"
         )
     
+    # Check if already waiting for this occurrence
+    waiting = db.query(ClassWaitlist).filter(
+        ClassWaitlist.occurrence_id == occurrence.occurrence_id,
+        ClassWaitlist.member_id == member_id
+    ).first()
+    if waiting:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Already on the waitlist for this class"
+        )
+    
+    # Full classes put the member on the waitlist instead of failing
+    registered_count = db.query(func.count(ClassRegistration.registration_id)).filter(
+        ClassRegistration.occurrence_id == occurrence.occurrence_id,
+        ClassRegistration.attended_status != AttendanceStatus.CANCELLED
+    ).scalar()
+    if registered_count >= occurrence.capacity:
+        last_position = db.query(func.max(ClassWaitlist.position)).filter(
+            ClassWaitlist.occurrence_id == occurrence.occurrence_id
+        ).scalar()
+        entry = ClassWaitlist(
+            occurrence_id=occurrence.occurrence_id,
+            member_id=member_id,
+            position=(last_position or 0) + 1
+        )
+        db.add(entry)
+        db.flush()
+        place = _waitlist_place(db, entry)
+        db.commit()
+        
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "message": "Class is full - added to the waitlist",
+            "waitlist_id": entry.waitlist_id,
+            "class_name": group_class.class_name,
+            "occurrence_id": occurrence.occurrence_id,
+            "date": occurrence.occurrence_date.isoformat(),
+            "waitlist_position": place
+        }
+    
     # Create registration - trigger will check capacity
     try:
         new_registration = ClassRegistration(
             member_id=member_id,
             class_id=registration.class_id,
+            occurrence_id=occurrence.occurrence_id,
             attended_status=AttendanceStatus.REGISTERED
         )
         db.add(new_registration)
+        db.flush()
+        registration_id = new_registration.registration_id
+        
+        # Confirmation goes out from the job runner, not this request
+        enqueue(db, "notify.class_registration", {
+            "member_id": member_id,
+            "class_name": group_class.class_name,
+            "date": occurrence.occurrence_date.isoformat()
+        })
         db.commit()
-        db.refresh(new_registration)
         
         return {
             "message": "Successfully registered for class",
-            "registration_id": new_registration.registration_id,
-            "class_name": group_class.class_name
+            "registration_id": registration_id,
+            "class_name": group_class.class_name,
+            "occurrence_id": occurrence.occurrence_id,
+            "date": occurrence.occurrence_date.isoformat()
         }
     except Exception as e:
         db.rollback()
@@ -229,15 +539,175 @@ def register_for_class(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+
+def _waitlist_place(db: Session, entry: ClassWaitlist) -> int:
+    """1-based place in line: entries ahead of this one plus itself"""
+    return db.query(func.count(ClassWaitlist.waitlist_id)).filter(
+        ClassWaitlist.occurrence_id == entry.occurrence_id,
+        ClassWaitlist.position <= entry.position
+    ).scalar()
+
+def _promote_from_waitlist(db: Session, occurrence: ClassOccurrence) -> ClassWaitlist | None:
+    """Move the first waiting member into a freed spot. Runs in the caller's transaction,
+    which must hold the occurrence lock.
+    """
+    booked = db.scalar(queries.occurrence_booked_count, {"occurrence_id": occurrence.occurrence_id})
+    if booked >= occurrence.capacity:
+        return None
+    
+    entry = db.query(ClassWaitlist).filter(
+        ClassWaitlist.occurrence_id == occurrence.occurrence_id
+    ).order_by(ClassWaitlist.position).with_for_update(skip_locked=True).first()
+    if not entry:
+        return None
+    
+    db.add(ClassRegistration(
+        member_id=entry.member_id,
+        class_id=occurrence.class_id,
+        occurrence_id=occurrence.occurrence_id,
+        attended_status=AttendanceStatus.REGISTERED
+    ))
+    db.delete(entry)
+    enqueue(db, "notify.waitlist_promotion", {
+        "member_id": entry.member_id,
+        "occurrence_id": occurrence.occurrence_id
+    })
+    return entry
+
+@router.delete("/{member_id}/class-registrations/{registration_id}", status_code=status.HTTP_200_OK)
+def cancel_class_registration(
+    member_id: int,
+    registration_id: int,
+    db: Session = Depends(get_db)
+):
+    """Cancel a class registration, promoting the first member on the waitlist"""
     
+    registration = db.query(ClassRegistration).filter(
+        ClassRegistration.registration_id == registration_id,
+        ClassRegistration.member_id == member_id
+    ).first()
+    if not registration:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Registration with id {registration_id} not found for member {member_id}"
+        )
+    if registration.attended_status != AttendanceStatus.REGISTERED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Registration is already {registration.attended_status.value}"
+        )
+    
+    occurrence = None
+    if registration.occurrence_id is not None:
+        # Same lock as register_for_class, so a new sign-up can't take the freed spot first
+        occurrence = db.query(ClassOccurrence).filter(
+            ClassOccurrence.occurrence_id == registration.occurrence_id
+        ).with_for_update().first()
+    
+    # Checked again under the lock: a concurrent cancel may have got there first
+    cancelled = db.execute(queries.cancel_registration, {
+        "b_registration_id": registration_id,
+        "b_member_id": member_id
+    }).rowcount
+    if not cancelled:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Registration is no longer active"
+        )
+    promoted = _promote_from_waitlist(db, occurrence) if occurrence else None
+    db.commit()
+    
+    return {
+        "message": "Registration cancelled",
+        "registration_id": registration_id,
+        "promoted_member_id": promoted.member_id if promoted else None
+    }
+
+@router.get("/{member_id}/waitlist", status_code=status.HTTP_200_OK)
+def get_member_waitlist(member_id: int, db: Session = Depends(get_read_db)):
+    """Get the classes a member is waiting for and their current place in line"""
+    
+    # Validate member exists
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Member with id {member_id} not found"
+        )
+    
+    # Rank every entry of the occurrences this member waits on in one pass
+    ranked = db.query(
+        ClassWaitlist.waitlist_id,
+        ClassWaitlist.member_id,
+        ClassWaitlist.occurrence_id,
+        func.row_number().over(
+            partition_by=ClassWaitlist.occurrence_id,
+            order_by=ClassWaitlist.position
+        ).label("place")
+    ).filter(
+        ClassWaitlist.occurrence_id.in_(
+            db.query(ClassWaitlist.occurrence_id).filter(ClassWaitlist.member_id == member_id)
+        )
+    ).subquery()
+    
+    entries = db.query(
+        ranked.c.waitlist_id,
+        ranked.c.place,
+        ClassOccurrence,
+        GroupClass.class_name
+    ).join(
+        ClassOccurrence, ranked.c.occurrence_id == ClassOccurrence.occurrence_id
+    ).join(
+        GroupClass, ClassOccurrence.class_id == GroupClass.class_id
+    ).filter(
+        ranked.c.member_id == member_id
+    ).order_by(ClassOccurrence.start_time).all()
+    
+    return {
+        "member_id": member_id,
+        "waitlist": [
+            {
+                "waitlist_id": waitlist_id,
+                "class_name": class_name,
+                "occurrence_id": occurrence.occurrence_id,
+                "date": occurrence.occurrence_date.isoformat(),
+                "start_time": occurrence.start_time.isoformat(),
+                "waitlist_position": place
+            }
+            for waitlist_id, place, occurrence, class_name in entries
+        ]
+    }
+
+@router.delete("/{member_id}/waitlist/{waitlist_id}", status_code=status.HTTP_200_OK)
+def leave_waitlist(member_id: int, waitlist_id: int, db: Session = Depends(get_db)):
+    """Remove a member from a class waitlist"""
+    
+    entry = db.query(ClassWaitlist).filter(
+        ClassWaitlist.waitlist_id == waitlist_id,
+        ClassWaitlist.member_id == member_id
+    ).first()
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Waitlist entry with id {waitlist_id} not found for member {member_id}"
+        )
+    
+    db.delete(entry)
+    db.commit()
+    
+    return {
+        "message": "Removed from waitlist",
+        "waitlist_id": waitlist_id
+    }
 
 
 @router.get("/{member_id}/dashboard", status_code=status.HTTP_200_OK)
-def get_member_dashboard(member_id: int, db: Session = Depends(get_db)):
+def get_member_dashboard(member_id: int, db: Session = Depends(get_read_db)):
     """Get member's dashboard with health stats, goals, and activity summary"""
     
     # Validate member exists
-    member = db.query(Member).filter(Member.user_id == member_id).first()
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -246,27 +716,18 @@ def get_member_dashboard(member_id: int, db: Session = Depends(get_db)):
     
     # 1. Get latest health metrics using VIEW
     latest_health = db.execute(
-        text("SELECT * FROM member_latest_health_metrics WHERE user_id = :user_id"),
-        {"user_id": member_id}
+        queries.latest_health_metrics, {"user_id": member_id}
     ).fetchone()
     
     # 2. Get active fitness goals
-    active_goals = db.query(FitnessGoal).filter(
-        FitnessGoal.member_id == member_id,
-        FitnessGoal.status == GoalStatusEnum.ACTIVE
-    ).all()
+    active_goals = db.scalars(queries.active_goals, {"member_id": member_id}).all()
     
     # 3. Count past class attendance
-    past_class_count = db.query(func.count(ClassRegistration.registration_id)).filter(
-        ClassRegistration.member_id == member_id,
-        ClassRegistration.attended_status == AttendanceStatus.ATTENDED
-    ).scalar()
+    past_class_count = db.scalar(queries.attended_class_count, {"member_id": member_id})
     
     # 4. Get upcoming PT sessions
-    upcoming_sessions = db.query(PersonalTrainingSession).filter(
-        PersonalTrainingSession.member_id == member_id,
-        PersonalTrainingSession.status == SessionStatus.SCHEDULED,
-        PersonalTrainingSession.session_date >= date.today()
+    upcoming_sessions = db.scalars(
+        queries.upcoming_member_sessions, {"member_id": member_id, "today": date.today()}
     ).all()
     
     # Format response
@@ -287,7 +748,8 @@ def get_member_dashboard(member_id: int, db: Session = Depends(get_db)):
             "goal_type": goal.goal_type.value,
             "target_value": goal.target_value,
             "deadline": goal.deadline.isoformat() if goal.deadline else None,
-            "status": goal.status.value
+            "status": goal.status.value,
+            "progress": float(goal.progress) if goal.progress is not None else None
         }
         for goal in active_goals
     ]
@@ -310,8 +772,6 @@ def get_member_dashboard(member_id: int, db: Session = Depends(get_db)):
         "upcoming_pt_sessions": sessions_list
     }
 
-from models.trainer_availability import TrainerAvailability
-
 class PTSessionCreate(BaseModel):
     trainer_id: int
     room_id: int
@@ -328,7 +788,7 @@ def schedule_pt_session(
     """Schedule a personal training session"""
     
     # 1. Validate member exists
-    member = db.query(Member).filter(Member.user_id == member_id).first()
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -336,7 +796,7 @@ def schedule_pt_session(
         )
     
     # 2. Validate trainer exists
-    trainer = db.query(Trainer).filter(Trainer.user_id == session.trainer_id).first()
+    trainer = db.scalars(queries.trainer_by_id, {"trainer_id": session.trainer_id}).first()
     if not trainer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -344,7 +804,7 @@ def schedule_pt_session(
         )
     
     # 3. Validate room exists
-    room = db.query(Room).filter(Room.room_id == session.room_id).first()
+    room = db.scalars(queries.room_by_id, {"room_id": session.room_id}).first()
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -369,20 +829,9 @@ def schedule_pt_session(
         )
     
     # Check if trainer has availability on this day covering the requested time
-    availability = db.query(TrainerAvailability).filter(
-        TrainerAvailability.trainer_id == session.trainer_id,
-        TrainerAvailability.dayOfWeek == day_enum,
-        TrainerAvailability.status == AvailabilityStatus.ACTIVE
-    ).all()
-    
-    # Check if any availability slot covers the requested time
-    time_covered = False
-    for avail in availability:
-        avail_start = avail.start_time.time()
-        avail_end = avail.end_time.time()
-        if avail_start <= session.start_time and session.end_time <= avail_end:
-            time_covered = True
-            break
+    time_covered = get_availability_index(db).covers(
+        session.trainer_id, day_enum, session.start_time, session.end_time
+    )
     
     if not time_covered:
         raise HTTPException(
@@ -391,12 +840,12 @@ def schedule_pt_session(
         )
     
     # 6. Check for trainer conflicts (other PT sessions)
-    trainer_conflict = db.query(PersonalTrainingSession).filter(
-        PersonalTrainingSession.trainer_id == session.trainer_id,
-        PersonalTrainingSession.session_date == session.session_date,
-        PersonalTrainingSession.start_time < datetime.combine(session.session_date, session.end_time),
-        PersonalTrainingSession.end_time > datetime.combine(session.session_date, session.start_time)
-    ).first()
+    slot = {
+        "session_date": session.session_date,
+        "start_time": datetime.combine(session.session_date, session.start_time),
+        "end_time": datetime.combine(session.session_date, session.end_time)
+    }
+    trainer_conflict = db.scalar(queries.trainer_session_conflict, {"trainer_id": session.trainer_id, **slot})
     
     if trainer_conflict:
         raise HTTPException(
@@ -404,13 +853,8 @@ def schedule_pt_session(
             detail="Trainer already has a session at this time"
         )
     
-    # 7. Check for room conflicts
-    room_conflict = db.query(PersonalTrainingSession).filter(
-        PersonalTrainingSession.room_id == session.room_id,
-        PersonalTrainingSession.session_date == session.session_date,
-        PersonalTrainingSession.start_time < datetime.combine(session.session_date, session.end_time),
-        PersonalTrainingSession.end_time > datetime.combine(session.session_date, session.start_time)
-    ).first()
+    # 7. Check for room conflicts with classes and other sessions
+    room_conflict = db.scalar(queries.room_occupancy_conflict, {"room_id": session.room_id, **slot})
     
     if room_conflict:
         raise HTTPException(
@@ -430,6 +874,16 @@ def schedule_pt_session(
     )
     
     db.add(new_session)
+    db.flush()
+    try:
+        record_sessions(db, [(new_session.session_id, new_session.room_id, new_session.start_time, new_session.end_time)])
+    except RoomTaken as e:
+        # Booked by a concurrent request after the check above
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     db.commit()
     db.refresh(new_session)
     
@@ -440,4 +894,129 @@ def schedule_pt_session(
         "room": room.room_name,
         "date": new_session.session_date.isoformat(),
         "time": f"{session.start_time} - {session.end_time}"
-    }
\ No newline at end of file
+    }
+
+class RecurringPTSessionCreate(BaseModel):
+    trainer_id: int
+    room_id: int
+    first_date: date
+    start_time: time
+    end_time: time
+    weeks: int = Field(ge=1, le=52)
+    # all_or_nothing books nothing if any date is taken; partial books the free dates
+    mode: Literal["all_or_nothing", "partial"] = "all_or_nothing"
+
+@router.post("/{member_id}/pt-sessions/recurring", status_code=status.HTTP_201_CREATED)
+def schedule_recurring_pt_sessions(
+    member_id: int,
+    booking: RecurringPTSessionCreate,
+    db: Session = Depends(get_db)
+):
+    """Schedule the same weekly PT slot for several weeks, starting on first_date"""
+
+    member = db.scalars(queries.member_by_id, {"member_id": member_id}).first()
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Member with id {member_id} not found"
+        )
+
+    trainer = db.scalars(queries.trainer_by_id, {"trainer_id": booking.trainer_id}).first()
+    if not trainer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trainer with id {booking.trainer_id} not found"
+        )
+
+    room = db.scalars(queries.room_by_id, {"room_id": booking.room_id}).first()
+    if not room:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Room with id {booking.room_id} not found"
+        )
+
+    if booking.start_time >= booking.end_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start time must be before end time"
+        )
+
+    # Every date falls on the same weekday, so one availability lookup covers them all
+    day_string = booking.first_date.strftime('%A').upper()
+    if not get_availability_index(db).covers(
+        booking.trainer_id, DaysOfWeek[day_string], booking.start_time, booking.end_time
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trainer is not available on {day_string} at the requested time"
+        )
+
+    dates = [booking.first_date + timedelta(weeks=week) for week in range(booking.weeks)]
+    slots = queries.requested_slots([
+        (session_date,
+         datetime.combine(session_date, booking.start_time),
+         datetime.combine(session_date, booking.end_time))
+        for session_date in dates
+    ])
+
+    # One query per check for all dates
+    failed = {}
+    for session_date in db.scalars(queries.slot_room_conflicts(slots), {"room_id": booking.room_id}):
+        failed[session_date] = "Room is already booked at this time"
+    for session_date in db.scalars(queries.slot_trainer_conflicts(slots), {"trainer_id": booking.trainer_id}):
+        failed[session_date] = "Trainer already has a session at this time"
+
+    free_dates = [session_date for session_date in dates if session_date not in failed]
+    failed_list = [
+        {"date": session_date.isoformat(), "reason": failed[session_date]}
+        for session_date in sorted(failed)
+    ]
+    if not free_dates or (failed and booking.mode == "all_or_nothing"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "No sessions were booked", "failed": failed_list}
+        )
+
+    # All sessions in a single multi-row INSERT
+    created = db.execute(
+        insert(PersonalTrainingSession).values([
+            {
+                "member_id": member_id,
+                "trainer_id": booking.trainer_id,
+                "room_id": booking.room_id,
+                "session_date": session_date,
+                "start_time": datetime.combine(session_date, booking.start_time),
+                "end_time": datetime.combine(session_date, booking.end_time),
+                "status": SessionStatus.SCHEDULED
+            }
+            for session_date in free_dates
+        ]).returning(PersonalTrainingSession.session_id, PersonalTrainingSession.session_date)
+    ).all()
+    try:
+        record_sessions(db, [
+            (session_id,
+             booking.room_id,
+             datetime.combine(session_date, booking.start_time),
+             datetime.combine(session_date, booking.end_time))
+            for session_id, session_date in created
+        ])
+    except RoomTaken as e:
+        # A concurrent booking took one of the dates after the checks above
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "No sessions were booked", "failed": [], "reason": str(e)}
+        )
+    db.commit()
+
+    return {
+        "message": f"{len(created)} of {len(dates)} PT sessions scheduled",
+        "trainer": f"{trainer.user.first_name} {trainer.user.last_name}",
+        "room": room.room_name,
+        "time": f"{booking.start_time} - {booking.end_time}",
+        "sessions": [
+            {"session_id": session_id, "date": session_date.isoformat()}
+            for session_id, session_date in sorted(created, key=lambda row: row[1])
+        ],
+        "failed": failed_list
+    }
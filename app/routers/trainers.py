@@ -1,18 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app import queries
+from app.database import get_db, get_read_db
+from app.availability_index import get_availability_index, invalidate_availability_index
 from models import Trainer
 from models.trainer_availability import TrainerAvailability, AvailabilityStatus
 from models.group_class import DaysOfWeek
 from pydantic import BaseModel
-from datetime import time, datetime
+from datetime import time, datetime, date, timedelta
 from models.personal_training_session import PersonalTrainingSession, SessionStatus
 from models.group_class import GroupClass
 from models.room import Room
 from models.user import Member, User
+from models.class_registration import AttendanceStatus
 
 router = APIRouter(prefix="/trainers", tags=["Trainers"])
 
+@router.get("/available", status_code=status.HTTP_200_OK)
+def get_available_trainers(
+    at: datetime,
+    minutes: int = Query(60, ge=1, le=24 * 60),
+    db: Session = Depends(get_db)
+):
+    """Trainers whose availability covers [at, at + minutes) and who have no session or class then"""
+    
+    end = at + timedelta(minutes=minutes)
+    if end.date() != at.date():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The requested slot must end on the same day"
+        )
+    
+    day_enum = DaysOfWeek[at.strftime('%A').upper()]
+    
+    # Candidates from the cached availability index, no query per trainer
+    index = get_availability_index(db)
+    candidates = [
+        trainer_id for trainer_id in index.trainers_free_at(day_enum, at.time())
+        if index.covers(trainer_id, day_enum, at.time(), end.time())
+    ]
+    
+    busy = set()
+    if candidates:
+        busy = set(db.scalars(queries.busy_trainers, {
+            "trainer_ids": candidates,
+            "session_date": at.date(),
+            "start_time": at,
+            "end_time": end,
+            "day": day_enum,
+            "start_of_slot": at.time(),
+            "end_of_slot": end.time()
+        }).all())
+    
+    free = [trainer_id for trainer_id in candidates if trainer_id not in busy]
+    trainers = db.execute(queries.trainer_summaries, {"trainer_ids": free}).all() if free else []
+    
+    return {
+        "at": at.isoformat(),
+        "minutes": minutes,
+        "trainers": [
+            {
+                "trainer_id": trainer_id,
+                "name": f"{first_name} {last_name}",
+                "specialty": specialty
+            }
+            for trainer_id, first_name, last_name, specialty in trainers
+        ]
+    }
+
 class AvailabilityCreate(BaseModel):
     day: str  # Will validate against daysOfWeek enum
     start_time: time
@@ -27,7 +82,7 @@ def set_trainer_availability(
     """Set trainer availability for a specific day"""
     
     # Check trainer exists
-    trainer = db.query(Trainer).filter(Trainer.user_id == trainer_id).first()
+    trainer = db.scalars(queries.trainer_by_id, {"trainer_id": trainer_id}).first()
     if not trainer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -56,8 +111,8 @@ def set_trainer_availability(
         TrainerAvailability.trainer_id == trainer_id,
         TrainerAvailability.dayOfWeek == day_enum,
         TrainerAvailability.status == AvailabilityStatus.ACTIVE,
-        TrainerAvailability.start_time < datetime.combine(datetime.today(), availability.end_time),
-        TrainerAvailability.end_time > datetime.combine(datetime.today(), availability.start_time)
+        TrainerAvailability.start_time < availability.end_time,
+        TrainerAvailability.end_time > availability.start_time
     ).first()
     
     if overlapping:
@@ -70,14 +125,15 @@ def set_trainer_availability(
     new_availability = TrainerAvailability(
         trainer_id=trainer_id,
         dayOfWeek=day_enum,
-        start_time=datetime.combine(datetime.today(), availability.start_time),
-        end_time=datetime.combine(datetime.today(), availability.end_time),
+        start_time=availability.start_time,
+        end_time=availability.end_time,
         status=AvailabilityStatus.ACTIVE
     )
     
     db.add(new_availability)
     db.commit()
     db.refresh(new_availability)
+    invalidate_availability_index()
     
     return {
         "message": "Availability set successfully",
@@ -87,11 +143,11 @@ def set_trainer_availability(
     }
 
 @router.get("/{trainer_id}/schedule", status_code=status.HTTP_200_OK)
-def get_trainer_schedule(trainer_id: int, db: Session = Depends(get_db)):
+def get_trainer_schedule(trainer_id: int, db: Session = Depends(get_read_db)):
     """Get trainer's schedule including PT sessions and group classes"""
     
     # Check trainer exists
-    trainer = db.query(Trainer).filter(Trainer.user_id == trainer_id).first()
+    trainer = db.scalars(queries.trainer_by_id, {"trainer_id": trainer_id}).first()
     if not trainer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -99,31 +155,12 @@ def get_trainer_schedule(trainer_id: int, db: Session = Depends(get_db)):
         )
     
     # Get PT sessions
-    pt_sessions = db.query(
-        PersonalTrainingSession,
-        User.first_name,
-        User.last_name,
-        Room.room_name
-    ).join(
-        Member, PersonalTrainingSession.member_id == Member.user_id
-    ).join(
-        User, Member.user_id == User.user_id
-    ).join(
-        Room, PersonalTrainingSession.room_id == Room.room_id
-    ).filter(
-        PersonalTrainingSession.trainer_id == trainer_id,
-        PersonalTrainingSession.status.in_([SessionStatus.SCHEDULED])
+    pt_sessions = db.execute(
+        queries.upcoming_trainer_sessions, {"trainer_id": trainer_id, "today": date.today()}
     ).all()
     
     # Get group classes
-    group_classes = db.query(
-        GroupClass,
-        Room.room_name
-    ).join(
-        Room, GroupClass.room_id == Room.room_id
-    ).filter(
-        GroupClass.trainer_id == trainer_id
-    ).all()
+    group_classes = db.execute(queries.trainer_group_classes, {"trainer_id": trainer_id}).all()
     
     # Format PT sessions
     pt_sessions_list = [
@@ -159,4 +196,109 @@ def get_trainer_schedule(trainer_id: int, db: Session = Depends(get_db)):
         "trainer_id": trainer_id,
         "personal_training_sessions": pt_sessions_list,
         "group_classes": group_classes_list
-    }
\ No newline at end of file
+    }
+
+
+class AttendanceUpdate(BaseModel):
+    member_ids: list[int]  # members who checked in
+    occurrence_id: int | None = None  # defaults to today's occurrence of the class
+    final: bool = True  # mark everyone else MISSED; False while members are still scanning in
+
+@router.post("/{trainer_id}/classes/{class_id}/attendance", status_code=status.HTTP_200_OK)
+def record_class_attendance(
+    trainer_id: int,
+    class_id: int,
+    attendance: AttendanceUpdate,
+    db: Session = Depends(get_db)
+):
+    """Record check-ins for one occurrence of a class the trainer teaches"""
+    
+    if attendance.occurrence_id is not None:
+        occurrence = db.scalars(queries.trainer_occurrence_by_id, {
+            "class_id": class_id, "trainer_id": trainer_id, "occurrence_id": attendance.occurrence_id
+        }).first()
+    else:
+        occurrence = db.scalars(queries.trainer_occurrence_on, {
+            "class_id": class_id, "trainer_id": trainer_id, "occurrence_date": date.today()
+        }).first()
+    
+    if not occurrence:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {'such' if attendance.occurrence_id is not None else 'current'} occurrence of class {class_id} taught by trainer {trainer_id}"
+        )
+    
+    # One UPDATE for the whole roster
+    statement = queries.mark_attendance if attendance.final else queries.mark_checked_in
+    updated = db.execute(statement, {
+        "b_occurrence_id": occurrence.occurrence_id,
+        "member_ids": attendance.member_ids
+    }).all()
+    db.commit()
+    
+    attended = {member_id for member_id, attended_status in updated if attended_status == AttendanceStatus.ATTENDED}
+    return {
+        "occurrence_id": occurrence.occurrence_id,
+        "date": occurrence.occurrence_date.isoformat(),
+        "attended": len(attended),
+        "missed": len(updated) - len(attended),
+        "not_registered": sorted(set(attendance.member_ids) - attended)
+    }
+
+
+@router.get("/{trainer_id}/classes/{class_id}/roster", status_code=status.HTTP_200_OK)
+def get_class_roster(
+    trainer_id: int,
+    class_id: int,
+    occurrence_id: int | None = None,
+    db: Session = Depends(get_read_db)
+):
+    """Members booked on an occurrence of a class the trainer teaches (default: the next one from today),
+    with each member's latest health metrics and active goal count. Two queries whatever the class size.
+    """
+    
+    if occurrence_id is not None:
+        row = db.execute(queries.roster_occurrence_by_id, {
+            "class_id": class_id, "trainer_id": trainer_id, "occurrence_id": occurrence_id
+        }).first()
+    else:
+        row = db.execute(queries.roster_next_occurrence, {
+            "class_id": class_id, "trainer_id": trainer_id, "from_date": date.today()
+        }).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {'such' if occurrence_id is not None else 'upcoming'} occurrence of class {class_id} taught by trainer {trainer_id}"
+        )
+    occurrence, class_name = row
+    
+    roster = db.execute(queries.occurrence_roster, {"occurrence_id": occurrence.occurrence_id}).all()
+    
+    members = [
+        {
+            "member_id": entry.member_id,
+            "name": f"{entry.first_name} {entry.last_name}",
+            "attended_status": entry.attended_status.value,
+            "latest_health": {
+                "weight": float(entry.weight),
+                "body_fat_percentage": float(entry.body_fat_percentage),
+                "heart_rate": entry.heart_rate,
+                "recorded_at": entry.recorded_at.isoformat()
+            } if entry.recorded_at else None,
+            "active_goals": entry.active_goals
+        }
+        for entry in roster
+    ]
+    
+    return {
+        "class_id": class_id,
+        "class_name": class_name,
+        "occurrence_id": occurrence.occurrence_id,
+        "date": occurrence.occurrence_date.isoformat(),
+        "start_time": occurrence.start_time.isoformat(),
+        "end_time": occurrence.end_time.isoformat(),
+        "capacity": occurrence.capacity,
+        "registered": len(members),
+        "members": members
+    }
@@ -0,0 +1,130 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt cost parameters - raise PASSWORD_HASH_N as hardware gets faster.
+# Stored hashes carry their own parameters, so changing these only affects new hashes.
+SCRYPT_N = int(os.getenv("PASSWORD_HASH_N", 2 ** 14))
+SCRYPT_R = int(os.getenv("PASSWORD_HASH_R", 8))
+SCRYPT_P = int(os.getenv("PASSWORD_HASH_P", 1))
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# hashlib.scrypt releases the GIL, so a thread pool spreads the work across cores
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# Hashes allowed to be running or queued at once; anything beyond waits, then fails fast
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", HASH_WORKERS * 4))
+HASH_ACQUIRE_TIMEOUT = float(os.getenv("PASSWORD_HASH_ACQUIRE_TIMEOUT", 2.0))
+# Workers a bulk import may keep busy at once; the rest stay free for logins and registrations
+IMPORT_HASH_WORKERS = int(os.getenv("PASSWORD_IMPORT_HASH_WORKERS", max(1, HASH_WORKERS // 2)))
+
+LEGACY_PREFIX = "hashed_"
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(HASH_MAX_PENDING)
+_import_slots = threading.BoundedSemaphore(IMPORT_HASH_WORKERS)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool is saturated and the caller should retry later"""
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+        dklen=KEY_BYTES,
+    )
+
+
+def _run_in_pool(fn, *args):
+    """Run a KDF call on the hashing pool, bounded by HASH_MAX_PENDING"""
+    if not _slots.acquire(timeout=HASH_ACQUIRE_TIMEOUT):
+        raise PasswordHashingBusy("Password hashing is at capacity, retry shortly")
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def _release_import_slot(_):
+    _slots.release()
+    _import_slots.release()
+
+
+def _encode(salt: bytes, key: bytes, n: int, r: int, p: int) -> str:
+    b64 = lambda raw: base64.b64encode(raw).decode("ascii")
+    return f"scrypt${n}${r}${p}${b64(salt)}${b64(key)}"
+
+
+# Checked in place of a missing account's hash, so an unknown email costs the same scrypt run as a
+# wrong password; no password derives an all-zero key
+DUMMY_HASH = _encode(bytes(SALT_BYTES), bytes(KEY_BYTES), SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with scrypt, returning a self-describing string for users.password_hash"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _run_in_pool(_scrypt, password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return _encode(salt, key, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash many passwords for a bulk import, at most IMPORT_HASH_WORKERS at a time"""
+    salts = [secrets.token_bytes(SALT_BYTES) for _ in passwords]
+    futures = []
+    for password, salt in zip(passwords, salts):
+        # Waits for the import's own hashes; each submission also holds one of the shared HASH_MAX_PENDING slots
+        _import_slots.acquire()
+        if not _slots.acquire(timeout=HASH_ACQUIRE_TIMEOUT):
+            _import_slots.release()
+            raise PasswordHashingBusy("Password hashing is at capacity, retry shortly")
+        future = _executor.submit(_scrypt, password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        future.add_done_callback(_release_import_slot)
+        futures.append(future)
+    return [
+        _encode(salt, future.result(), SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        for salt, future in zip(salts, futures)
+    ]
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """Check a password against a stored hash in constant time"""
+    if stored_hash.startswith(LEGACY_PREFIX):
+        # Placeholder format written before real hashing existed
+        return hmac.compare_digest(
+            stored_hash.encode("utf-8"), f"{LEGACY_PREFIX}{password}".encode("utf-8")
+        )
+
+    try:
+        scheme, n, r, p, salt, key = stored_hash.split("$")
+        if scheme != "scrypt":
+            return False
+        salt = base64.b64decode(salt)
+        key = base64.b64decode(key)
+        n, r, p = int(n), int(r), int(p)
+        # hashlib.scrypt rejects parameters it can't use (n not a power of two, over maxmem) with ValueError
+        candidate = _run_in_pool(_scrypt, password, salt, n, r, p)
+    except ValueError:
+        return False
+
+    return hmac.compare_digest(candidate, key)
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    """True when a stored hash uses the legacy format or older cost parameters"""
+    if stored_hash.startswith(LEGACY_PREFIX):
+        return True
+    try:
+        scheme, n, r, p, _, _ = stored_hash.split("$")
+    except ValueError:
+        return True
+    return scheme != "scrypt" or (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
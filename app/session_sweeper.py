@@ -0,0 +1,65 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.jobs import enqueue, job_handler
+from models.job import Job, JobStatus
+from models.personal_training_session import PersonalTrainingSession, SessionStatus
+
+logger = logging.getLogger(__name__)
+
+# Sessions are marked this many minutes after their end time
+SESSION_SWEEP_GRACE_MINUTES = int(os.getenv("SESSION_SWEEP_GRACE_MINUTES", 60))
+# Rows per UPDATE; each batch is its own short transaction
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", 500))
+# Seconds between background sweeps; 0 disables scheduling them
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", 15 * 60))
+
+SWEEP_JOB = "sessions.sweep"
+
+
+def sweep_past_sessions(db: Session, cutoff: datetime | None = None, batch_size: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+    """Mark SCHEDULED sessions that ended before cutoff as COMPLETED; returns how many.
+
+    Works through the partial index on SCHEDULED rows in batches of batch_size, committing after
+    each one. Rows another transaction holds (e.g. a room move) are skipped and picked up next time.
+    """
+    cutoff = cutoff or datetime.now() - timedelta(minutes=SESSION_SWEEP_GRACE_MINUTES)
+    due = select(PersonalTrainingSession.session_id, PersonalTrainingSession.session_date).where(
+        PersonalTrainingSession.status == SessionStatus.SCHEDULED,
+        # Lets PostgreSQL skip partitions of months that haven't ended
+        PersonalTrainingSession.session_date <= cutoff.date(),
+        PersonalTrainingSession.end_time < cutoff
+    ).order_by(PersonalTrainingSession.session_date).limit(batch_size).with_for_update(skip_locked=True)
+    statement = update(PersonalTrainingSession).where(
+        tuple_(PersonalTrainingSession.session_id, PersonalTrainingSession.session_date).in_(due)
+    ).values(status=SessionStatus.COMPLETED).execution_options(synchronize_session=False)
+
+    swept = 0
+    while True:
+        count = db.execute(statement).rowcount
+        db.commit()
+        swept += count
+        if count < batch_size:
+            return swept
+
+
+def schedule_session_sweep(db: Session, delay_seconds: float = 0):
+    """Queue a sweep unless one is already pending; does not commit"""
+    pending = db.scalar(select(Job.job_id).where(Job.kind == SWEEP_JOB, Job.status == JobStatus.PENDING).limit(1))
+    if pending is None:
+        enqueue(db, SWEEP_JOB, {}, delay_seconds=delay_seconds)
+        db.flush()
+
+
+@job_handler(SWEEP_JOB)
+def sweep_sessions_job(db: Session, payloads: list[dict]):
+    swept = sweep_past_sessions(db)
+    if swept:
+        logger.info("Marked %s past PT sessions completed", swept)
+    # Each run queues the next, committed together with this job's removal
+    if SESSION_SWEEP_INTERVAL:
+        schedule_session_sweep(db, delay_seconds=SESSION_SWEEP_INTERVAL)
@@ -0,0 +1,74 @@
+import heapq
+from dataclasses import dataclass
+from datetime import time
+from itertools import groupby
+from typing import Hashable, Iterable
+
+from app.availability_index import AvailabilityIndex
+from models.group_class import DaysOfWeek
+
+
+@dataclass
+class TimetableEntry:
+    """A weekly class slot; class_id is None for classes not created yet"""
+    class_name: str
+    day: DaysOfWeek
+    start_time: time
+    end_time: time
+    room_id: int
+    trainer_id: int
+    class_id: int | None = None
+    index: int | None = None  # position in the submitted list
+
+
+def find_clashes(slots: Iterable[tuple[Hashable, time, time, object]]) -> list[tuple[object, object]]:
+    """Every pair of overlapping (key, start, end, ref) slots that share a key.
+
+    One sort, then a sweep per key: slots still running (a heap by end time) when the next one
+    starts overlap it. O(n log n + clashes).
+    """
+    clashes = []
+    ordered = sorted(slots, key=lambda slot: (slot[0], slot[1]))
+    for _, group in groupby(ordered, key=lambda slot: slot[0]):
+        running = []  # (end, sequence, ref)
+        for sequence, (_, start, end, ref) in enumerate(group):
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            clashes.extend((other, ref) for _, _, other in running)
+            heapq.heappush(running, (end, sequence, ref))
+    return clashes
+
+
+def _describe(entry: TimetableEntry) -> str:
+    source = f"class {entry.class_id}" if entry.class_id is not None else f"entry {entry.index}"
+    return f"'{entry.class_name}' ({source}, {entry.day.value} {entry.start_time:%H:%M}-{entry.end_time:%H:%M})"
+
+
+def validate_timetable(
+    entries: list[TimetableEntry],
+    existing: list[TimetableEntry],
+    availability: AvailabilityIndex
+) -> dict[int, list[str]]:
+    """Problems per submitted entry index: room or trainer double-booked against another new or
+    existing class, or the trainer not available for the slot. Clashes among existing classes
+    are not reported.
+    """
+    problems: dict[int, list[str]] = {}
+    for entry in entries:
+        if not availability.covers(entry.trainer_id, entry.day, entry.start_time, entry.end_time):
+            problems.setdefault(entry.index, []).append(f"Trainer {entry.trainer_id} is not available then")
+
+    everything = existing + entries
+    for resource, attribute in (("Room", "room_id"), ("Trainer", "trainer_id")):
+        slots = [
+            ((getattr(entry, attribute), entry.day.value), entry.start_time, entry.end_time, entry)
+            for entry in everything
+            if getattr(entry, attribute) is not None
+        ]
+        for first, second in find_clashes(slots):
+            for entry, other in ((first, second), (second, first)):
+                if entry.index is not None:
+                    problems.setdefault(entry.index, []).append(
+                        f"{resource} {getattr(entry, attribute)} clashes with {_describe(other)}"
+                    )
+    return problems
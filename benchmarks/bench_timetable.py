@@ -0,0 +1,55 @@
+"""
+Bulk timetable validation: sweep-line clash detection over a synthetic season.
+
+    python benchmarks/bench_timetable.py --classes 2000
+
+Validates --classes new classes against as many existing ones (random rooms, trainers and hours),
+without a database. The whole check should take milliseconds.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--classes", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=60)
+    parser.add_argument("--trainers", type=int, default=200)
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from datetime import time as clock
+    from app.availability_index import AvailabilityIndex
+    from app.timetable import TimetableEntry, validate_timetable
+    from models.group_class import DaysOfWeek
+
+    rng = random.Random(42)
+    days = list(DaysOfWeek)
+
+    def entry(**extra):
+        hour = rng.randrange(6, 21)
+        return TimetableEntry(
+            class_name="Bench", day=rng.choice(days), start_time=clock(hour), end_time=clock(hour + 1),
+            room_id=rng.randrange(args.rooms), trainer_id=rng.randrange(args.trainers), **extra
+        )
+
+    existing = [entry(class_id=i) for i in range(args.classes)]
+    new = [entry(index=i) for i in range(args.classes)]
+    availability = AvailabilityIndex(
+        (trainer_id, day, clock(6), clock(22)) for trainer_id in range(args.trainers) for day in days
+    )
+
+    start = time.perf_counter()
+    problems = validate_timetable(new, existing, availability)
+    elapsed = time.perf_counter() - start
+    print(f"{args.classes} new vs {args.classes} existing classes: {elapsed * 1000:.1f} ms, "
+          f"{len(problems)} with clashes")
+
+
+if __name__ == "__main__":
+    main()
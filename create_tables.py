@@ -3,11 +3,23 @@ from models.user import User, Member, Trainer, Admin
 from models.room import Room
 from models.group_class import GroupClass
 from models.class_registration import ClassRegistration
+from models.class_occurrence import ClassOccurrence
+from models.class_waitlist import ClassWaitlist
 from models.fitness_goal import FitnessGoal
 from models.health_metric import HealthMetric
 from models.personal_training_session import PersonalTrainingSession
 from models.trainer_availability import TrainerAvailability
+from models.job import Job
+from models.location import Location
+from models.room_occupancy import RoomOccupancy
+from models.cache_version import CacheVersion
+from models.idempotency_key import IdempotencyKey
+
+from app.partitions import ensure_partitions
 
 print("Creating all tables...")
 Base.metadata.create_all(bind=engine)
+if engine.dialect.name == "postgresql":
+    ensure_partitions(engine)
+
 print("✅ All tables created successfully!")
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Command line entry point for operational tasks.
+
+    python manage.py import-members new_location.csv
+    python manage.py import-members members.jsonl --format jsonl
+    python manage.py generate-occurrences --days 28
+    python manage.py ensure-partitions
+    python manage.py archive-partitions --before 2025-01-01
+    python manage.py run-jobs --workers 4
+    python manage.py evaluate-goals
+    python manage.py sweep-sessions
+    python manage.py snapshot-analytics
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from datetime import date
+
+
+def import_members_command(args):
+    from app.database import SessionLocal
+    from app.member_import import import_members, read_rows
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    counts = Counter()
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            for entry in import_members(db, read_rows(f, fmt)):
+                counts[entry["status"]] += 1
+                if entry["status"] != "created" or args.verbose:
+                    print(json.dumps(entry))
+    finally:
+        db.close()
+
+    print(f"✅ Import finished: {dict(counts)}", file=sys.stderr)
+
+
+def generate_occurrences_command(args):
+    from app.database import SessionLocal
+    from app.occurrences import generate_occurrences, OCCURRENCE_HORIZON_DAYS
+
+    db = SessionLocal()
+    try:
+        created, clashes = generate_occurrences(db, horizon_days=args.days or OCCURRENCE_HORIZON_DAYS)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"✅ Created {created} class occurrences")
+    for class_id, day in clashes:
+        print(f"⚠️  Skipped class {class_id} on {day.isoformat()}: room already booked")
+
+
+def ensure_partitions_command(args):
+    from app.database import engine
+    from app.partitions import ensure_partitions, PARTITION_MONTHS_AHEAD
+
+    created = ensure_partitions(engine, months_ahead=args.months_ahead or PARTITION_MONTHS_AHEAD, since=args.since)
+    print(f"✅ Created {len(created)} partitions")
+
+
+def archive_partitions_command(args):
+    from app.database import engine
+    from app.partitions import archive_partitions, ARCHIVE_DIR
+
+    for path in archive_partitions(engine, before=args.before, archive_dir=args.archive_dir or ARCHIVE_DIR):
+        print(f"📦 Archived {path}")
+
+
+def run_jobs_command(args):
+    import logging
+    import signal
+    import threading
+    from app.database import SessionLocal
+    from app.jobs import JobRunner, JOB_WORKERS
+    from app import analytics, goals, notifications, room_allocation  # register job handlers
+
+    logging.basicConfig(level=logging.INFO)
+    # The runner queues the recurring session sweep and analytics snapshots itself
+    runner = JobRunner(SessionLocal, workers=args.workers or JOB_WORKERS)
+    runner.start()
+    print("🏃 Job runner started, Ctrl+C to stop")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    runner.stop()
+
+
+def evaluate_goals_command(args):
+    from app.database import SessionLocal
+    from app.goals import evaluate_goals
+
+    db = SessionLocal()
+    try:
+        updated, completed = evaluate_goals(db, member_ids=args.member or None)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"✅ Evaluated {updated} goals, {completed} completed")
+
+
+def sweep_sessions_command(args):
+    from app.database import SessionLocal
+    from app.session_sweeper import sweep_past_sessions, SESSION_SWEEP_BATCH_SIZE
+
+    db = SessionLocal()
+    try:
+        swept = sweep_past_sessions(db, batch_size=args.batch_size or SESSION_SWEEP_BATCH_SIZE)
+    finally:
+        db.close()
+
+    print(f"✅ Marked {swept} past PT sessions completed")
+
+
+def snapshot_analytics_command(args):
+    from app.analytics import snapshot, ANALYTICS_DIR
+    from app.database import get_read_engine
+
+    exported = snapshot(get_read_engine(), analytics_dir=args.analytics_dir or ANALYTICS_DIR,
+                        datasets=args.dataset or None, rebuild=args.rebuild)
+    for name, count in exported.items():
+        print(f"📊 {name}: {count} rows")
+    print("✅ Analytics snapshot written")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gym Management System tasks")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subcommands.add_parser("import-members", help="Bulk import members from CSV or JSONL")
+    import_parser.add_argument("path", help="CSV or JSONL file of members")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    import_parser.add_argument("--verbose", action="store_true", help="also print rows that were created")
+    import_parser.set_defaults(handler=import_members_command)
+
+    occurrences_parser = subcommands.add_parser("generate-occurrences", help="Roll dated class occurrences forward")
+    occurrences_parser.add_argument("--days", type=int, default=None, help="horizon in days (CLASS_OCCURRENCE_HORIZON_DAYS)")
+    occurrences_parser.set_defaults(handler=generate_occurrences_command)
+
+    ensure_parser = subcommands.add_parser("ensure-partitions", help="Create upcoming monthly partitions")
+    ensure_parser.add_argument("--months-ahead", type=int, default=None, help="defaults to PARTITION_MONTHS_AHEAD")
+    ensure_parser.add_argument("--since", type=date.fromisoformat, default=None, help="first month to create (YYYY-MM-DD)")
+    ensure_parser.set_defaults(handler=ensure_partitions_command)
+
+    archive_parser = subcommands.add_parser("archive-partitions", help="Archive and drop old monthly partitions")
+    archive_parser.add_argument("--before", type=date.fromisoformat, required=True, help="archive months ending on or before this date")
+    archive_parser.add_argument("--archive-dir", default=None, help="defaults to ARCHIVE_DIR")
+    archive_parser.set_defaults(handler=archive_partitions_command)
+
+    jobs_parser = subcommands.add_parser("run-jobs", help="Run background job workers without the API")
+    jobs_parser.add_argument("--workers", type=int, default=None, help="defaults to JOB_WORKERS")
+    jobs_parser.set_defaults(handler=run_jobs_command)
+
+    goals_parser = subcommands.add_parser("evaluate-goals", help="Update goal progress from new health metrics")
+    goals_parser.add_argument("--member", type=int, action="append", help="only this member (repeatable)")
+    goals_parser.set_defaults(handler=evaluate_goals_command)
+
+    sweep_parser = subcommands.add_parser("sweep-sessions", help="Mark past scheduled PT sessions completed")
+    sweep_parser.add_argument("--batch-size", type=int, default=None, help="defaults to SESSION_SWEEP_BATCH_SIZE")
+    sweep_parser.set_defaults(handler=sweep_sessions_command)
+
+    analytics_parser = subcommands.add_parser("snapshot-analytics", help="Export reporting tables to Parquet for admin reports")
+    analytics_parser.add_argument("--dataset", action="append", help="only this dataset (repeatable)")
+    analytics_parser.add_argument("--rebuild", action="store_true", help="re-export everything instead of only new rows")
+    analytics_parser.add_argument("--analytics-dir", default=None, help="defaults to ANALYTICS_DIR")
+    analytics_parser.set_defaults(handler=snapshot_analytics_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 from models.user import User, Member, Admin, Trainer, MembershipStatus
-from models.fitness_goal import FitnessGoal, GoalTypeEnum, GoalStatusEnum
+from models.fitness_goal import FitnessGoal, GoalTypeEnum, GoalStatusEnum, GoalMetric, GoalComparator
 from models.health_metric import HealthMetric
 from models.group_class import GroupClass
 from models.room import Room
 from models.class_registration import ClassRegistration
+from models.class_occurrence import ClassOccurrence
+from models.class_waitlist import ClassWaitlist
 from models.personal_training_session import PersonalTrainingSession
 from models.trainer_availability import TrainerAvailability
+from models.job import Job, JobStatus
+from models.location import Location
+from models.room_occupancy import RoomOccupancy, OccupancyKind
+from models.cache_version import CacheVersion
+from models.idempotency_key import IdempotencyKey
 
 __all__ = [
     "User",
@@ -16,10 +23,21 @@ __all__ = [
     "FitnessGoal",
     "GoalTypeEnum",
     "GoalStatusEnum",
+    "GoalMetric",
+    "GoalComparator",
     "HealthMetric",
     "GroupClass",
     "Room",
     "ClassRegistration",
+    "ClassOccurrence",
+    "ClassWaitlist",
     "PersonalTrainingSession",
     "TrainerAvailability",
+    "Job",
+    "JobStatus",
+    "Location",
+    "RoomOccupancy",
+    "OccupancyKind",
+    "CacheVersion",
+    "IdempotencyKey",
 ]
\ No newline at end of file
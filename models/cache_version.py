@@ -0,0 +1,10 @@
+from sqlalchemy import Column, BigInteger, String
+from app.database import Base
+
+# One counter per table that processes cache in memory, bumped by a statement trigger on every
+# write to it (create_trigger.sql), so each process can tell its copy is stale with one lookup
+class CacheVersion(Base):
+    __tablename__ = "cache_version"
+
+    name = Column(String(50), primary_key=True)  # the cached table
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Date, UniqueConstraint
+from app.database import Base
+from sqlalchemy.orm import relationship
+
+class ClassOccurrence(Base):
+    __tablename__ = "class_occurrence"
+    __table_args__ = (
+        UniqueConstraint("class_id", "occurrence_date", name="uq_class_occurrence_class_date"),
+    )
+
+    occurrence_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    class_id = Column(Integer, ForeignKey("group_class.class_id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("room.room_id"))
+    occurrence_date = Column(Date, nullable=False, index=True)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    capacity = Column(Integer, nullable=False)
+
+    group_class = relationship("GroupClass", back_populates="occurrences")
+    room = relationship("Room")
+    registrations = relationship("ClassRegistration", back_populates="occurrence")
+    waitlist = relationship("ClassWaitlist", back_populates="occurrence", order_by="ClassWaitlist.position")
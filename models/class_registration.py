@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date, PrimaryKeyConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -12,12 +12,21 @@ class AttendanceStatus(enum.Enum):
 
 class ClassRegistration(Base):
     __tablename__ = "class_registration"
+    # Range-partitioned by month on registration_date; PostgreSQL requires the key in the primary key
+    __table_args__ = (
+        PrimaryKeyConstraint("registration_id", "registration_date"),
+        {"postgresql_partition_by": "RANGE (registration_date)"},
+    )
 
-    registration_id = Column(Integer, primary_key=True, index=True)
+    registration_id = Column(Integer, index=True, autoincrement=True)
     class_id = Column(Integer, ForeignKey("group_class.class_id"), nullable=False)
+    occurrence_id = Column(Integer, ForeignKey("class_occurrence.occurrence_id"), index=True)
     member_id = Column(Integer, ForeignKey("member.user_id"), nullable=False)
-    registration_date = Column(DateTime(timezone=True), server_default=func.now())
+    registration_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     attended_status = Column(SQLEnum(AttendanceStatus), nullable=False)
 
     group_class = relationship("GroupClass", back_populates="registrations")
-    member = relationship("Member", back_populates="class_registrations")
\ No newline at end of file
+    occurrence = relationship("ClassOccurrence", back_populates="registrations")
+    member = relationship("Member", back_populates="class_registrations")
+
+    __mapper_args__ = {"primary_key": [registration_id], "eager_defaults": True}
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+from sqlalchemy.orm import relationship
+
+class ClassWaitlist(Base):
+    __tablename__ = "class_waitlist"
+    __table_args__ = (
+        UniqueConstraint("occurrence_id", "member_id", name="uq_class_waitlist_occurrence_member"),
+    )
+
+    waitlist_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    occurrence_id = Column(Integer, ForeignKey("class_occurrence.occurrence_id"), nullable=False)
+    member_id = Column(Integer, ForeignKey("member.user_id"), nullable=False)
+    position = Column(Integer, nullable=False)  # increases per occurrence; lowest is promoted first
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    occurrence = relationship("ClassOccurrence", back_populates="waitlist")
+    member = relationship("Member")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date, Numeric
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -16,6 +16,16 @@ class GoalStatusEnum(enum.Enum):
     COMPLETED = "Completed"
     ABANDONED = "Abandoned"
 
+# Structured targets are measured against this HealthMetric column
+class GoalMetric(enum.Enum):
+    WEIGHT = "weight"
+    BODY_FAT_PERCENTAGE = "body_fat_percentage"
+    HEART_RATE = "heart_rate"
+
+class GoalComparator(enum.Enum):
+    AT_MOST = "<="
+    AT_LEAST = ">="
+
 class FitnessGoal(Base):
     __tablename__ = "fitness_goal"
 
@@ -27,4 +37,13 @@ class FitnessGoal(Base):
     target_value = Column(String, nullable=False)
     status = Column(SQLEnum(GoalStatusEnum), default=GoalStatusEnum.ACTIVE, nullable=False)
 
+    # Structured target, e.g. weight <= 170; free-form goals leave these empty
+    metric = Column(SQLEnum(GoalMetric))
+    comparator = Column(SQLEnum(GoalComparator))
+    target_number = Column(Numeric(6,2))
+    baseline_value = Column(Numeric(6,2))  # metric value when the goal was set
+    progress = Column(Numeric(5,2))  # percent of the way from baseline to target
+    evaluated_at = Column(DateTime(timezone=True))  # recorded_at of the newest metric evaluated
+    completed_at = Column(DateTime(timezone=True))
+
     member = relationship("Member", back_populates="fitness_goals")
\ No newline at end of file
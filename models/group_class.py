@@ -24,7 +24,10 @@ class GroupClass(Base):
     capacity = Column(Integer, nullable=False)
 
     room_id = Column(Integer, ForeignKey("room.room_id"))
+    location_id = Column(Integer, ForeignKey("location.location_id"), index=True)
     trainer_id = Column(Integer, ForeignKey("trainer.user_id"))
     room = relationship("Room", back_populates="group_classes")
+    location = relationship("Location", back_populates="group_classes")
     trainer = relationship("Trainer", back_populates="group_classes")
     registrations = relationship("ClassRegistration", back_populates="group_class")
+    occurrences = relationship("ClassOccurrence", back_populates="group_class")
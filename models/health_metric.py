@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Numeric, PrimaryKeyConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -6,14 +6,21 @@ from sqlalchemy.orm import relationship
 
 class HealthMetric(Base):
     __tablename__ = 'health_metric'
+    # Range-partitioned by month on recorded_at; PostgreSQL requires the key in the primary key
+    __table_args__ = (
+        PrimaryKeyConstraint('metric_id', 'recorded_at'),
+        {'postgresql_partition_by': 'RANGE (recorded_at)'},
+    )
     
-    metric_id = Column(Integer, primary_key=True, index=True)
+    metric_id = Column(Integer, index=True, autoincrement=True)
     member_id = Column(Integer, ForeignKey('member.user_id'), nullable=False)
     weight = Column(Numeric(5,2), nullable=False)  # weight in pounds
     body_fat_percentage = Column(Numeric(5,2), nullable=False)  # body fat percentage
     heart_rate = Column(Integer, nullable=False)  # resting heart rate in bpm
     blood_pressure = Column(String, nullable=False)  # e.g., "120/80"
     height = Column(Integer, nullable=False)  # height in inches    
-    recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
-    member = relationship("Member", back_populates="health_metrics")
\ No newline at end of file
+    member = relationship("Member", back_populates="health_metrics")
+
+    __mapper_args__ = {"primary_key": [metric_id], "eager_defaults": True}
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from app.database import Base
+
+# Responses to POST/PUT requests sent with an Idempotency-Key, shared by every API worker
+# (see app/idempotency.py). Rows past expires_at are reclaimed or purged as new keys arrive.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+
+    key = Column(String(400), primary_key=True)  # "<method> <path> <client key>"
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request body
+    status_code = Column(Integer)  # NULL while the first request is still running
+    body = Column(LargeBinary)
+    media_type = Column(String(100))
+    # While running: end of the claim's lease; once complete: when the stored response is dropped
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
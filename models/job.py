@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, JSON, Text
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+class JobStatus(enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    FAILED = "FAILED"  # gave up after JOB_MAX_ATTEMPTS; finished jobs are deleted
+
+class Job(Base):
+    __tablename__ = "job"
+
+    job_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
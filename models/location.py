@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+from sqlalchemy.orm import relationship
+
+class Location(Base):
+    __tablename__ = "location"
+
+    location_id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True)
+    address = Column(String(255))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    rooms = relationship("Room", back_populates="location")
+    group_classes = relationship("GroupClass", back_populates="location")
+    users = relationship("User", back_populates="location")
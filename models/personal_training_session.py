@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date, PrimaryKeyConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -14,8 +14,13 @@ class SessionStatus(enum.Enum):
 
 class PersonalTrainingSession(Base):
     __tablename__ = "personal_training_session"
+    # Range-partitioned by month on session_date; PostgreSQL requires the key in the primary key
+    __table_args__ = (
+        PrimaryKeyConstraint("session_id", "session_date"),
+        {"postgresql_partition_by": "RANGE (session_date)"},
+    )
 
-    session_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    session_id = Column(Integer, index=True, autoincrement=True)
     trainer_id = Column(Integer, ForeignKey("trainer.user_id"), nullable=False)
     member_id = Column(Integer, ForeignKey("member.user_id"), nullable=False)
     room_id = Column(Integer, ForeignKey("room.room_id"), nullable=False)
@@ -26,4 +31,6 @@ class PersonalTrainingSession(Base):
 
     trainer = relationship("Trainer", back_populates="personal_training_sessions")
     member = relationship("Member", back_populates="personal_training_sessions")
-    room = relationship("Room", back_populates="personal_training_sessions")
\ No newline at end of file
+    room = relationship("Room", back_populates="personal_training_sessions")
+
+    __mapper_args__ = {"primary_key": [session_id]}
\ No newline at end of file
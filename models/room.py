@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date, UniqueConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -20,14 +20,20 @@ class RoomStatus(enum.Enum):
 
 class Room(Base):
     __tablename__ = "room"
+    # Room numbers repeat across clubs
+    __table_args__ = (
+        UniqueConstraint("location_id", "room_number", name="uq_room_location_number"),
+    )
     
     room_id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, ForeignKey("location.location_id"), index=True)
     room_name = Column(String(100), nullable=False)
     room_type = Column(SQLEnum(RoomType), nullable=False)
-    room_number = Column(String(10), nullable=False, unique=True)
+    room_number = Column(String(10), nullable=False)
     capacity = Column(Integer, nullable=False)
     status = Column(SQLEnum(RoomStatus), nullable=False, default=RoomStatus.AVAILABLE)
     floor = Column(Integer, nullable=False)
 
+    location = relationship("Location", back_populates="rooms")
     group_classes = relationship("GroupClass", back_populates="room")
     personal_training_sessions = relationship("PersonalTrainingSession", back_populates="room")
\ No newline at end of file
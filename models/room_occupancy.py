@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, DateTime, Enum as SQLEnum, ForeignKey
+from app.database import Base
+import enum
+from sqlalchemy.orm import relationship
+
+class OccupancyKind(enum.Enum):
+    CLASS = "CLASS"
+    PT_SESSION = "PT_SESSION"
+    MAINTENANCE = "MAINTENANCE"  # room blocked by an admin; no source row
+
+# One row per dated use of a room, whatever booked it, so a room conflict is one range probe.
+# Written alongside class occurrences and PT sessions (see app/room_ledger.py); weekly classes
+# appear once their occurrences are generated.
+class RoomOccupancy(Base):
+    __tablename__ = "room_occupancy"
+
+    occupancy_id = Column(Integer, primary_key=True, autoincrement=True)
+    # Overlap probes use the GiST index on (room_id, starts_at, ends_at) in create_index.sql
+    room_id = Column(Integer, ForeignKey("room.room_id"), nullable=False, index=True)
+    kind = Column(SQLEnum(OccupancyKind), nullable=False)
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
+    # The source matching kind; neither for MAINTENANCE
+    occurrence_id = Column(Integer, ForeignKey("class_occurrence.occurrence_id", ondelete="CASCADE"), unique=True)
+    session_id = Column(Integer, unique=True)  # personal_training_session is partitioned, so no FK
+
+    room = relationship("Room")
+    occurrence = relationship("ClassOccurrence")
@@ -5,4 +5,49 @@ CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_health_metric_member_recorded ON health_metric(member_id, recorded_at DESC);
 
 -- Index on class_id in class_registration for checking class capacity
-CREATE INDEX idx_class_registration_class_id ON class_registration(class_id);
\ No newline at end of file
+CREATE INDEX idx_class_registration_class_id ON class_registration(class_id);
+
+-- Index on start_time in class_occurrence for finding the next upcoming occurrence
+CREATE INDEX idx_class_occurrence_class_start ON class_occurrence(class_id, start_time);
+
+-- Index on (occurrence_id, position) in class_waitlist for promoting the next waiting member
+CREATE INDEX idx_class_waitlist_occurrence_position ON class_waitlist(occurrence_id, position);
+
+-- Partial index on runnable jobs so the job runner's claim query stays small
+CREATE INDEX idx_job_pending_run_after ON job(run_after, job_id) WHERE status = 'PENDING';
+
+-- Index on (location_id, day, start_time) in group_class for one club's timetable
+CREATE INDEX idx_group_class_location_day ON group_class(location_id, day, start_time);
+
+-- Partial index on measurable active goals for the goal evaluator
+CREATE INDEX idx_fitness_goal_measurable ON fitness_goal(member_id) WHERE status = 'ACTIVE' AND metric IS NOT NULL;
+
+-- GiST index on room_occupancy so one probe finds any booking overlapping a time range in a room
+-- (btree_gist lets the integer room_id share the index with the range bounds)
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+CREATE INDEX idx_room_occupancy_room_range ON room_occupancy USING gist (room_id, starts_at, ends_at);
+-- No two ledger rows may overlap in one room, so of two bookings that both passed the probe
+-- only the first to commit succeeds (app/room_ledger.py turns the violation into RoomTaken)
+ALTER TABLE room_occupancy ADD CONSTRAINT room_occupancy_no_overlap
+    EXCLUDE USING gist (room_id WITH =, tstzrange(starts_at, ends_at) WITH &&);
+
+-- Partial index on SCHEDULED PT sessions; the session sweeper keeps it down to upcoming sessions
+CREATE INDEX idx_pt_session_scheduled_end ON personal_training_session(end_time) WHERE status = 'SCHEDULED';
+
+-- Partial index on a trainer's SCHEDULED PT sessions for the trainer schedule
+CREATE INDEX idx_pt_session_trainer_scheduled ON personal_training_session(trainer_id, session_date) WHERE status = 'SCHEDULED';
+
+-- Trigram GIN indexes for front-desk member search (ILIKE '%...%' and similarity ranking)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);
+CREATE INDEX idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);
+CREATE INDEX idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX idx_users_phone_trgm ON users USING gin (phone gin_trgm_ops);
+-- Search words under three characters have no trigram; they match as prefixes through these
+CREATE INDEX idx_users_first_name_prefix ON users (lower(first_name) text_pattern_ops);
+CREATE INDEX idx_users_last_name_prefix ON users (lower(last_name) text_pattern_ops);
+CREATE INDEX idx_users_email_prefix ON users (lower(email) text_pattern_ops);
+CREATE INDEX idx_users_phone_prefix ON users (lower(phone) text_pattern_ops);
+
+-- Active goal counts per member for class rosters
+CREATE INDEX idx_fitness_goal_active_member ON fitness_goal(member_id) WHERE status = 'ACTIVE';
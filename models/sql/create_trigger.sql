@@ -5,15 +5,27 @@ DECLARE
     class_capacity INTEGER;
     current_registrations INTEGER;
 BEGIN
-    -- Get the capacity of the class
-    SELECT capacity INTO class_capacity
-    FROM group_class
-    WHERE class_id = NEW.class_id;
-    
-    -- Count current registrations for this class
-    SELECT COUNT(*) INTO current_registrations
-    FROM class_registration
-    WHERE class_id = NEW.class_id;
+    IF NEW.occurrence_id IS NOT NULL THEN
+        -- Capacity is per dated occurrence, so only that occurrence's registrations count
+        SELECT capacity INTO class_capacity
+        FROM class_occurrence
+        WHERE occurrence_id = NEW.occurrence_id;
+
+        SELECT COUNT(*) INTO current_registrations
+        FROM class_registration
+        WHERE occurrence_id = NEW.occurrence_id
+          AND attended_status <> 'CANCELLED';
+    ELSE
+        -- Legacy registrations made before occurrences existed
+        SELECT capacity INTO class_capacity
+        FROM group_class
+        WHERE class_id = NEW.class_id;
+
+        SELECT COUNT(*) INTO current_registrations
+        FROM class_registration
+        WHERE class_id = NEW.class_id
+          AND occurrence_id IS NULL;
+    END IF;
     
     -- Check if class is full
     IF current_registrations >= class_capacity THEN
@@ -26,7 +38,26 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Create trigger that fires before insert on class_registration
+DROP TRIGGER IF EXISTS prevent_class_overbooking ON class_registration;
 CREATE TRIGGER prevent_class_overbooking
     BEFORE INSERT ON class_registration
     FOR EACH ROW
-    EXECUTE FUNCTION check_class_capacity();
\ No newline at end of file
+    EXECUTE FUNCTION check_class_capacity();
+
+
+-- Bump the trainer_availability counter in cache_version on every write, so API processes holding
+-- the availability index in memory (app/availability_index.py) rebuild it
+CREATE OR REPLACE FUNCTION bump_trainer_availability_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO cache_version (name, version) VALUES ('trainer_availability', 1)
+    ON CONFLICT (name) DO UPDATE SET version = cache_version.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trainer_availability_version ON trainer_availability;
+CREATE TRIGGER trainer_availability_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON trainer_availability
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_trainer_availability_version();
@@ -0,0 +1,6 @@
+-- Run once on databases created before class_occurrence existed
+-- (create_tables.py creates the new table; this links existing registrations to it)
+ALTER TABLE class_registration
+    ADD COLUMN IF NOT EXISTS occurrence_id INTEGER REFERENCES class_occurrence(occurrence_id);
+
+CREATE INDEX IF NOT EXISTS ix_class_registration_occurrence_id ON class_registration(occurrence_id);
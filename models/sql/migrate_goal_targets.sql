@@ -0,0 +1,19 @@
+-- Run once on databases created before goals had structured targets
+DO $$ BEGIN
+    CREATE TYPE goalmetric AS ENUM ('WEIGHT', 'BODY_FAT_PERCENTAGE', 'HEART_RATE');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$ BEGIN
+    CREATE TYPE goalcomparator AS ENUM ('AT_MOST', 'AT_LEAST');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+ALTER TABLE fitness_goal
+    ADD COLUMN IF NOT EXISTS metric goalmetric,
+    ADD COLUMN IF NOT EXISTS comparator goalcomparator,
+    ADD COLUMN IF NOT EXISTS target_number NUMERIC(6,2),
+    ADD COLUMN IF NOT EXISTS baseline_value NUMERIC(6,2),
+    ADD COLUMN IF NOT EXISTS progress NUMERIC(5,2),
+    ADD COLUMN IF NOT EXISTS evaluated_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS completed_at TIMESTAMPTZ;
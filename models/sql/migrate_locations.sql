@@ -0,0 +1,25 @@
+-- Run once on databases created before locations existed
+-- (create_tables.py creates the location table; this puts existing rows in a default club)
+INSERT INTO location (name) VALUES ('Main Club') ON CONFLICT (name) DO NOTHING;
+
+ALTER TABLE room ADD COLUMN IF NOT EXISTS location_id INTEGER REFERENCES location(location_id);
+ALTER TABLE group_class ADD COLUMN IF NOT EXISTS location_id INTEGER REFERENCES location(location_id);
+ALTER TABLE users ADD COLUMN IF NOT EXISTS location_id INTEGER REFERENCES location(location_id);
+
+UPDATE room SET location_id = (SELECT location_id FROM location WHERE name = 'Main Club')
+WHERE location_id IS NULL;
+
+UPDATE group_class SET location_id = room.location_id
+FROM room
+WHERE group_class.room_id = room.room_id AND group_class.location_id IS NULL;
+
+UPDATE users SET location_id = (SELECT location_id FROM location WHERE name = 'Main Club')
+WHERE location_id IS NULL;
+
+-- Room numbers are unique within a club rather than overall
+ALTER TABLE room DROP CONSTRAINT IF EXISTS room_room_number_key;
+ALTER TABLE room ADD CONSTRAINT uq_room_location_number UNIQUE (location_id, room_number);
+
+CREATE INDEX IF NOT EXISTS ix_room_location_id ON room(location_id);
+CREATE INDEX IF NOT EXISTS ix_group_class_location_id ON group_class(location_id);
+CREATE INDEX IF NOT EXISTS ix_users_location_id ON users(location_id);
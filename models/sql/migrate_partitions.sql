@@ -0,0 +1,70 @@
+-- Run once to convert databases created before partitioning (requires PostgreSQL 13+).
+-- Each table is rebuilt as a monthly range-partitioned table covering its existing data
+-- plus PARTITION_MONTHS_AHEAD (3) months, with a DEFAULT partition for anything outside.
+-- Afterwards re-run create_view.sql and create_trigger.sql, since they depend on these tables.
+
+CREATE OR REPLACE FUNCTION convert_to_monthly_partitions(tbl TEXT, pk TEXT, part_key TEXT)
+RETURNS VOID AS $$
+DECLARE
+    old_tbl TEXT := tbl || '_unpartitioned';
+    first_month DATE;
+    partition_month DATE;
+BEGIN
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, old_tbl);
+    EXECUTE format('UPDATE %I SET %I = now() WHERE %I IS NULL', old_tbl, part_key, part_key);
+
+    -- Same columns, defaults and NOT NULLs; the partition key joins the primary key
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE (%I)', tbl, old_tbl, part_key);
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET NOT NULL', tbl, part_key);
+    EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (%I, %I)', tbl, pk, part_key);
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+
+    EXECUTE format('SELECT date_trunc(''month'', min(%I))::date FROM %I', part_key, old_tbl) INTO first_month;
+    FOR partition_month IN
+        SELECT generate_series(
+            COALESCE(first_month, date_trunc('month', now())::date),
+            date_trunc('month', now() + INTERVAL '3 months')::date,
+            INTERVAL '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            tbl || '_p' || to_char(partition_month, 'YYYYMM'), tbl, partition_month, (partition_month + INTERVAL '1 month')::date
+        );
+    END LOOP;
+
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', tbl, old_tbl);
+
+    -- Keep the id sequence alive when the old table is dropped
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.%I', pg_get_serial_sequence(old_tbl, pk), tbl, pk);
+    EXECUTE format('DROP TABLE %I CASCADE', old_tbl);
+END;
+$$ LANGUAGE plpgsql;
+
+BEGIN;
+
+SELECT convert_to_monthly_partitions('personal_training_session', 'session_id', 'session_date');
+ALTER TABLE personal_training_session
+    ADD FOREIGN KEY (trainer_id) REFERENCES trainer(user_id),
+    ADD FOREIGN KEY (member_id) REFERENCES member(user_id),
+    ADD FOREIGN KEY (room_id) REFERENCES room(room_id);
+CREATE INDEX ix_personal_training_session_session_id ON personal_training_session(session_id);
+
+SELECT convert_to_monthly_partitions('class_registration', 'registration_id', 'registration_date');
+ALTER TABLE class_registration
+    ADD FOREIGN KEY (class_id) REFERENCES group_class(class_id),
+    ADD FOREIGN KEY (occurrence_id) REFERENCES class_occurrence(occurrence_id),
+    ADD FOREIGN KEY (member_id) REFERENCES member(user_id);
+CREATE INDEX ix_class_registration_registration_id ON class_registration(registration_id);
+CREATE INDEX ix_class_registration_occurrence_id ON class_registration(occurrence_id);
+CREATE INDEX idx_class_registration_class_id ON class_registration(class_id);
+
+SELECT convert_to_monthly_partitions('health_metric', 'metric_id', 'recorded_at');
+ALTER TABLE health_metric
+    ADD FOREIGN KEY (member_id) REFERENCES member(user_id);
+CREATE INDEX ix_health_metric_metric_id ON health_metric(metric_id);
+CREATE INDEX idx_health_metric_member_recorded ON health_metric(member_id, recorded_at DESC);
+
+COMMIT;
+
+DROP FUNCTION convert_to_monthly_partitions(TEXT, TEXT, TEXT);
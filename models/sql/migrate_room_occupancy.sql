@@ -0,0 +1,28 @@
+-- Run once on databases that already have class occurrences or PT sessions
+-- (create_tables.py creates the room_occupancy table; this fills it from existing bookings)
+-- Tables created before room maintenance existed lack its kind
+ALTER TYPE occupancykind ADD VALUE IF NOT EXISTS 'MAINTENANCE';
+
+INSERT INTO room_occupancy (room_id, kind, starts_at, ends_at, occurrence_id)
+SELECT room_id, 'CLASS', start_time, end_time, occurrence_id
+FROM class_occurrence
+WHERE room_id IS NOT NULL
+ON CONFLICT (occurrence_id) DO NOTHING;
+
+INSERT INTO room_occupancy (room_id, kind, starts_at, ends_at, session_id)
+SELECT room_id, 'PT_SESSION', start_time, end_time, session_id
+FROM personal_training_session
+WHERE status <> 'CANCELED'
+ON CONFLICT (session_id) DO NOTHING;
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+CREATE INDEX IF NOT EXISTS idx_room_occupancy_room_range ON room_occupancy USING gist (room_id, starts_at, ends_at);
+
+-- Fails if existing bookings already overlap; list them with
+--   SELECT a.room_id, a.occupancy_id, b.occupancy_id FROM room_occupancy a JOIN room_occupancy b
+--   ON a.room_id = b.room_id AND a.occupancy_id < b.occupancy_id
+--   AND tstzrange(a.starts_at, a.ends_at) && tstzrange(b.starts_at, b.ends_at);
+-- and move or cancel one of each pair first
+ALTER TABLE room_occupancy DROP CONSTRAINT IF EXISTS room_occupancy_no_overlap;
+ALTER TABLE room_occupancy ADD CONSTRAINT room_occupancy_no_overlap
+    EXCLUDE USING gist (room_id WITH =, tstzrange(starts_at, ends_at) WITH &&);
@@ -0,0 +1,5 @@
+-- Run once on databases created while trainer_availability stored windows as timestamps
+-- (with the creation date baked in); keeps only the time of day
+ALTER TABLE trainer_availability
+    ALTER COLUMN start_time TYPE TIME USING start_time::time,
+    ALTER COLUMN end_time TYPE TIME USING end_time::time;
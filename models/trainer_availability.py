@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum,ForeignKey, Date, Time
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -16,8 +16,8 @@ class TrainerAvailability(Base):
     availability_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     trainer_id = Column(Integer, ForeignKey("trainer.user_id"), nullable=False)
     dayOfWeek = Column(SQLEnum(DaysOfWeek, name="days_of_week"), nullable=False)
-    start_time = Column(DateTime, nullable=False)
-    end_time = Column(DateTime, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
     status = Column(SQLEnum(AvailabilityStatus), default=AvailabilityStatus.ACTIVE, nullable=False)
 
     trainer = relationship("Trainer", back_populates="availabilities")
\ No newline at end of file
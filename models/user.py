@@ -20,8 +20,11 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     phone = Column(String(20))
+    # Home club
+    location_id = Column(Integer, ForeignKey("location.location_id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    location = relationship("Location", back_populates="users")
     member = relationship("Member", back_populates="user", uselist=False)
     admin = relationship("Admin", back_populates="user", uselist=False)
     trainer = relationship("Trainer", back_populates="user", uselist=False)
@@ -1,16 +1,33 @@
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
+from app.security import hash_password
 from models.user import User, Member, Trainer, Admin, MembershipStatus
 from models.room import Room, RoomType, RoomStatus
 from models.group_class import GroupClass
 from models.group_class import DaysOfWeek
-from models.fitness_goal import FitnessGoal, GoalTypeEnum, GoalStatusEnum
+from models.fitness_goal import FitnessGoal, GoalTypeEnum, GoalStatusEnum, GoalMetric, GoalComparator
 from models.health_metric import HealthMetric
 from models.personal_training_session import PersonalTrainingSession, SessionStatus
 from models.class_registration import ClassRegistration, AttendanceStatus
 from models.trainer_availability import TrainerAvailability, AvailabilityStatus
+from models.class_occurrence import ClassOccurrence
+from models.location import Location
+from app.occurrences import generate_occurrences
+from app.room_ledger import record_sessions
 from datetime import datetime, date, time, timedelta
 
+def create_locations(db: Session):
+    """Create sample club - location_id 1"""
+    # Check if locations already exist
+    existing_count = db.query(Location).count()
+    if existing_count > 0:
+        print(f"⏭️  Skipping location creation - {existing_count} locations already exist")
+        return
+    
+    db.add(Location(name="Main Club", address="1 Main Street"))
+    db.commit()
+    print("✅ Created 1 location")
+
 def create_users(db: Session):
     """Create sample users"""
     # Check if users already exist
@@ -21,15 +38,15 @@ def create_users(db: Session):
     
     users = [
         User(first_name="John", last_name="Doe", email="john@example.com", 
-             password_hash="hashed_password_1", phone="555-0101"),
+             password_hash=hash_password("password_1"), phone="555-0101", location_id=1),
         User(first_name="Jane", last_name="Smith", email="jane@example.com",
-             password_hash="hashed_password_2", phone="555-0102"),
+             password_hash=hash_password("password_2"), phone="555-0102", location_id=1),
         User(first_name="Mike", last_name="Johnson", email="mike@example.com",
-             password_hash="hashed_password_3", phone="555-0103"),
+             password_hash=hash_password("password_3"), phone="555-0103", location_id=1),
         User(first_name="Sarah", last_name="Williams", email="sarah@example.com",
-             password_hash="hashed_password_4", phone="555-0104"),
+             password_hash=hash_password("password_4"), phone="555-0104", location_id=1),
         User(first_name="Admin", last_name="User", email="admin@example.com",
-             password_hash="hashed_password_5", phone="555-0105"),
+             password_hash=hash_password("password_5"), phone="555-0105", location_id=1),
     ]
     
     db.add_all(users)
@@ -100,9 +117,9 @@ def create_rooms(db: Session):
         return
     
     rooms = [
-        Room(room_name="Yoga Studio", room_type=RoomType.STUDIO, room_number =101 ,floor=1,capacity=20, status=RoomStatus.AVAILABLE),
-        Room(room_name="Weight Room", room_type=RoomType.WEIGHTS,room_number =103 ,floor=1 ,capacity=30, status=RoomStatus.AVAILABLE),
-        Room(room_name="Cardio Room", room_type=RoomType.CARDIO,room_number =102 ,floor=1 ,capacity=25, status=RoomStatus.MAINTENANCE),
+        Room(room_name="Yoga Studio", room_type=RoomType.STUDIO, room_number =101 ,floor=1,capacity=20, status=RoomStatus.AVAILABLE, location_id=1),
+        Room(room_name="Weight Room", room_type=RoomType.WEIGHTS,room_number =103 ,floor=1 ,capacity=30, status=RoomStatus.AVAILABLE, location_id=1),
+        Room(room_name="Cardio Room", room_type=RoomType.CARDIO,room_number =102 ,floor=1 ,capacity=25, status=RoomStatus.MAINTENANCE, location_id=1),
     ]
     
     db.add_all(rooms)
@@ -120,15 +137,21 @@ def create_group_classes(db: Session):
     classes = [
         GroupClass(class_name="Morning Yoga", day=DaysOfWeek.MONDAY, 
                    start_time=time(9, 0), end_time=time(10, 0),
-                   capacity=15, room_id=1, trainer_id=4),
+                   capacity=15, room_id=1, location_id=1, trainer_id=4),
         GroupClass(class_name="Evening Strength", day=DaysOfWeek.WEDNESDAY,
                    start_time=time(18, 0), end_time=time(19, 0),
-                   capacity=20, room_id=2, trainer_id=4),
+                   capacity=20, room_id=2, location_id=1, trainer_id=4),
     ]
     db.add_all(classes)
     db.commit()
     print(f"✅ Created {len(classes)} group classes")
 
+def create_class_occurrences(db: Session):
+    """Create dated occurrences of the group classes over the booking horizon"""
+    created, _ = generate_occurrences(db)
+    db.commit()
+    print(f"✅ Created {created} class occurrences")
+
 def create_trainer_availability(db: Session):
     """Create sample trainer availability"""
     # Check if trainer availabilities already exist
@@ -139,12 +162,10 @@ def create_trainer_availability(db: Session):
     
     availabilities = [
         TrainerAvailability(trainer_id=4, dayOfWeek=DaysOfWeek.MONDAY,
-                           start_time=datetime.combine(date.today(), time(8, 0)), 
-                           end_time=datetime.combine(date.today(), time(17, 0)),
+                           start_time=time(8, 0), end_time=time(17, 0),
                            status=AvailabilityStatus.ACTIVE),
         TrainerAvailability(trainer_id=4, dayOfWeek=DaysOfWeek.WEDNESDAY,
-                           start_time=datetime.combine(date.today(), time(8, 0)), 
-                           end_time=datetime.combine(date.today(), time(17, 0)),
+                           start_time=time(8, 0), end_time=time(17, 0),
                            status=AvailabilityStatus.ACTIVE),
     ]
     db.add_all(availabilities)
@@ -162,10 +183,12 @@ def create_fitness_goals(db: Session):
     goals = [
         FitnessGoal(member_id=1, goal_type=GoalTypeEnum.WEIGHTLOSS,
                    target_value="Lose 10 lbs", deadline=date.today() + timedelta(days=90),
-                   status=GoalStatusEnum.ACTIVE),
+                   status=GoalStatusEnum.ACTIVE,
+                   metric=GoalMetric.WEIGHT, comparator=GoalComparator.AT_MOST, target_number=170.5),
         FitnessGoal(member_id=2, goal_type=GoalTypeEnum.MUSCLEGAIN,
                    target_value="Gain 5 lbs muscle", deadline=date.today() + timedelta(days=120),
-                   status=GoalStatusEnum.ACTIVE),
+                   status=GoalStatusEnum.ACTIVE,
+                   metric=GoalMetric.WEIGHT, comparator=GoalComparator.AT_LEAST, target_number=170.0),
     ]
     db.add_all(goals)
     db.commit()
@@ -197,10 +220,16 @@ def create_class_registrations(db: Session):
         print(f"⏭️  Skipping class registration creation - {existing_count} class registrations already exist")
         return
     
+    # Register into the first scheduled occurrence of class 1
+    occurrence = db.query(ClassOccurrence).filter(
+        ClassOccurrence.class_id == 1
+    ).order_by(ClassOccurrence.start_time).first()
+    occurrence_id = occurrence.occurrence_id if occurrence else None
+    
     registrations = [
-        ClassRegistration(class_id=1, member_id=1, 
+        ClassRegistration(class_id=1, occurrence_id=occurrence_id, member_id=1, 
                          attended_status=AttendanceStatus.REGISTERED),
-        ClassRegistration(class_id=1, member_id=2,
+        ClassRegistration(class_id=1, occurrence_id=occurrence_id, member_id=2,
                          attended_status=AttendanceStatus.ATTENDED),
     ]
     db.add_all(registrations)
@@ -223,6 +252,8 @@ def create_personal_training_sessions(db: Session):
                                status=SessionStatus.SCHEDULED),
     ]
     db.add_all(sessions)
+    db.flush()
+    record_sessions(db, [(s.session_id, s.room_id, s.start_time, s.end_time) for s in sessions])
     db.commit()
     print(f"✅ Created {len(sessions)} personal training sessions")
 
@@ -234,12 +265,14 @@ def populate_database():
         print("🚀 Starting database population...")
         
         # Order matters due to foreign key constraints
+        create_locations(db)
         create_users(db)
         create_members(db)
         create_trainers(db)
         create_admins(db)
         create_rooms(db)
         create_group_classes(db)
+        create_class_occurrences(db)
         create_trainer_availability(db)
         create_fitness_goals(db)
         create_health_metrics(db)
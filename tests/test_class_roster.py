@@ -0,0 +1,115 @@
+from datetime import date, datetime, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from app.database import Base, get_read_db
+from app.main import app
+from models.class_occurrence import ClassOccurrence
+from models.fitness_goal import FitnessGoal, GoalStatusEnum, GoalTypeEnum
+from models.group_class import DaysOfWeek, GroupClass
+from models.room import RoomStatus, RoomType
+
+TRAINER_ID = 1
+CLASS_ID = 1
+# occurrence_id -> members booked on it
+ROSTERS = {1: range(100, 105), 2: range(200, 250)}
+
+# Range-partitioned on PostgreSQL; SQLite can't autoincrement their composite keys, so they get plain ones
+PARTITIONED_DDL = (
+    "CREATE TABLE class_registration (registration_id INTEGER PRIMARY KEY, class_id INT, occurrence_id INT, "
+    "member_id INT, registration_date DATETIME, attended_status VARCHAR)",
+    "CREATE TABLE health_metric (metric_id INTEGER PRIMARY KEY, member_id INT, weight NUMERIC, "
+    "body_fat_percentage NUMERIC, heart_rate INT, blood_pressure VARCHAR, height INT, recorded_at DATETIME)",
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    partitioned = {"class_registration", "health_metric", "personal_training_session"}
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name not in partitioned])
+    with engine.begin() as conn:
+        for ddl in PARTITIONED_DDL:
+            conn.execute(text(ddl))
+
+    db = sessionmaker(bind=engine)()
+    db.add(models.Location(location_id=1, name="Main"))
+    db.add(models.User(user_id=TRAINER_ID, first_name="T", last_name="T", email="t@example.com", password_hash="!"))
+    db.add(models.Trainer(user_id=TRAINER_ID, specialty="yoga"))
+    db.add(models.Room(room_id=1, location_id=1, room_name="Studio", room_number="101", floor=1, capacity=60,
+                       room_type=RoomType.STUDIO, status=RoomStatus.AVAILABLE))
+    db.add(GroupClass(class_id=CLASS_ID, class_name="Yoga", day=DaysOfWeek.TUESDAY, start_time=time(18),
+                      end_time=time(19), capacity=60, room_id=1, location_id=1, trainer_id=TRAINER_ID))
+    for occurrence_id, day in ((1, date(2030, 1, 1)), (2, date(2030, 1, 8))):
+        db.add(ClassOccurrence(occurrence_id=occurrence_id, class_id=CLASS_ID, room_id=1, occurrence_date=day,
+                               start_time=datetime.combine(day, time(18)), end_time=datetime.combine(day, time(19)),
+                               capacity=60))
+    for member_ids in ROSTERS.values():
+        for member_id in member_ids:
+            db.add(models.User(user_id=member_id, first_name="M", last_name=str(member_id),
+                               email=f"m{member_id}@example.com", password_hash="!"))
+            db.add(models.Member(user_id=member_id, membership_status=models.MembershipStatus.ACTIVE))
+            db.add(FitnessGoal(member_id=member_id, goal_type=list(GoalTypeEnum)[0], target_value="x",
+                               status=GoalStatusEnum.ACTIVE))
+    db.commit()
+    db.close()
+
+    with engine.begin() as conn:
+        for occurrence_id, member_ids in ROSTERS.items():
+            for member_id in member_ids:
+                conn.execute(text(
+                    "INSERT INTO class_registration (class_id, occurrence_id, member_id, registration_date, attended_status) "
+                    "VALUES (:class_id, :occurrence_id, :member_id, '2029-12-01 10:00:00', 'REGISTERED')"
+                ), {"class_id": CLASS_ID, "occurrence_id": occurrence_id, "member_id": member_id})
+                for month in (1, 2):
+                    conn.execute(text(
+                        "INSERT INTO health_metric (member_id, weight, body_fat_percentage, heart_rate, blood_pressure, height, recorded_at) "
+                        "VALUES (:member_id, :weight, 20, 60, '120/80', 70, :recorded_at)"
+                    ), {"member_id": member_id, "weight": 180 + month, "recorded_at": f"2029-0{month}-05 08:00:00"})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def client(engine):
+    session_factory = sessionmaker(bind=engine)
+
+    def read_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_read_db] = read_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_read_db, None)
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.mark.parametrize("occurrence_id", ROSTERS)
+def test_roster_takes_two_statements_whatever_the_class_size(client, statements, occurrence_id):
+    response = client.get(f"/trainers/{TRAINER_ID}/classes/{CLASS_ID}/roster", params={"occurrence_id": occurrence_id})
+
+    assert response.status_code == 200
+    members = response.json()["members"]
+    assert sorted(member["member_id"] for member in members) == list(ROSTERS[occurrence_id])
+    assert all(member["active_goals"] == 1 for member in members)
+    assert all(member["latest_health"]["weight"] == 182 for member in members)
+    assert len(statements) == 2